@@ -0,0 +1,130 @@
+# analytics.py
+# Допоміжні функції для аналітики прогресу: ключі періодів, серії тренувань
+# та формування відповіді GET /my_analytics з уже агрегованих даних.
+from datetime import date, timedelta
+
+PERIODS = ('week', 'month')
+
+
+def period_key(day, period):
+    """Ключ тижня ('2025-W27', за ISO) або місяця ('2025-07') для дати 'РРРР-ММ-ДД'."""
+    if period == 'month':
+        return day[:7]
+    year, week, _ = date.fromisoformat(day).isocalendar()
+    return f'{year}-W{week:02d}'
+
+
+class Bucket:
+    """Агрегати за один період: завершені тренування, час тренувань, сума та кількість зважувань."""
+
+    __slots__ = ('key', 'workouts_completed', 'training_seconds', 'weight_sum', 'weight_count')
+
+    def __init__(self, key, workouts_completed=0, training_seconds=0, weight_sum=0.0, weight_count=0):
+        self.key = key
+        self.workouts_completed = workouts_completed
+        self.training_seconds = training_seconds
+        self.weight_sum = weight_sum
+        self.weight_count = weight_count
+
+    def is_empty(self):
+        return not (self.workouts_completed or self.training_seconds or self.weight_count)
+
+
+class StreakTracker:
+    """
+    Дні з завершеними тренуваннями та найдовша серія поспіль.
+
+    Найдовша серія оновлюється інкрементально: новий день об'єднує сусідні серії,
+    тож перераховується лише довжина серії, що містить цей день. Повний перерахунок
+    потрібен тільки тоді, коли скасовується день із найдовшої серії.
+    """
+
+    def __init__(self):
+        self._days = {}  # {date: кількість завершених тренувань}
+        self.longest = 0
+
+    def dump_state(self):
+        return dict(self._days), self.longest
+
+    @classmethod
+    def load_state(cls, state):
+        tracker = cls()
+        tracker._days, tracker.longest = state
+        return tracker
+
+    def _run_length(self, day):
+        """Довжина серії днів поспіль, що містить day."""
+        length = 1
+        for step in (-1, 1):
+            current = day + timedelta(days=step)
+            while current.isoformat() in self._days:
+                length += 1
+                current += timedelta(days=step)
+        return length
+
+    def add(self, day):
+        count = self._days.get(day, 0)
+        self._days[day] = count + 1
+        if count == 0:
+            self.longest = max(self.longest, self._run_length(date.fromisoformat(day)))
+
+    def remove(self, day):
+        count = self._days.get(day, 0)
+        if count > 1:
+            self._days[day] = count - 1
+        elif count == 1:
+            run = self._run_length(date.fromisoformat(day))
+            del self._days[day]
+            if run == self.longest:
+                self.longest = self._recompute_longest()
+
+    def _recompute_longest(self):
+        longest = 0
+        for day in self._days:
+            parsed = date.fromisoformat(day)
+            # Рахуємо лише від початку кожної серії
+            if (parsed - timedelta(days=1)).isoformat() not in self._days:
+                longest = max(longest, self._run_length(parsed))
+        return longest
+
+    def current(self, today):
+        """Поточна серія: дні поспіль, що закінчуються сьогодні або вчора."""
+        day = today if today.isoformat() in self._days else today - timedelta(days=1)
+        length = 0
+        while day.isoformat() in self._days:
+            length += 1
+            day -= timedelta(days=1)
+        return length
+
+
+def build_summary(period, buckets, limit, window, totals, current_streak, longest_streak):
+    """
+    Формує відповідь аналітики. buckets — ітератор Bucket від найновішого
+    періоду; використовується не більше limit + window - 1 періодів, тож час
+    відповіді не залежить від довжини історії.
+    """
+    recent = []
+    for bucket in buckets:
+        recent.append(bucket)
+        if len(recent) >= limit + window - 1:
+            break
+
+    rows = []
+    for position, bucket in enumerate(recent[:limit]):
+        averages = [b.weight_sum / b.weight_count for b in recent[position:position + window] if b.weight_count]
+        rows.append({
+            'period': bucket.key,
+            'workouts_completed': bucket.workouts_completed,
+            'training_seconds': bucket.training_seconds,
+            'average_weight': round(bucket.weight_sum / bucket.weight_count, 2) if bucket.weight_count else None,
+            # Ковзне середнє ваги за останні window періодів, у яких були зважування
+            'weight_moving_average': round(sum(averages) / len(averages), 2) if averages else None,
+        })
+
+    return {
+        'period': period,
+        'buckets': rows,
+        'totals': totals,
+        'current_streak': current_streak,
+        'longest_streak': longest_streak,
+    }
@@ -1,31 +1,205 @@
 # app.py
-from flask import Flask, request, jsonify, g
+from flask import Flask, Response, request, jsonify, g
 from flask_cors import CORS
 from datetime import datetime, timedelta
+import atexit
 import jwt
-import uuid
+import os
+import time
 from functools import wraps
 
+from analytics import PERIODS
+from compression import ResponseCompressor
+from database import DATABASE_NAME
+from durable_store import DurableMemoryStore
+from indexes import UniqueConstraintError
+from json_provider import FastJSONProvider
+from metrics import Registry, SamplingProfiler, instrument_store
+from passwords import PasswordHasher
+from reporting import Snapshot, build_report
+from repositories import GLOBAL_SCOPE, TEMPLATE_FIELDS, create_store, owner_scope, template_scope
+from response_cache import ResponseCache, make_etag
+from responses import (NEXT_CURSOR_HEADER, cached_json_response, json_body_response, list_response,
+                       not_modified, wants_stream)
+from token_cache import TokenCache
+
 app = Flask(__name__)
+# Серіалізація відповідей: 'orjson' (якщо пакет встановлено) або стандартний 'json'.
+# Обидва варіанти віддають кирилицю в UTF-8 без екранування \uXXXX.
+app.config['JSON_BACKEND'] = os.environ.get('JSON_BACKEND', 'orjson')
+app.json = FastJSONProvider(app, app.config['JSON_BACKEND'])
 # Дозволяємо CORS для всіх доменів під час розробки.
 # На продакшені варто обмежити домени, наприклад: CORS(app, resources={r"/*": {"origins": "https://yourdomain.com"}})
-CORS(app)
+CORS(app, expose_headers=[NEXT_CURSOR_HEADER])
 
 # Секретний ключ для JWT токенів. В продакшені має бути складним і зберігатися в змінних середовища!
 app.config['SECRET_KEY'] = 'njgcfqnnjhec25njgcfqncnth,fqcnth25'
 
-# --- In-memory "база даних" ---
-# У реальному додатку тут була б база даних (SQLAlchemy, MongoDB тощо)
-users = {}  # {user_id: {id, username, email, password, role}}
-user_progress = {}  # {user_id: [{date, weight, workouts_completed}]}
-workout_templates = {} # {template_id: {id, name, description, exercises: [{name, sets, reps}], is_global, user_id, muscle_groups: []}}
-user_workouts_data = {} # {user_id: [{id, template_id, workout_date, status, name, description, exercises}]}
+# Хешування паролів у пулі процесів. Метод і вартість — у форматі werkzeug
+# (наприклад, 'scrypt:32768:8:1' чи 'pbkdf2:sha256:600000'); після їх зміни хеші
+# оновлюються під час наступного входу користувача. 0 процесів — хешування в потоці запиту.
+# Пул запускається до створення сховища: його процеси створюються через fork, а сховище
+# з журналом (MEMORY_JOURNAL_DIR) одразу запускає фонові потоки.
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+password_hasher = PasswordHasher(app.config['PASSWORD_HASH_METHOD'], app.config['PASSWORD_HASH_WORKERS']).start()
+
+# --- Сховище даних ---
+# 'memory' — дані в пам'яті процесу (для розробки та тестів),
+# 'sqlite' — файл бази даних зі схемою з database.py (дані зберігаються між перезапусками)
+app.config['STORAGE_BACKEND'] = os.environ.get('STORAGE_BACKEND', 'memory')
+app.config['DATABASE_NAME'] = os.environ.get('DATABASE_NAME', DATABASE_NAME)
+# Для 'memory' з MEMORY_JOURNAL_DIR зміни пишуться в журнал у цьому каталозі, а стан відновлюється
+# після перезапуску (durable_store.py). JOURNAL_SYNC_MS=0 — відповідь лише після fsync журналу,
+# інакше журнал скидається на диск у фоні раз на стільки мілісекунд. Знімок стану робиться, коли
+# журнал перевищив SNAPSHOT_JOURNAL_MB або минуло SNAPSHOT_INTERVAL секунд.
+app.config['MEMORY_JOURNAL_DIR'] = os.environ.get('MEMORY_JOURNAL_DIR')
+app.config['JOURNAL_SYNC_MS'] = int(os.environ.get('JOURNAL_SYNC_MS', 0))
+app.config['SNAPSHOT_JOURNAL_MB'] = int(os.environ.get('SNAPSHOT_JOURNAL_MB', 64))
+app.config['SNAPSHOT_INTERVAL'] = int(os.environ.get('SNAPSHOT_INTERVAL', 3600))
+
+store = create_store(app.config['STORAGE_BACKEND'], app.config['DATABASE_NAME'],
+                     journal_dir=app.config['MEMORY_JOURNAL_DIR'],
+                     sync_interval=app.config['JOURNAL_SYNC_MS'] / 1000,
+                     snapshot_bytes=app.config['SNAPSHOT_JOURNAL_MB'] << 20,
+                     snapshot_interval=app.config['SNAPSHOT_INTERVAL'])
+atexit.register(store.close)  # Журнал дописується на диск і під час звичайної зупинки
+users = store.users  # {user_id: {id, username, email, password, role}} + індекси за email та username
+user_progress = store.progress  # {user_id: [{date, weight, workouts_completed}]}, впорядковано за датою
+workout_templates = store.templates # {template_id: {id, name, description, exercises: [{name, sets, reps}], is_global, user_id, muscle_groups: []}}
+user_workouts_data = store.workouts # {user_id: [{id, template_id, workout_date, status, name, description, exercises}]}, впорядковано за датою
+user_analytics = store.analytics  # Агрегати за тижні/місяці та серії для GET /my_analytics
+user_exercises = store.exercises  # Виконані вправи завершених тренувань: історія та рекорди вправ
+
+# --- Метрики (GET /metrics у форматі Prometheus) ---
+# METRICS_TOKEN — якщо задано, /metrics вимагає заголовок "Authorization: Bearer <токен>".
+# METRICS_STORE_TIMINGS=0 вимикає вимірювання операцій сховища.
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+app.config['METRICS_STORE_TIMINGS'] = os.environ.get('METRICS_STORE_TIMINGS', '1') != '0'
+metrics = Registry()
+request_latency = metrics.histogram('http_request_duration_seconds', 'Час обробки запиту', ('method', 'route'))
+request_count = metrics.counter('http_requests_total', 'Кількість запитів', ('method', 'route', 'status'))
+auth_failures = metrics.counter('auth_failures_total', 'Відхилені автентифікації', ('reason',))
+store_latency = metrics.histogram('store_operation_duration_seconds', 'Час операцій сховища',
+                                  ('repository', 'operation'))
+if app.config['METRICS_STORE_TIMINGS']:
+    instrument_store(store, store_latency)
+# Вибірковий профайлер вмикається та вимикається через POST /admin/profiler
+profiler = SamplingProfiler()
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+# Зареєстровано раніше за інші after_request, тож виконується останнім і враховує їхній час
+@app.after_request
+def observe_request(response):
+    started = g.get('request_started')
+    if started is not None:
+        # Шаблон маршруту ('/daily_workouts/<workout_id>'), а не шлях — щоб кількість серій була обмеженою
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        request_latency.observe(time.perf_counter() - started, request.method, route)
+        request_count.inc(request.method, route, str(response.status_code))
+    return response
+
+# Кеш перевірених токенів: повторні запити з тим самим токеном не декодують JWT заново.
+# Записи користувача скидаються при його зміні чи видаленні.
+app.config['TOKEN_CACHE_SIZE'] = int(os.environ.get('TOKEN_CACHE_SIZE', 10000))
+app.config['TOKEN_CACHE_TTL'] = int(os.environ.get('TOKEN_CACHE_TTL', 60))
+token_cache = TokenCache(app.config['TOKEN_CACHE_SIZE'], app.config['TOKEN_CACHE_TTL'])
+users.subscribe(token_cache.invalidate_user)
+
+# Кеш серіалізованих відповідей GET /workout_templates та /workout_templates/<id>.
+# Записи прив'язані до версій шаблонів, тож зміни шаблонів роблять їх недійсними без явного скидання.
+app.config['RESPONSE_CACHE_SIZE'] = int(os.environ.get('RESPONSE_CACHE_SIZE', 1024))
+response_cache = ResponseCache(app.config['RESPONSE_CACHE_SIZE'])
+
+# Стиснення відповідей (brotli, якщо встановлено пакет, або gzip) більших за COMPRESS_MIN_SIZE байтів.
+# Стиснені тіла відповідей з ETag (списки шаблонів) кешуються, тож однакові байти не стискаються повторно.
+app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+app.config['COMPRESS_GZIP_LEVEL'] = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+app.config['COMPRESS_BROTLI_QUALITY'] = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 5))
+app.config['COMPRESS_CACHE_SIZE'] = int(os.environ.get('COMPRESS_CACHE_SIZE', 256))
+compressor = ResponseCompressor(app.config['COMPRESS_MIN_SIZE'], app.config['COMPRESS_GZIP_LEVEL'],
+                                app.config['COMPRESS_BROTLI_QUALITY'],
+                                app.config['COMPRESS_CACHE_SIZE']).init_app(app)
+
+metrics.collector('token_cache', 'Кеш перевірених токенів', token_cache.stats,
+                  {'size': 'gauge', 'hits': 'counter', 'misses': 'counter', 'evictions': 'counter',
+                   'invalidations': 'counter'})
+metrics.collector('response_cache', 'Кеш серіалізованих відповідей', response_cache.stats,
+                  {'size': 'gauge', 'hits': 'counter', 'misses': 'counter'})
+metrics.collector('compression', 'Стиснення відповідей', compressor.stats,
+                  {'cache_size': 'gauge', 'hits': 'counter', 'misses': 'counter', 'bytes_in': 'counter',
+                   'bytes_out': 'counter'})
+if isinstance(store, DurableMemoryStore):
+    # Лічильники журналу скидаються з кожним знімком, тож це gauge
+    metrics.collector('journal', 'Журнал in-memory сховища з останнього знімка', store.stats,
+                      {'records': 'gauge', 'bytes': 'gauge', 'syncs': 'gauge', 'pending': 'gauge'})
 
 # --- Допоміжні функції ---
 
-def generate_unique_id():
-    """Генерує унікальний ID."""
-    return str(uuid.uuid4())
+DATE_FORMAT_MESSAGE = 'Дата має бути у форматі РРРР-ММ-ДД.'
+
+def parse_date(value):
+    """Перевіряє, що дата має формат РРРР-ММ-ДД, і повертає її рядком."""
+    datetime.strptime(value, '%Y-%m-%d')
+    return value
+
+def parse_template_id(value):
+    """
+    Перевіряє template_id з тіла запиту: рядок (in-memory сховище) або ціле число
+    (SQLite). Інші значення, зокрема списки й словники, кидають TypeError.
+    """
+    if isinstance(value, bool) or not isinstance(value, (str, int)):
+        raise TypeError('template_id має бути рядком або цілим числом')
+    return value
+
+def date_range_args():
+    """Повертає межі дат з параметрів from/to запиту (None, якщо межу не задано)."""
+    date_from = request.args.get('from')
+    date_to = request.args.get('to')
+    return (parse_date(date_from) if date_from else None,
+            parse_date(date_to) if date_to else None)
+
+# Обмеження кількості тренувань, які можна додати одним запитом /daily_workouts/bulk
+MAX_BULK_WORKOUTS = 1000
+
+def expand_recurrence(recurrence):
+    """Перетворює правило повторення (дні тижня та діапазон дат) на список дат."""
+    days_of_week = {int(day) for day in recurrence['days_of_week']}
+    if not days_of_week or not days_of_week <= set(range(7)):
+        raise ValueError('Дні тижня мають бути від 0 до 6')
+    current = datetime.strptime(recurrence['start_date'], '%Y-%m-%d').date()
+    end = datetime.strptime(recurrence['end_date'], '%Y-%m-%d').date()
+    dates = []
+    while current <= end and len(dates) <= MAX_BULK_WORKOUTS:
+        if current.weekday() in days_of_week:
+            dates.append(current.strftime('%Y-%m-%d'))
+        current += timedelta(days=1)
+    return dates
+
+def build_daily_workout(user_id, template, workout_date):
+    """Створює запис запланованого тренування на основі шаблону."""
+    # Тренування зберігає стан шаблону на момент створення: сховище або посилається
+    # на незмінний знімок шаблону, або зберігає власну копію вправ.
+    # Це дозволить змінювати шаблон без впливу на вже заплановані тренування
+    return {
+        'user_id': user_id,
+        'template_id': template['id'],
+        'workout_date': workout_date,
+        'date': workout_date, # Для сумісності з фронтендом, який очікує 'date'
+        'status': 'upcoming',
+        'template_name': template['name'], # Зберігаємо назву шаблону
+        'description': template.get('description'),
+        'exercises': template.get('exercises', [])
+    }
+
+def unique_conflict_response(error):
+    """Формує відповідь 409 для зайнятого email або імені користувача."""
+    if error.field == 'email':
+        return jsonify({'message': 'Користувач з таким email вже існує.'}), 409
+    return jsonify({'message': 'Користувач з таким ім\'ям вже існує.'}), 409
 
 # Декоратор для захищених маршрутів
 def token_required(f):
@@ -36,24 +210,31 @@ def token_required(f):
             token = request.headers['x-access-token']
 
         if not token:
+            auth_failures.inc('missing_token')
             return jsonify({'message': 'Токен відсутній!'}), 401
 
+        cached = token_cache.get(token)
+        if cached is not None:
+            g.current_user = cached[1]
+            return f(*args, **kwargs)
+
         try:
             data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-            current_user = None
-            for user_id, user_data in users.items():
-                if user_data['id'] == data['user_id']:
-                    current_user = user_data
-                    break
+            current_user = users.get(data['user_id'])
             if not current_user:
+                auth_failures.inc('unknown_user')
                 return jsonify({'message': 'Користувача не знайдено!'}), 401
             g.current_user = current_user # Зберігаємо поточного користувача в g
+            token_cache.put(token, data, current_user)
         except jwt.ExpiredSignatureError:
+            auth_failures.inc('expired_token')
             return jsonify({'message': 'Токен прострочений!'}), 401
         except jwt.InvalidTokenError:
+            auth_failures.inc('invalid_token')
             return jsonify({'message': 'Недійсний токен!'}), 401
         except Exception as e:
             print(f"Помилка декодування токена: {e}")
+            auth_failures.inc('error')
             return jsonify({'message': 'Недійсний токен або помилка сервера!'}), 401
 
         return f(*args, **kwargs)
@@ -71,62 +252,134 @@ def register():
 
     if not username or not email or not password:
         return jsonify({'message': 'Будь ласка, введіть ім\'я користувача, email та пароль.'}), 400
+    # Email та username — ключі унікальних індексів, а пароль хешується: лише рядки
+    if not all(isinstance(value, str) for value in (username, email, password)):
+        return jsonify({'message': 'Ім\'я користувача, email та пароль мають бути рядками.'}), 400
 
-    # Перевірка, чи користувач вже існує
-    for user_id, user_data in users.items():
-        if user_data['email'] == email:
-            return jsonify({'message': 'Користувач з таким email вже існує.'}), 409
-        if user_data['username'] == username:
-            return jsonify({'message': 'Користувач з таким ім\'ям вже існує.'}), 409
-
-    user_id = generate_unique_id()
     # Перший зареєстрований користувач стає адміном для демонстрації
     role = 'admin' if not users else 'user' 
-    users[user_id] = {'id': user_id, 'username': username, 'email': email, 'password': password, 'role': role}
+    # Перевірка унікальності та резервування email/username відбуваються атомарно
+    try:
+        users.add({'username': username, 'email': email, 'password': password_hasher.hash(password), 'role': role})
+    except UniqueConstraintError as e:
+        return unique_conflict_response(e)
     print(f"DEBUG: Зареєстровано нового користувача: {username} з роллю {role}")
     return jsonify({'message': 'Реєстрація успішна!'}), 201
 
 @app.route('/login', methods=['POST'])
 def login():
-    # ! ЗМІНА ТУТ: email замість username
-    email = request.json.get('email', None)
-    password = request.json.get('password', None)
-
-    # Твоя логіка перевірки користувача
-    # Використовуй email для перевірки, наприклад:
-    if email == "admin" and password == "admin":
-        access_token = create_access_token(identity=email, expires_delta=timedelta(hours=24)) # Використовуй email як ідентифікатор
-        return jsonify(access_token=access_token, message="Вхід успішний!"), 200
-    elif email == "user" and password == "user":
-        access_token = create_access_token(identity=email, expires_delta=timedelta(hours=24))
-        return jsonify(access_token=access_token, message="Вхід успішний!"), 200
-    return jsonify({"message": "Невірний email або пароль."}), 401 # ! Повернули назад email
+    data = request.get_json()
+    email = data.get('email')
+    password = data.get('password')
+    # Хешування та порівняння паролів, як і пошук за email в індексі, працюють лише з рядками
+    if any(value is not None and not isinstance(value, str) for value in (email, password)):
+        return jsonify({'message': 'Email та пароль мають бути рядками.'}), 400
+
+    user = users.get_by_email(email)
+    if not user or not password:
+        auth_failures.inc('invalid_credentials')
+        return jsonify({'message': 'Невірний email або пароль.'}), 401
+    matches, new_hash = password_hasher.verify(user['password'], password)
+    if not matches:
+        auth_failures.inc('invalid_credentials')
+        return jsonify({'message': 'Невірний email або пароль.'}), 401
+    if new_hash is not None:
+        # Пароль збережено відкритим текстом або з іншими параметрами хешування
+        users.set_password(user['id'], new_hash)
+
+    access_token = jwt.encode(
+        {'user_id': user['id'], 'exp': datetime.utcnow() + timedelta(hours=24)},
+        app.config['SECRET_KEY'],
+        algorithm='HS256'
+    )
+    return jsonify(access_token=access_token, message='Вхід успішний!'), 200
+
+@app.route('/admin/token_cache', methods=['GET'])
+@token_required
+def get_token_cache_stats():
+    if g.current_user['role'] != 'admin':
+        return jsonify({'message': 'У вас немає дозволу на перегляд статистики.'}), 403
+    # Розмір кешу, кількість влучань/промахів та частка влучань
+    return jsonify(token_cache.stats()), 200
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    token = app.config['METRICS_TOKEN']
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return jsonify({'message': 'Недійсний токен метрик.'}), 401
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+# Межі інтервалу вибірки профайлера, мілісекунди
+PROFILER_INTERVAL_MS = (1, 1000)
+
+@app.route('/admin/profiler', methods=['GET'])
+@token_required
+def get_profiler():
+    """Стан профайлера та найчастіші стеки; format=collapsed — усі стеки для flamegraph.pl."""
+    if g.current_user['role'] != 'admin':
+        return jsonify({'message': 'У вас немає дозволу на перегляд статистики.'}), 403
+    if request.args.get('format') == 'collapsed':
+        return Response(profiler.collapsed(), mimetype='text/plain')
+    return jsonify(profiler.stats()), 200
+
+@app.route('/admin/profiler', methods=['POST'])
+@token_required
+def set_profiler():
+    """Вмикає ({"enabled": true, "interval_ms": 10}) чи вимикає профайлер; "reset": true очищує стеки."""
+    if g.current_user['role'] != 'admin':
+        return jsonify({'message': 'У вас немає дозволу на керування профайлером.'}), 403
+    data = request.get_json(silent=True) or {}
+    interval_ms = data.get('interval_ms', profiler.interval * 1000)
+    low, high = PROFILER_INTERVAL_MS
+    if isinstance(interval_ms, bool) or not isinstance(interval_ms, (int, float)) or not low <= interval_ms <= high:
+        return jsonify({'message': f'interval_ms має бути від {low} до {high}.'}), 400
+    if data.get('reset'):
+        profiler.reset()
+    if data.get('enabled') is True:
+        profiler.start(interval_ms / 1000)
+    elif data.get('enabled') is False:
+        profiler.stop()
+    return jsonify(profiler.stats(limit=0)), 200
+
+@app.route('/admin/compression', methods=['GET'])
+@token_required
+def get_compression_stats():
+    if g.current_user['role'] != 'admin':
+        return jsonify({'message': 'У вас немає дозволу на перегляд статистики.'}), 403
+    # Кеш стиснених відповідей і скільки байтів зекономлено стисненням
+    return jsonify(compressor.stats()), 200
 
-@app.route('/register', methods=['POST'])
-def register():
-    # ! ЗМІНА ТУТ: email замість username
-    email = request.json.get('email', None)
-    password = request.json.get('password', None)
-    # ... (твоя логіка реєстрації з використанням email) ...
-    # Наприклад:
-    # if email and password:
-    #     # Додай нового користувача в базу даних
-    #     return jsonify({"message": "Реєстрація успішна!"}), 201
-    return jsonify({"message": "Реєстрація не вдалася."}), 400
-
-# ! Важливо: Також переконайся, що 'identity' для get_jwt_identity() використовує email,
-# ! якщо ти створюєш токен з email.
-@app.route('/my_profile_data', methods=['GET'])
-@jwt_required()
-def my_profile_data():
-    current_user_email = get_jwt_identity() # Отримуємо email з токена
-    # ... (поверни дані профілю, пов'язані з current_user_email) ...
-    return jsonify({
-        "username": current_user_email.split('@')[0], # Простий username з email
-        "email": current_user_email,
-        "role": "admin" if current_user_email == "admin" else "user",
-        "id": 1 # Для прикладу
-    }), 200
+@app.route('/admin/journal', methods=['GET'])
+@token_required
+def get_journal_stats():
+    if g.current_user['role'] != 'admin':
+        return jsonify({'message': 'У вас немає дозволу на перегляд статистики.'}), 403
+    # Журнал і знімки in-memory сховища (див. MEMORY_JOURNAL_DIR), останній знімок і відновлення під час запуску
+    if not isinstance(store, DurableMemoryStore):
+        return jsonify({'enabled': False}), 200
+    return jsonify(dict(store.stats(), enabled=True)), 200
+
+@app.route('/admin/reports', methods=['GET'])
+@token_required
+def get_admin_report():
+    """
+    Статистика платформи за період from/to: активні користувачі за днями,
+    найчастіше заплановані шаблони (top, за замовчуванням 10), частка завершених тренувань.
+    """
+    if g.current_user['role'] != 'admin':
+        return jsonify({'message': 'У вас немає дозволу на перегляд звітів.'}), 403
+    try:
+        date_from, date_to = date_range_args()
+    except ValueError:
+        return jsonify({'message': DATE_FORMAT_MESSAGE}), 400
+    top = request.args.get('top', 10, type=int)
+
+    # Дані знімаються в колонки один раз, а всі агрегати рахуються по масивах
+    report = build_report(Snapshot.take(store), date_from, date_to, max(1, min(top, 100)))
+    for item in report['top_templates']:
+        template = workout_templates.get(item['template_id'])
+        item['name'] = template['name'] if template else None
+    return jsonify(report), 200
 
 # --- Маршрути для профілю користувача ---
 
@@ -151,17 +404,14 @@ def update_my_profile_data():
 
     if not new_username or not new_email:
         return jsonify({'message': 'Ім\'я користувача та email не можуть бути порожніми.'}), 400
+    if not isinstance(new_username, str) or not isinstance(new_email, str):
+        return jsonify({'message': 'Ім\'я користувача та email мають бути рядками.'}), 400
 
     # Перевірка унікальності нового email/username (крім поточного користувача)
-    for uid, udata in users.items():
-        if uid != user_id:
-            if udata['email'] == new_email:
-                return jsonify({'message': 'Користувач з таким email вже існує.'}), 409
-            if udata['username'] == new_username:
-                return jsonify({'message': 'Користувач з таким ім\'ям вже існує.'}), 409
-
-    users[user_id]['username'] = new_username
-    users[user_id]['email'] = new_email
+    try:
+        users.update_profile(user_id, new_username, new_email)
+    except UniqueConstraintError as e:
+        return unique_conflict_response(e)
     return jsonify({'message': 'Дані профілю успішно оновлено!'}), 200
 
 # --- Маршрути для прогресу користувача ---
@@ -170,11 +420,17 @@ def update_my_profile_data():
 @token_required
 def get_my_progress():
     user_id = g.current_user['id']
-    # Повертаємо прогрес для поточного користувача, сортуємо за датою
-    progress = user_progress.get(user_id, [])
-    # Сортуємо від найновіших до найстаріших
-    sorted_progress = sorted(progress, key=lambda x: x['date'], reverse=True)
-    return jsonify(sorted_progress), 200
+    try:
+        date_from, date_to = date_range_args()
+    except ValueError:
+        return jsonify({'message': DATE_FORMAT_MESSAGE}), 400
+    # Повертаємо прогрес для поточного користувача від найновіших до найстаріших
+    # (з підтримкою limit/cursor та потокової відповіді, див. responses.list_response)
+    return list_response(
+        lambda after, limit: user_progress.iter_for_user(user_id, after, limit, date_from, date_to),
+        user_progress.page_key,
+        user_progress.page_key_shape
+    )
 
 @app.route('/my_progress', methods=['POST'])
 @token_required
@@ -185,67 +441,150 @@ def add_my_progress():
     
     if weight is None:
         return jsonify({'message': 'Вага є обов\'язковим полем.'}), 400
-    
+    # Перевіряємо до транзакції: in-memory сховище не відкочує вже збережену вагу,
+    # а агрегати аналітики додають і віднімають її як число
+    if isinstance(weight, bool) or not isinstance(weight, (int, float)):
+        return jsonify({'message': 'Вага має бути числом.'}), 400
+
     today_date = datetime.now().strftime('%Y-%m-%d')
     
-    # Перевіряємо, чи вже є запис за сьогодні
-    if user_id not in user_progress:
-        user_progress[user_id] = []
-    
-    # Шукаємо і оновлюємо запис за сьогодні, якщо він існує
-    found = False
-    for entry in user_progress[user_id]:
-        if entry['date'] == today_date:
-            entry['weight'] = weight
-            entry['workouts_completed'] = entry.get('workouts_completed', 0) # Зберігаємо існуючі завершені тренування
-            found = True
-            break
-    
-    if not found:
-        user_progress[user_id].append({
-            'date': today_date,
-            'weight': weight,
-            'workouts_completed': 0 # Початкове значення
-        })
+    # Оновлюємо запис за сьогодні, якщо він існує (зберігаючи кількість завершених тренувань),
+    # інакше створюємо новий. Агрегати аналітики оновлюються в тій самій транзакції.
+    with store.transaction(user_id):
+        previous_weight = user_progress.save_weight(user_id, today_date, weight)
+        user_analytics.record_weight(user_id, today_date, previous_weight, weight)
     
     return jsonify({'message': 'Прогрес успішно збережено!'}), 200
 
+# Скільки останніх періодів можна запросити в GET /my_analytics
+MAX_ANALYTICS_BUCKETS = 104
+
+@app.route('/my_analytics', methods=['GET'])
+@token_required
+def get_my_analytics():
+    """
+    Аналітика прогресу з попередньо обчислених агрегатів:
+      period — 'week' (за замовчуванням) або 'month';
+      limit  — скільки останніх періодів повернути (за замовчуванням 12);
+      window — за скільки періодів рахувати ковзне середнє ваги (за замовчуванням 4).
+    """
+    user_id = g.current_user['id']
+    period = request.args.get('period', 'week')
+    if period not in PERIODS:
+        return jsonify({'message': "Період має бути 'week' або 'month'."}), 400
+    try:
+        limit = int(request.args.get('limit', 12))
+        window = int(request.args.get('window', 4))
+        if not (1 <= limit <= MAX_ANALYTICS_BUCKETS and 1 <= window <= MAX_ANALYTICS_BUCKETS):
+            raise ValueError
+    except ValueError:
+        return jsonify({'message': f'limit та window мають бути від 1 до {MAX_ANALYTICS_BUCKETS}.'}), 400
+
+    return jsonify(user_analytics.summary(user_id, period, limit, window, datetime.now().date())), 200
+
+# --- Маршрути для історії вправ ---
+
+@app.route('/my_exercises', methods=['GET'])
+@token_required
+def get_my_exercises():
+    # Вправи із завершених тренувань: назва, кількість виконань і дата останнього
+    return jsonify(user_exercises.list_for_user(g.current_user['id'])), 200
+
+@app.route('/my_exercises/history', methods=['GET'])
+@token_required
+def get_exercise_history():
+    """Виконання вправи name (підходи, найбільша вага, об'єм) від найновіших до найстаріших."""
+    user_id = g.current_user['id']
+    name = request.args.get('name')
+    if not name:
+        return jsonify({'message': 'Вкажіть назву вправи в параметрі name.'}), 400
+    try:
+        date_from, date_to = date_range_args()
+    except ValueError:
+        return jsonify({'message': DATE_FORMAT_MESSAGE}), 400
+    return list_response(
+        lambda after, limit: user_exercises.iter_history(user_id, name, after, limit, date_from, date_to),
+        user_exercises.page_key,
+        user_exercises.page_key_shape
+    )
+
+@app.route('/my_exercises/records', methods=['GET'])
+@token_required
+def get_exercise_records():
+    """Особисті рекорди вправи name: найважчий підхід, найбільше повторень, найбільший об'єм."""
+    name = request.args.get('name')
+    if not name:
+        return jsonify({'message': 'Вкажіть назву вправи в параметрі name.'}), 400
+    records = user_exercises.records(g.current_user['id'], name)
+    if records is None:
+        return jsonify({'message': 'Немає завершених тренувань з цією вправою.'}), 404
+    return jsonify(records), 200
+
+@app.route('/my_exercises/stats', methods=['GET'])
+@token_required
+def get_exercise_stats():
+    """
+    Показники вправи name з індексу, що оновлюється під час завершення та скидання
+    тренувань: найбільша вага, оцінений 1ПМ (за формулою Еплі) та об'єм за останні
+    weeks тижнів (за замовчуванням 12), від найновішого тижня.
+    """
+    name = request.args.get('name')
+    if not name:
+        return jsonify({'message': 'Вкажіть назву вправи в параметрі name.'}), 400
+    try:
+        weeks = int(request.args.get('weeks', 12))
+        if not 1 <= weeks <= MAX_ANALYTICS_BUCKETS:
+            raise ValueError
+    except ValueError:
+        return jsonify({'message': f'weeks має бути від 1 до {MAX_ANALYTICS_BUCKETS}.'}), 400
+    stats = user_exercises.stats(g.current_user['id'], name, weeks)
+    if stats is None:
+        return jsonify({'message': 'Немає завершених тренувань з цією вправою.'}), 404
+    return jsonify(stats), 200
+
 # --- Маршрути для шаблонів тренувань ---
 
 @app.route('/workout_templates', methods=['GET'])
 @token_required
 def get_workout_templates():
     user_id = g.current_user['id']
-    muscle_group_filter = request.args.get('muscle_group')
-    goal_filter = request.args.get('goal')
-    difficulty_filter = request.args.get('difficulty')
-    equipment_filter = request.args.getlist('equipment') # getlist для множинних значень
-    duration_category_filter = request.args.get('duration_category')
-
-    filtered_templates = []
-    for template_id, template_data in workout_templates.items():
-        # Шаблони доступні, якщо вони глобальні або створені поточним користувачем
-        is_accessible = template_data.get('is_global', False) or template_data.get('user_id') == user_id
-        
-        if is_accessible:
-            match = True
-            if muscle_group_filter and muscle_group_filter not in template_data.get('muscle_groups', []):
-                match = False
-            if goal_filter and template_data.get('goal') != goal_filter:
-                match = False
-            if difficulty_filter and template_data.get('difficulty') != difficulty_filter:
-                match = False
-            if equipment_filter:
-                # Перевіряємо, чи всі вибрані елементи обладнання присутні в шаблоні
-                if not all(eq in template_data.get('equipment', []) for eq in equipment_filter):
-                    match = False
-            if duration_category_filter and template_data.get('duration_category') != duration_category_filter:
-                match = False
-
-            if match:
-                filtered_templates.append(template_data)
-    
-    return jsonify(filtered_templates), 200
+    filters = {
+        'muscle_group': request.args.get('muscle_group'),
+        'goal': request.args.get('goal'),
+        'difficulty': request.args.get('difficulty'),
+        'equipment': request.args.getlist('equipment'), # getlist для множинних значень
+        'duration_category': request.args.get('duration_category'),
+    }
+
+    # Шаблони доступні, якщо вони глобальні або створені поточним користувачем
+    def build():
+        # Глобальні шаблони серіалізуються один раз на версію (див. FastJSONProvider.preserialized)
+        global_version = workout_templates.versions([GLOBAL_SCOPE])
+
+        def fragment(template):
+            if not template.get('is_global'):
+                return template
+            return app.json.preserialized(template['id'], global_version, template)
+
+        return list_response(
+            lambda after, limit: workout_templates.iter_accessible(user_id, filters, after, limit),
+            workout_templates.page_key,
+            workout_templates.page_key_shape,
+            fragment
+        )
+
+    if wants_stream(): # Потокові відповіді не кешуються
+        return build()
+
+    # Користувачі без власних шаблонів бачать лише глобальні, тож ділять один запис кешу
+    personal = workout_templates.has_personal(user_id)
+    scopes = [GLOBAL_SCOPE, owner_scope(user_id)] if personal else [GLOBAL_SCOPE]
+    filter_key = tuple(sorted((name, tuple(value) if isinstance(value, list) else value)
+                              for name, value in filters.items()))
+    key = ('workout_templates', user_id if personal else None, filter_key,
+           request.args.get('limit'), request.args.get('cursor'))
+    return cached_json_response(response_cache, key, 'templates',
+                                lambda: workout_templates.versions(scopes), build)
 
 @app.route('/workout_templates', methods=['POST'])
 @token_required
@@ -269,10 +608,11 @@ def add_workout_template():
 
     if not name:
         return jsonify({'message': 'Назва шаблону є обов\'язковою.'}), 400
+    # Вправи знімка шаблону зберігаються як список; рядок розібрався б на окремі символи
+    if exercises is not None and not isinstance(exercises, list):
+        return jsonify({'message': 'Вправи мають бути списком.'}), 400
 
-    template_id = generate_unique_id()
-    workout_templates[template_id] = {
-        'id': template_id,
+    workout_templates.add({
         'name': name,
         'description': description,
         'exercises': exercises,
@@ -283,23 +623,44 @@ def add_workout_template():
         'difficulty': difficulty,
         'equipment': equipment,
         'duration_category': duration_category
-    }
+    })
     return jsonify({'message': 'Шаблон тренування успішно створено!'}), 201
 
 @app.route('/workout_templates/<template_id>', methods=['GET'])
 @token_required
 def get_workout_template(template_id):
     user_id = g.current_user['id']
-    template = workout_templates.get(template_id)
-
-    if not template:
-        return jsonify({'message': 'Шаблон тренування не знайдено.'}), 404
+    key = ('workout_template', template_id)
+    etag = make_etag('template', workout_templates.versions([template_scope(template_id)]))
+
+    # У кеші разом із тілом зберігаються is_global та власник — для перевірки доступу без читання шаблону
+    cached = response_cache.get(key, etag)
+    if cached is not None:
+        body, headers, (is_global, owner_id) = cached
+        template = None
+    else:
+        template = workout_templates.get(template_id)
+        if not template:
+            return jsonify({'message': 'Шаблон тренування не знайдено.'}), 404
+        is_global, owner_id = template.get('is_global', False), template.get('user_id')
     
     # Перевірка доступу: глобальний шаблон або створений поточним користувачем
-    if not (template.get('is_global', False) or template.get('user_id') == user_id):
+    if not (is_global or owner_id == user_id):
         return jsonify({'message': 'У вас немає дозволу на перегляд цього шаблону.'}), 403
 
-    return jsonify(template), 200
+    response = not_modified(etag)
+    if response is not None:
+        return response
+    if template is None:
+        return json_body_response(body, etag, headers)
+
+    response = jsonify(template)
+    # Кешуємо лише під канонічним ID і якщо шаблон не змінився, поки ми його читали
+    if str(template['id']) == template_id and \
+            make_etag('template', workout_templates.versions([template_scope(template_id)])) == etag:
+        response_cache.put(key, etag, response.get_data(), data=(is_global, owner_id))
+        response.set_etag(etag)
+    return response, 200
 
 @app.route('/workout_templates/<template_id>', methods=['PUT'])
 @token_required
@@ -316,15 +677,10 @@ def update_workout_template(template_id):
         return jsonify({'message': 'У вас немає дозволу на редагування цього шаблону.'}), 403
 
     data = request.get_json()
-    template['name'] = data.get('name', template['name'])
-    template['description'] = data.get('description', template.get('description'))
-    template['exercises'] = data.get('exercises', template['exercises'])
-    template['is_global'] = data.get('is_global', template.get('is_global', False))
-    template['muscle_groups'] = data.get('muscle_groups', template.get('muscle_groups', []))
-    template['goal'] = data.get('goal', template.get('goal'))
-    template['difficulty'] = data.get('difficulty', template.get('difficulty'))
-    template['equipment'] = data.get('equipment', template.get('equipment', []))
-    template['duration_category'] = data.get('duration_category', template.get('duration_category'))
+    if data.get('exercises') is not None and not isinstance(data['exercises'], list):
+        return jsonify({'message': 'Вправи мають бути списком.'}), 400
+    # Оновлюємо лише ті поля, які передав клієнт
+    workout_templates.update(template_id, {field: data[field] for field in TEMPLATE_FIELDS if field in data})
 
     return jsonify({'message': 'Шаблон тренування успішно оновлено!'}), 200
 
@@ -342,8 +698,7 @@ def delete_workout_template(template_id):
     if role != 'admin' and not (template.get('user_id') == user_id and not template.get('is_global', False)):
         return jsonify({'message': 'У вас немає дозволу на видалення цього шаблону.'}), 403
 
-    if template_id in workout_templates:
-        del workout_templates[template_id]
+    if workout_templates.delete(template_id):
         return jsonify({'message': 'Шаблон тренування успішно видалено!'}), 200
     return jsonify({'message': 'Шаблон тренування не знайдено.'}), 404
 
@@ -354,10 +709,16 @@ def delete_workout_template(template_id):
 @token_required
 def get_daily_workouts():
     user_id = g.current_user['id']
-    workouts = user_workouts_data.get(user_id, [])
-    # Сортуємо від найновіших до найстаріших
-    sorted_workouts = sorted(workouts, key=lambda x: x['date'], reverse=True)
-    return jsonify(sorted_workouts), 200
+    try:
+        date_from, date_to = date_range_args()
+    except ValueError:
+        return jsonify({'message': DATE_FORMAT_MESSAGE}), 400
+    # Від найновіших до найстаріших
+    return list_response(
+        lambda after, limit: user_workouts_data.iter_for_user(user_id, after, limit, date_from, date_to),
+        user_workouts_data.page_key,
+        user_workouts_data.page_key_shape
+    )
 
 @app.route('/daily_workouts', methods=['POST'])
 @token_required
@@ -370,6 +731,12 @@ def add_daily_workout():
     if not template_id or not workout_date:
         return jsonify({'message': 'ID шаблону та дата є обов\'язковими.'}), 400
 
+    # Тренування зберігаються впорядкованими за датою, тож вона має бути у єдиному форматі
+    try:
+        parse_date(workout_date)
+    except (TypeError, ValueError):
+        return jsonify({'message': DATE_FORMAT_MESSAGE}), 400
+
     template = workout_templates.get(template_id)
     if not template:
         return jsonify({'message': 'Шаблон тренування не знайдено.'}), 404
@@ -378,34 +745,61 @@ def add_daily_workout():
     if not (template.get('is_global', False) or template.get('user_id') == user_id):
         return jsonify({'message': 'У вас немає дозволу на використання цього шаблону.'}), 403
 
-    daily_workout_id = generate_unique_id()
-    
-    # Копіюємо дані з шаблону, щоб зберегти стан тренування на момент його створення
-    # Це дозволить змінювати шаблон без впливу на вже заплановані тренування
-    new_daily_workout = {
-        'id': daily_workout_id,
-        'user_id': user_id,
-        'template_id': template_id,
-        'workout_date': workout_date,
-        'date': workout_date, # Для сумісності з фронтендом, який очікує 'date'
-        'status': 'upcoming',
-        'template_name': template['name'], # Зберігаємо назву шаблону
-        'description': template.get('description'),
-        'exercises': template.get('exercises', [])[:] # Копіюємо список вправ
-    }
+    created = user_workouts_data.add(build_daily_workout(user_id, template, workout_date))
 
-    if user_id not in user_workouts_data:
-        user_workouts_data[user_id] = []
-    user_workouts_data[user_id].append(new_daily_workout)
+    return jsonify({'message': 'Тренування успішно додано до графіку!', 'id': created['id']}), 201
 
-    return jsonify({'message': 'Тренування успішно додано до графіку!'}), 201
+@app.route('/daily_workouts/bulk', methods=['POST'])
+@token_required
+def add_daily_workouts_bulk():
+    """
+    Додає до графіку багато тренувань одним запитом. Формат тіла — один з двох:
+      {"template_id": ..., "recurrence": {"days_of_week": [0, 2, 4], "start_date": "2025-07-01", "end_date": "2025-09-22"}}
+        (дні тижня: 0 — понеділок, ..., 6 — неділя);
+      {"workouts": [{"template_id": ..., "date": "2025-07-01"}, ...]}.
+    Усі тренування додаються в одній транзакції; повертаються їхні ID.
+    """
+    user_id = g.current_user['id']
+    data = request.get_json()
+
+    try:
+        if 'recurrence' in data:
+            template_id = parse_template_id(data.get('template_id'))
+            items = [(template_id, workout_date) for workout_date in expand_recurrence(data['recurrence'])]
+        else:
+            items = [(parse_template_id(item.get('template_id')), parse_date(item.get('date')))
+                     for item in data.get('workouts', [])]
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return jsonify({'message': 'Некоректний формат запиту: потрібні template_id та дати у форматі РРРР-ММ-ДД.'}), 400
+
+    if not items:
+        return jsonify({'message': 'Немає тренувань для додавання.'}), 400
+    if len(items) > MAX_BULK_WORKOUTS:
+        return jsonify({'message': f'За один запит можна додати не більше {MAX_BULK_WORKOUTS} тренувань.'}), 400
+
+    # Кожен шаблон завантажується та перевіряється лише один раз
+    templates = {}
+    for template_id, _ in items:
+        if template_id in templates:
+            continue
+        template = workout_templates.get(template_id) if template_id else None
+        if not template:
+            return jsonify({'message': f'Шаблон тренування не знайдено: {template_id}.'}), 404
+        if not (template.get('is_global', False) or template.get('user_id') == user_id):
+            return jsonify({'message': f'У вас немає дозволу на використання шаблону {template_id}.'}), 403
+        templates[template_id] = template
+
+    created = user_workouts_data.add_many(
+        [build_daily_workout(user_id, templates[template_id], workout_date) for template_id, workout_date in items]
+    )
+    return jsonify({'message': 'Тренування успішно додано до графіку!',
+                    'ids': [workout['id'] for workout in created]}), 201
 
 @app.route('/daily_workouts/<workout_id>', methods=['GET'])
 @token_required
 def get_daily_workout(workout_id):
     user_id = g.current_user['id']
-    workouts = user_workouts_data.get(user_id, [])
-    workout = next((w for w in workouts if w['id'] == workout_id), None)
+    workout = user_workouts_data.get(user_id, workout_id)
     
     if not workout:
         return jsonify({'message': 'Тренування не знайдено.'}), 404
@@ -419,36 +813,27 @@ def complete_daily_workout(workout_id):
     data = request.get_json()
     actual_exercises = data.get('exercises', [])
     duration_seconds = data.get('duration_seconds', 0)
+    # Фактичні вправи порівнюються зі знімком шаблону поелементно
+    if actual_exercises is not None and not isinstance(actual_exercises, list):
+        return jsonify({'message': 'Вправи мають бути списком.'}), 400
+    if isinstance(duration_seconds, bool) or not isinstance(duration_seconds, (int, float)) or duration_seconds < 0:
+        return jsonify({'message': 'Тривалість має бути невід\'ємним числом секунд.'}), 400
 
-    workouts = user_workouts_data.get(user_id, [])
-    workout = next((w for w in workouts if w['id'] == workout_id), None)
+    with store.transaction(user_id):
+        workout = user_workouts_data.get(user_id, workout_id)
 
-    if not workout:
-        return jsonify({'message': 'Тренування не знайдено.'}), 404
-    
-    if workout['status'] == 'completed':
-        return jsonify({'message': 'Тренування вже завершено.'}), 400
-
-    workout['status'] = 'completed'
-    workout['exercises'] = actual_exercises # Оновлюємо вправи з фактичними даними
-    workout['duration_seconds'] = duration_seconds # Зберігаємо тривалість
-
-    # Оновлюємо прогрес користувача: збільшуємо кількість завершених тренувань за цей день
-    workout_date = workout['date']
-    if user_id in user_progress:
-        found_progress = False
-        for entry in user_progress[user_id]:
-            if entry['date'] == workout_date:
-                entry['workouts_completed'] = entry.get('workouts_completed', 0) + 1
-                found_progress = True
-                break
-        if not found_progress:
-            # Якщо запису прогресу за цей день не було, створюємо новий
-            user_progress[user_id].append({
-                'date': workout_date,
-                'weight': None, # Вага може бути не вказана
-                'workouts_completed': 1
-            })
+        if not workout:
+            return jsonify({'message': 'Тренування не знайдено.'}), 404
+        
+        if workout['status'] == 'completed':
+            return jsonify({'message': 'Тренування вже завершено.'}), 400
+
+        # Оновлюємо вправи з фактичними даними та зберігаємо тривалість
+        user_workouts_data.mark_completed(user_id, workout_id, actual_exercises, duration_seconds)
+
+        # Оновлюємо прогрес користувача: збільшуємо кількість завершених тренувань за цей день
+        user_progress.record_completed(user_id, workout['date'])
+        user_analytics.record_completed(user_id, workout['date'], duration_seconds)
 
     return jsonify({'message': 'Тренування успішно завершено!'}), 200
 
@@ -456,33 +841,22 @@ def complete_daily_workout(workout_id):
 @token_required
 def reset_daily_workout_status(workout_id):
     user_id = g.current_user['id']
-    workouts = user_workouts_data.get(user_id, [])
-    workout = next((w for w in workouts if w['id'] == workout_id), None)
+    with store.transaction(user_id):
+        workout = user_workouts_data.get(user_id, workout_id)
 
-    if not workout:
-        return jsonify({'message': 'Тренування не знайдено.'}), 404
-    
-    if workout['status'] == 'upcoming':
-        return jsonify({'message': 'Тренування вже має статус "заплановано".'}), 400
-
-    workout['status'] = 'upcoming'
-    # Опціонально: очистити фактичні дані про виконання
-    for exercise in workout['exercises']:
-        if 'actual_weight' in exercise:
-            del exercise['actual_weight']
-        if 'actual_sets_reps' in exercise:
-            del exercise['actual_sets_reps']
-    if 'duration_seconds' in workout:
-        del workout['duration_seconds']
-
-    # Зменшуємо кількість завершених тренувань у прогресі за цей день
-    workout_date = workout['date']
-    if user_id in user_progress:
-        for entry in user_progress[user_id]:
-            if entry['date'] == workout_date:
-                if entry.get('workouts_completed', 0) > 0:
-                    entry['workouts_completed'] -= 1
-                break
+        if not workout:
+            return jsonify({'message': 'Тренування не знайдено.'}), 404
+        
+        if workout['status'] == 'upcoming':
+            return jsonify({'message': 'Тренування вже має статус "заплановано".'}), 400
+
+        # Повертаємо статус і очищаємо фактичні дані про виконання
+        user_workouts_data.mark_upcoming(user_id, workout_id)
+
+        # Зменшуємо кількість завершених тренувань у прогресі за цей день
+        user_progress.revert_completed(user_id, workout['date'])
+        if workout['status'] == 'completed':
+            user_analytics.revert_completed(user_id, workout['date'], workout.get('duration_seconds'))
 
     return jsonify({'message': 'Статус тренування успішно скинуто на "заплановано"!'}), 200
 
@@ -490,16 +864,15 @@ def reset_daily_workout_status(workout_id):
 @token_required
 def delete_daily_workout(workout_id):
     user_id = g.current_user['id']
-    
-    if user_id not in user_workouts_data:
-        return jsonify({'message': 'Тренування не знайдено.'}), 404
-
-    initial_len = len(user_workouts_data[user_id])
-    user_workouts_data[user_id] = [w for w in user_workouts_data[user_id] if w['id'] != workout_id]
-    
-    if len(user_workouts_data[user_id]) < initial_len:
-        return jsonify({'message': 'Тренування успішно видалено!'}), 200
-    return jsonify({'message': 'Тренування не знайдено.'}), 404
+    with store.transaction(user_id):
+        workout = user_workouts_data.get(user_id, workout_id)
+        if not workout or not user_workouts_data.delete(user_id, workout_id):
+            return jsonify({'message': 'Тренування не знайдено.'}), 404
+        # Завершене тренування більше не рахується в аналітиці (як після reset_status).
+        # Лічильник workouts_completed у прогресі за день, як і раніше, не змінюється.
+        if workout['status'] == 'completed':
+            user_analytics.revert_completed(user_id, workout['date'], workout.get('duration_seconds'))
+    return jsonify({'message': 'Тренування успішно видалено!'}), 200
 
 
 # НОВИЙ ЕНДПОІНТ: Скидання всіх даних користувача
@@ -508,15 +881,17 @@ def delete_daily_workout(workout_id):
 def reset_my_data():
     user_id = g.current_user['id']
     
-    # Видаляємо прогрес користувача
-    if user_id in user_progress:
-        del user_progress[user_id]
-        print(f"DEBUG: Прогрес користувача {user_id} скинуто.")
-    
-    # Видаляємо всі заплановані/виконані тренування користувача
-    if user_id in user_workouts_data:
-        del user_workouts_data[user_id]
-        print(f"DEBUG: Тренування користувача {user_id} скинуто.")
+    # Усе скидається однією транзакцією, щоб паралельний запит не залишив частину даних
+    with store.transaction(user_id):
+        # Видаляємо прогрес користувача
+        if user_progress.delete_for_user(user_id):
+            print(f"DEBUG: Прогрес користувача {user_id} скинуто.")
+        
+        # Видаляємо всі заплановані/виконані тренування користувача
+        if user_workouts_data.delete_for_user(user_id):
+            print(f"DEBUG: Тренування користувача {user_id} скинуто.")
+
+        user_analytics.delete_for_user(user_id)
 
     # Примітка: Шаблони тренувань (workout_templates) не видаляються,
     # оскільки вони можуть бути глобальними або особистими, які користувач
@@ -529,19 +904,13 @@ def reset_my_data():
 # --- Ініціалізація тестових даних (видаліть на продакшені) ---
 def initialize_test_data():
     if not users: # Додаємо тестових користувачів лише якщо їх немає
-        admin_id = generate_unique_id()
-        user_id_1 = generate_unique_id()
-        user_id_2 = generate_unique_id()
-
-        users[admin_id] = {'id': admin_id, 'username': 'admin', 'email': 'admin@example.com', 'password': 'admin', 'role': 'admin'}
-        users[user_id_1] = {'id': user_id_1, 'username': 'user1', 'email': 'user1@example.com', 'password': 'pass1', 'role': 'user'}
-        users[user_id_2] = {'id': user_id_2, 'username': 'user2', 'email': 'user2@example.com', 'password': 'pass2', 'role': 'user'}
+        users.add({'username': 'admin', 'email': 'admin@example.com', 'password': password_hasher.hash('admin'), 'role': 'admin'})
+        users.add({'username': 'user1', 'email': 'user1@example.com', 'password': password_hasher.hash('pass1'), 'role': 'user'})
+        users.add({'username': 'user2', 'email': 'user2@example.com', 'password': password_hasher.hash('pass2'), 'role': 'user'})
         print("DEBUG: Додано тестових користувачів.")
 
     if not workout_templates: # Додаємо тестові шаблони тренувань лише якщо їх немає
-        template_id_1 = generate_unique_id()
-        workout_templates[template_id_1] = {
-            'id': template_id_1,
+        workout_templates.add({
             'name': 'Тренування для грудей та трицепсів',
             'description': 'Комплексне тренування для розвитку грудних м\'язів та трицепсів.',
             'exercises': [
@@ -551,17 +920,15 @@ def initialize_test_data():
                 {'name': 'Французький жим', 'sets': 3, 'reps': '10-15'}
             ],
             'is_global': True,
-            'user_id': list(users.keys())[0], # Прив'язуємо до першого користувача (адміна)
+            'user_id': list(users)[0], # Прив'язуємо до першого користувача (адміна)
             'muscle_groups': ['Груди', 'Трицепс'],
             'goal': 'Набір маси',
             'difficulty': 'Середній',
             'equipment': ['Штанга', 'Гантелі', 'Без обладнання'],
             'duration_category': '30-60 хв'
-        }
+        })
         
-        template_id_2 = generate_unique_id()
-        workout_templates[template_id_2] = {
-            'id': template_id_2,
+        workout_templates.add({
             'name': 'Тренування для спини та біцепсів',
             'description': 'Інтенсивне тренування для м\'язів спини та біцепсів.',
             'exercises': [
@@ -571,17 +938,15 @@ def initialize_test_data():
                 {'name': 'Згинання рук зі штангою', 'sets': 3, 'reps': '10-15'}
             ],
             'is_global': True,
-            'user_id': list(users.keys())[0],
+            'user_id': list(users)[0],
             'muscle_groups': ['Спина', 'Біцепс'],
             'goal': 'Набір маси',
             'difficulty': 'Середній',
             'equipment': ['Штанга', 'Тренажери', 'Без обладнання'],
             'duration_category': 'Понад 60 хв'
-        }
+        })
 
-        template_id_3 = generate_unique_id()
-        workout_templates[template_id_3] = {
-            'id': template_id_3,
+        workout_templates.add({
             'name': 'Тренування для ніг та плечей',
             'description': 'Функціональне тренування для нижньої частини тіла та дельт.',
             'exercises': [
@@ -591,17 +956,15 @@ def initialize_test_data():
                 {'name': 'Жим гантелей сидячи', 'sets': 3, 'reps': '8-12'}
             ],
             'is_global': True,
-            'user_id': list(users.keys())[0],
+            'user_id': list(users)[0],
             'muscle_groups': ['Ноги', 'Плечі'],
             'goal': 'Сила',
             'difficulty': 'Просунутий',
             'equipment': ['Штанга', 'Гантелі', 'Тренажери'],
             'duration_category': 'Понад 60 хв'
-        }
+        })
         
-        template_id_4 = generate_unique_id()
-        workout_templates[template_id_4] = {
-            'id': template_id_4,
+        workout_templates.add({
             'name': 'Кардіо та прес',
             'description': 'Легке кардіо та вправи для кора.',
             'exercises': [
@@ -610,17 +973,15 @@ def initialize_test_data():
                 {'name': 'Скручування', 'sets': 3, 'reps': '15-20'}
             ],
             'is_global': True,
-            'user_id': list(users.keys())[0],
+            'user_id': list(users)[0],
             'muscle_groups': ['Прес', 'Кардіо'],
             'goal': 'Сушка',
             'difficulty': 'Початківець',
             'equipment': ['Без обладнання', 'Тренажери'],
             'duration_category': 'До 30 хв'
-        }
+        })
 
-        template_id_5 = generate_unique_id()
-        workout_templates[template_id_5] = {
-            'id': template_id_5,
+        workout_templates.add({
             'name': 'Домашнє тренування на все тіло',
             'description': 'Тренування вдома без додаткового обладнання.',
             'exercises': [
@@ -630,31 +991,32 @@ def initialize_test_data():
                 {'name': 'Планка', 'sets': 3, 'reps': '45-60 сек'}
             ],
             'is_global': False, # Це особистий шаблон
-            'user_id': user_id_1, # Прив'язуємо до user1
+            'user_id': list(users)[1], # Прив'язуємо до user1
             'muscle_groups': ['Ноги', 'Груди', 'Прес'],
             'goal': 'Загальний тонус',
             'difficulty': 'Початківець',
             'equipment': ['Без обладнання'],
             'duration_category': '30-60 хв'
-        }
+        })
         print("DEBUG: Додано тестові шаблони тренувань.")
     
     if not user_progress: # Додаємо тестові дані прогресу
-        user_progress[list(users.keys())[1]] = [ # Для user1
+        for entry in [ # Для user1
             {'date': '2025-06-01', 'weight': 75.5, 'workouts_completed': 2},
             {'date': '2025-06-08', 'weight': 75.0, 'workouts_completed': 1},
             {'date': '2025-06-15', 'weight': 74.8, 'workouts_completed': 3}
-        ]
+        ]:
+            user_progress.add(list(users)[1], entry)
+            user_analytics.record_weight(list(users)[1], entry['date'], None, entry['weight'])
         print("DEBUG: Додано тестові дані прогресу.")
 
     if not user_workouts_data: # Додаємо тестові щоденні тренування
-        user_id_for_workouts = list(users.keys())[1] # user1
-        template_for_daily_1 = workout_templates[list(workout_templates.keys())[0]] # Груди/Трицепси
-        template_for_daily_2 = workout_templates[list(workout_templates.keys())[3]] # Кардіо/Прес
+        user_id_for_workouts = list(users)[1] # user1
+        template_for_daily_1 = workout_templates.get(list(workout_templates)[0]) # Груди/Трицепси
+        template_for_daily_2 = workout_templates.get(list(workout_templates)[3]) # Кардіо/Прес
 
-        user_workouts_data[user_id_for_workouts] = [
+        for workout in [
             {
-                'id': generate_unique_id(),
                 'user_id': user_id_for_workouts,
                 'template_id': template_for_daily_1['id'],
                 'workout_date': '2025-07-01',
@@ -669,7 +1031,6 @@ def initialize_test_data():
                 'duration_seconds': 3600
             },
             {
-                'id': generate_unique_id(),
                 'user_id': user_id_for_workouts,
                 'template_id': template_for_daily_2['id'],
                 'workout_date': '2025-07-03',
@@ -679,7 +1040,10 @@ def initialize_test_data():
                 'description': template_for_daily_2['description'],
                 'exercises': template_for_daily_2['exercises'][:]
             }
-        ]
+        ]:
+            user_workouts_data.add(workout)
+            if workout['status'] == 'completed':
+                user_analytics.record_completed(workout['user_id'], workout['date'], workout.get('duration_seconds'))
         print("DEBUG: Додано тестові щоденні тренування.")
 
 
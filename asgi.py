@@ -0,0 +1,186 @@
+# asgi.py
+# ASGI-точка входу для асинхронного сервера (uvicorn, hypercorn):
+#
+#     uvicorn asgi:application --host 0.0.0.0 --port 5000 --timeout-keep-alive 75
+#
+# З'єднання обслуговує цикл подій сервера, тож неактивні keep-alive з'єднання
+# мобільних клієнтів не займають потоків. Запит виконується в обмеженому пулі
+# потоків лише на час обробки, а SQLite-сховище бере з'єднання зі свого пулу в
+# тому ж потоці, тому цикл подій ніколи не чекає на базу.
+#
+# Обмеження: асинхронного доступу до бази немає. Маршрути Flask і обидва
+# сховища лишаються синхронними, бо sqlite3 не має асинхронного API, а
+# in-memory сховище не чекає на введення-виведення. Під GIL async-версія
+# маршрутів і сховищ дублювала б застосунок без виграшу, тож паралельність
+# запитів обмежує ASGI_THREADS.
+#
+# Адаптер WSGI -> ASGI написано тут, а не взято з asgiref: WsgiToAsgi з asgiref
+# виконує всі запити процесу по черзі в одному потоці (thread_sensitive).
+# Потрібен лише сервер, наприклад uvicorn.
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+from app import app
+
+# Кількість запитів, що обробляються одночасно (і з'єднань SQLite, які вони тримають)
+app.config['ASGI_THREADS'] = int(os.environ.get('ASGI_THREADS', 32))
+
+# Тіло запиту до стількох байтів тримається в пам'яті, більше — у тимчасовому файлі
+BODY_MEMORY_LIMIT = 64 * 1024
+
+
+def build_environ(scope, body):
+    """WSGI environ (PEP 3333) з ASGI scope HTTP-запиту; body — файл із повним тілом запиту."""
+    script_name = scope.get('root_path', '')
+    path = scope['path']
+    if script_name and path.startswith(script_name):
+        path = path[len(script_name):]
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        # WSGI передає шлях як байти UTF-8, декодовані latin-1
+        'SCRIPT_NAME': script_name.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 0),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        # Тіло вже прочитано повністю, тож його можна читати до кінця і без Content-Length
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    client = scope.get('client')
+    if client:
+        environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = client[0], str(client[1])
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1')
+        if name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        elif name == 'content-type':
+            key = 'CONTENT_TYPE'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        value = value.decode('latin-1')
+        # Повторені заголовки об'єднуються через кому, як у CGI
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+class _WsgiRequest:
+    """
+    Один HTTP-запит: WSGI-застосунок виконується в потоці пулу, а частини
+    відповіді надсилаються через цикл подій (потік чекає, поки кожну буде передано).
+    """
+
+    def __init__(self, wsgi_application, scope, loop, send):
+        self.wsgi_application = wsgi_application
+        self.scope = scope
+        self._loop = loop
+        self._send = send
+        self._status = None
+        self._headers = None
+        self._content_length = None
+        self._started = False
+
+    def send(self, message):
+        asyncio.run_coroutine_threadsafe(self._send(message), self._loop).result()
+
+    def start_response(self, status, headers, exc_info=None):
+        if exc_info is not None:
+            try:
+                # Заголовки вже надіслано — відповідь не замінити, тож виняток іде далі
+                if self._started:
+                    raise exc_info[1].with_traceback(exc_info[2])
+            finally:
+                exc_info = None
+        elif self._status is not None:
+            raise RuntimeError('start_response викликано повторно без exc_info.')
+        self._status = int(status.split(' ', 1)[0])
+        self._headers = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+        self._content_length = next((int(value) for name, value in self._headers if name == b'content-length'),
+                                    None)
+        return self._write
+
+    def _start(self):
+        if not self._started:
+            self._started = True
+            self.send({'type': 'http.response.start', 'status': self._status, 'headers': self._headers})
+
+    def _write(self, data):
+        self._start()
+        self.send({'type': 'http.response.body', 'body': data, 'more_body': True})
+
+    def run(self, body):
+        """Виконує застосунок і надсилає відповідь; викликається в потоці пулу."""
+        result = self.wsgi_application(build_environ(self.scope, body), self.start_response)
+        sent = 0
+        try:
+            for chunk in result:
+                if not chunk:
+                    continue
+                # Не більше, ніж обіцяє Content-Length
+                if self._content_length is not None:
+                    chunk = chunk[:self._content_length - sent]
+                self._write(chunk)
+                sent += len(chunk)
+                if sent == self._content_length:
+                    break
+        finally:
+            # close() завершує потокові відповіді (генератори) і звільняє ресурси запиту
+            close = getattr(result, 'close', None)
+            if close is not None:
+                close()
+        self._start()
+        self.send({'type': 'http.response.body'})
+
+
+class PooledWsgiToAsgi:
+    """
+    Адаптер WSGI -> ASGI, що виконує запити паралельно в пулі з max_workers
+    потоків. Підтримує протокол lifespan: пул закривається під час зупинки сервера.
+    """
+
+    def __init__(self, wsgi_application, max_workers):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f"Непідтримуваний тип ASGI scope: {scope['type']}")
+        with SpooledTemporaryFile(max_size=BODY_MEMORY_LIMIT) as body:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                body.write(message.get('body', b''))
+                if not message.get('more_body'):
+                    break
+            body.seek(0)
+            loop = asyncio.get_running_loop()
+            request = _WsgiRequest(self.wsgi_application, scope, loop, send)
+            await loop.run_in_executor(self.executor, request.run, body)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+application = PooledWsgiToAsgi(app, app.config['ASGI_THREADS'])
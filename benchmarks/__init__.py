@@ -0,0 +1,2 @@
+# Бенчмарки та навантажувальні тести. Запуск з кореня репозиторію:
+#     python -m benchmarks.<назва_модуля>
@@ -0,0 +1,226 @@
+# benchmarks/asgi_load.py
+# Навантажувальний тест: WSGI-сервер (як app.run — багатопотоковий werkzeug) проти
+# ASGI-точки входу asgi.py під uvicorn. Кожен сервер запускається в окремому
+# процесі; клієнт тримає --idle неактивних keep-alive з'єднань (як мобільні
+# застосунки у фоні) і водночас --connections активних, що без пауз надсилають
+# GET-запити. Виводяться запити/с, p50 і p99 латентності.
+#
+#     python -m benchmarks.asgi_load [--backend memory] [--connections 64] [--idle 1000] [--duration 10]
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+PATHS = ('/daily_workouts', '/my_progress', '/workout_templates', '/my_analytics')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Запити/с і латентність WSGI проти ASGI')
+    parser.add_argument('--modes', default='wsgi,asgi')
+    parser.add_argument('--backend', default='memory', choices=['memory', 'sqlite'])
+    parser.add_argument('--connections', type=int, default=64, help='активних з\'єднань')
+    parser.add_argument('--idle', type=int, default=1000, help='неактивних keep-alive з\'єднань')
+    parser.add_argument('--duration', type=float, default=10.0, help='секунд навантаження на режим')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--workouts', type=int, default=30, help='тренувань на користувача')
+    parser.add_argument('--threads', type=int, default=32, help='ASGI_THREADS для asgi.py')
+    parser.add_argument('--port', type=int, default=5077)
+    parser.add_argument('--serve', choices=['wsgi', 'asgi'], help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def serve(args):
+    """Запускає сервер у поточному процесі (викликається з run_server)."""
+    if args.serve == 'asgi':
+        import uvicorn
+        uvicorn.run('asgi:application', host='127.0.0.1', port=args.port, log_level='warning',
+                    timeout_keep_alive=300, backlog=4096)
+    else:
+        from werkzeug.serving import run_simple
+
+        from app import app
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        run_simple('127.0.0.1', args.port, app, threaded=True)
+
+
+def run_server(args, mode, database):
+    env = dict(os.environ, STORAGE_BACKEND=args.backend, DATABASE_NAME=database,
+               ASGI_THREADS=str(args.threads))
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.asgi_load', '--serve', mode, '--port', str(args.port)],
+        env=env, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', args.port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f'сервер {mode} не запустився')
+
+
+class Connection:
+    """Мінімальний HTTP/1.1-клієнт поверх одного keep-alive з'єднання."""
+
+    def __init__(self, port):
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, headers=None, payload=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection('127.0.0.1', self.port)
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        lines = [f'{method} {path} HTTP/1.1', f'Host: 127.0.0.1:{self.port}', f'Content-Length: {len(body)}']
+        if payload is not None:
+            lines.append('Content-Type: application/json')
+        lines.extend(f'{name}: {value}' for name, value in (headers or {}).items())
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        await self.writer.drain()
+
+        head = await self.reader.readuntil(b'\r\n\r\n')
+        status_line, *header_lines = head.decode('latin-1').rstrip('\r\n').split('\r\n')
+        fields = {}
+        for line in header_lines:
+            name, _, value = line.partition(':')
+            fields[name.strip().lower()] = value.strip()
+        if fields.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                chunks.append((await self.reader.readexactly(size + 2))[:size])
+                if size == 0:
+                    break
+            data = b''.join(chunks)
+        else:
+            data = await self.reader.readexactly(int(fields.get('content-length', 0)))
+        if fields.get('connection', '').lower() == 'close' or status_line.startswith('HTTP/1.0'):
+            self.close()
+        return int(status_line.split()[1]), data
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+async def seed(args):
+    """Реєструє користувачів і додає їм тренування; повертає заголовки з токенами."""
+    connection = Connection(args.port)
+    user_headers = []
+    template_id = None
+    for i in range(args.users):
+        credentials = {'username': f'load{i}', 'email': f'load{i}@example.com', 'password': 'pass'}
+        await connection.request('POST', '/register', payload=credentials)
+        _, data = await connection.request('POST', '/login', payload=credentials)
+        headers = {'x-access-token': json.loads(data)['access_token']}
+        if template_id is None:
+            # Глобальні шаблони додає initialize_test_data під час імпорту app
+            _, data = await connection.request('GET', '/workout_templates', headers)
+            template_id = json.loads(data)[0]['id']
+        await connection.request('POST', '/my_progress', headers, {'weight': 70 + i % 10})
+        for day in range(args.workouts):
+            await connection.request('POST', '/daily_workouts', headers,
+                                     {'template_id': template_id, 'date': f'2025-07-{day % 28 + 1:02d}'})
+        user_headers.append(headers)
+    connection.close()
+    return user_headers
+
+
+async def load(args, user_headers):
+    """Тримає неактивні з'єднання й навантажує сервер активними протягом --duration секунд."""
+    idle = []
+    idle_errors = 0
+    for i in range(args.idle):
+        connection = Connection(args.port)
+        try:
+            # Один запит, після якого з'єднання лишається відкритим без активності
+            await connection.request('GET', '/my_profile_data', user_headers[i % len(user_headers)])
+            idle.append(connection)
+        except OSError:
+            idle_errors += 1
+            connection.close()
+
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + args.duration
+
+    async def worker(index):
+        nonlocal errors
+        connection = Connection(args.port)
+        headers = user_headers[index % len(user_headers)]
+        request_number = index
+        while time.perf_counter() < deadline:
+            path = PATHS[request_number % len(PATHS)]
+            request_number += 1
+            started = time.perf_counter()
+            try:
+                status, _ = await connection.request('GET', path, headers)
+            except (OSError, asyncio.IncompleteReadError):
+                errors += 1
+                connection.close()
+                continue
+            if status != 200:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+        connection.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(index) for index in range(args.connections)))
+    elapsed = time.perf_counter() - started
+    for connection in idle:
+        connection.close()
+    return latencies, elapsed, errors, len(idle), idle_errors
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def raise_file_limit(needed):
+    """Піднімає ліміт відкритих файлів до жорсткого (його успадкують і сервери)."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < needed:
+        target = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+        if target < needed:
+            print(f'увага: ліміт відкритих файлів {target}, потрібно {needed}')
+
+
+def main():
+    args = parse_args()
+    if args.serve:
+        serve(args)
+        return
+
+    raise_file_limit(2 * (args.idle + args.connections) + 256)
+    workdir = tempfile.mkdtemp(prefix='asgi_load_')
+    print(f"{'режим':<6} {'активних':>9} {'неактивних':>11} {'запитів/с':>10} "
+          f"{'p50, мс':>8} {'p99, мс':>8} {'помилок':>8}")
+    try:
+        for mode in args.modes.split(','):
+            process = run_server(args, mode, os.path.join(workdir, f'{mode}.db'))
+            try:
+                user_headers = asyncio.run(seed(args))
+                latencies, elapsed, errors, idle, idle_errors = asyncio.run(load(args, user_headers))
+            finally:
+                process.terminate()
+                process.wait()
+            print(f'{mode:<6} {args.connections:>9} {idle:>11} {len(latencies) / elapsed:>10.0f} '
+                  f'{percentile(latencies, 50) * 1000:>8.1f} {percentile(latencies, 99) * 1000:>8.1f} '
+                  f'{errors + idle_errors:>8}')
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
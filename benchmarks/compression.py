@@ -0,0 +1,72 @@
+# benchmarks/compression.py
+# Вартість стиснення відповідей: скільки мікросекунд процесора коштує стиснення
+# тіла відповіді і скільки байтів воно заощаджує, для gzip різних рівнів і
+# brotli (якщо встановлено пакет brotli). Тіла — списки шаблонів і тренувань,
+# серіалізовані так само, як у застосунку; окремо — відповідь з кешу стиснених тіл.
+#
+#     python -m benchmarks.compression [--templates 200] [--workouts 1000] [--repeat 50]
+import argparse
+import random
+import statistics
+import time
+
+from flask import Flask
+
+from benchmarks.json_serialization import make_payloads
+from compression import ResponseCompressor, brotli
+from json_provider import FastJSONProvider
+
+
+def measure(func, repeat):
+    """Медіана мкс на виклик."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Мкс процесора проти заощаджених байтів')
+    parser.add_argument('--templates', type=int, default=200)
+    parser.add_argument('--workouts', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    templates, workouts = make_payloads(args, random.Random(1))
+    app = Flask(__name__)
+    provider = FastJSONProvider(app)
+    bodies = [
+        ('шаблони', provider.dumps(templates).encode('utf-8')),
+        ('тренування', provider.dumps(workouts).encode('utf-8')),
+        ('20 тренувань', provider.dumps(workouts[:20]).encode('utf-8')),
+    ]
+
+    variants = [(f'gzip {level}', ResponseCompressor(gzip_level=level), 'gzip') for level in (1, 6, 9)]
+    if brotli is not None:
+        variants += [(f'br {quality}', ResponseCompressor(brotli_quality=quality), 'br') for quality in (1, 5, 9)]
+    else:
+        print('brotli не встановлено — вимірюється лише gzip')
+
+    print(f"{'тіло':<13} {'кодування':<10} {'байтів':>9} {'стиснено':>9} {'економія':>9} "
+          f"{'мкс':>8} {'мкс/КБ заощ.':>13}")
+    for name, body in bodies:
+        for label, compressor, encoding in variants:
+            compressed = compressor.encode(body, encoding)
+            micros = measure(lambda: compressor.encode(body, encoding), args.repeat)
+            saved = len(body) - len(compressed)
+            print(f'{name:<13} {label:<10} {len(body):>9} {len(compressed):>9} {saved / len(body):>8.0%} '
+                  f'{micros:>8.0f} {micros / (saved / 1024):>13.1f}')
+
+    # Повторний запит до списку глобальних шаблонів: тіло береться з кешу стиснених відповідей
+    compressor = ResponseCompressor()
+    body = bodies[0][1]
+    with app.test_request_context('/workout_templates'):
+        compressor._compressed(body, 'gzip', 'templates-1')
+        micros = measure(lambda: compressor._compressed(body, 'gzip', 'templates-1'), args.repeat * 20)
+    print(f'шаблони з кешу стиснених відповідей: {micros:.1f} мкс')
+
+
+if __name__ == '__main__':
+    main()
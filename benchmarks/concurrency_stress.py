@@ -0,0 +1,138 @@
+# benchmarks/concurrency_stress.py
+# Навантажувальний тест паралельних запитів: багато потоків одночасно завершують
+# і скидають ті самі тренування, записують вагу, додають і видаляють тренування.
+# Після навантаження перевіряються інваріанти: жодне оновлення не загубилося,
+# списки впорядковані й без дублікатів.
+#
+#     python -m benchmarks.concurrency_stress [--backend memory] [--threads 16] [--users 8] [--ops 4000]
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Паралельні запити до маршрутів тренувань і прогресу')
+    parser.add_argument('--backend', default='memory', choices=['memory', 'sqlite'])
+    parser.add_argument('--database', default='stress_test.db', help='файл бази для --backend sqlite')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--users', type=int, default=8)
+    parser.add_argument('--workouts', type=int, default=4, help='спільних тренувань на користувача')
+    parser.add_argument('--ops', type=int, default=4000, help='запитів на потік')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.backend == 'sqlite' and os.path.exists(args.database):
+        os.remove(args.database)
+    # app.py читає налаштування сховища під час імпорту
+    os.environ['STORAGE_BACKEND'] = args.backend
+    os.environ['DATABASE_NAME'] = args.database
+    from app import app
+
+    client = app.test_client()
+    template_id = None
+    users = []
+    for i in range(args.users):
+        credentials = {'username': f'stress{i}', 'email': f'stress{i}@example.com', 'password': 'pass'}
+        client.post('/register', json=credentials)
+        token = client.post('/login', json=credentials).get_json()['access_token']
+        headers = {'x-access-token': token}
+        if template_id is None:
+            # Глобальні шаблони додає initialize_test_data під час імпорту app
+            template_id = client.get('/workout_templates', headers=headers).get_json()[0]['id']
+        # Запис прогресу потрібен, щоб завершення тренувань враховувалися в прогресі
+        client.post('/my_progress', headers=headers, json={'weight': 70})
+        workout_ids = [client.post('/daily_workouts', headers=headers,
+                                   json={'template_id': template_id, 'date': '2025-07-01'}).get_json()['id']
+                       for _ in range(args.workouts)]
+        users.append({'headers': headers, 'workouts': workout_ids})
+
+    # Лічильники успішних запитів: {(користувач, дія): кількість}
+    counters = Counter()
+    counters_lock = threading.Lock()
+    failures = []
+
+    def worker(seed):
+        rnd = random.Random(seed)
+        local = Counter()
+        thread_client = app.test_client()
+        added = []
+        for _ in range(args.ops):
+            index = rnd.randrange(len(users))
+            user = users[index]
+            headers = user['headers']
+            action = rnd.random()
+            if action < 0.35:
+                workout_id = rnd.choice(user['workouts'])
+                response = thread_client.post(f'/daily_workouts/{workout_id}/complete', headers=headers,
+                                              json={'exercises': [], 'duration_seconds': 60})
+                local[index, 'complete', response.status_code] += 1
+            elif action < 0.6:
+                workout_id = rnd.choice(user['workouts'])
+                response = thread_client.post(f'/daily_workouts/{workout_id}/reset_status', headers=headers)
+                local[index, 'reset', response.status_code] += 1
+            elif action < 0.7:
+                response = thread_client.post('/my_progress', headers=headers, json={'weight': rnd.randint(60, 90)})
+                local[index, 'weight', response.status_code] += 1
+            elif action < 0.8:
+                response = thread_client.post('/daily_workouts', headers=headers,
+                                              json={'template_id': template_id, 'date': '2025-07-02'})
+                local[index, 'add', response.status_code] += 1
+                if response.status_code == 201:
+                    added.append((index, response.get_json()['id']))
+            elif action < 0.9 and added:
+                owner, workout_id = added.pop(rnd.randrange(len(added)))
+                response = thread_client.delete(f'/daily_workouts/{workout_id}', headers=users[owner]['headers'])
+                local[owner, 'delete', response.status_code] += 1
+            else:
+                workouts = thread_client.get('/daily_workouts', headers=headers).get_json()
+                keys = [(workout['date'], str(workout['id'])) for workout in workouts]
+                if len(set(keys)) != len(keys):
+                    failures.append(f'користувач {index}: дублікати в /daily_workouts')
+                if [key[0] for key in keys] != sorted((key[0] for key in keys), reverse=True):
+                    failures.append(f'користувач {index}: /daily_workouts не впорядковано за датою')
+                local[index, 'list', 200] += 1
+        with counters_lock:
+            counters.update(local)
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    total = sum(counters.values())
+    print(f'{total} запитів у {args.threads} потоках за {elapsed:.1f} с ({total / elapsed:.0f} запитів/с)')
+
+    for index, user in enumerate(users):
+        headers = user['headers']
+        completed = counters[index, 'complete', 200] - counters[index, 'reset', 200]
+        workouts = client.get('/daily_workouts', headers=headers).get_json()
+        shared = [workout for workout in workouts if workout['id'] in user['workouts']]
+        # Кожне спільне тренування завершене не більше одного разу
+        if sum(workout['status'] == 'completed' for workout in shared) != completed:
+            failures.append(f'користувач {index}: статуси тренувань не збігаються з {completed} завершеннями')
+        progress = client.get('/my_progress', headers=headers).get_json()
+        if sum(entry['workouts_completed'] for entry in progress) != completed:
+            failures.append(f'користувач {index}: workouts_completed у прогресі не дорівнює {completed}')
+        analytics = client.get('/my_analytics', headers=headers).get_json()
+        if analytics['totals']['workouts_completed'] != completed:
+            failures.append(f'користувач {index}: аналітика не дорівнює {completed} завершенням')
+        added = counters[index, 'add', 201] - counters[index, 'delete', 200]
+        if len(workouts) != args.workouts + added:
+            failures.append(f'користувач {index}: {len(workouts)} тренувань замість {args.workouts + added}')
+
+    for failure in failures:
+        print('ПОМИЛКА:', failure)
+    print('інваріанти порушено' if failures else 'інваріанти виконуються')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
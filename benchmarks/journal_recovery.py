@@ -0,0 +1,143 @@
+# benchmarks/journal_recovery.py
+# Журнал і знімки in-memory сховища (durable_store.py): скільки коштує запис
+# змін (group commit проти write-behind проти MemoryStore без журналу), скільки
+# триває знімок (і пауза змін на час копіювання стану) та за скільки сховище
+# відновлюється після перезапуску з --records записів (тренування та записи
+# ваги) — лише з журналу і зі знімка. Після кожного відновлення стан
+# порівнюється з початковим.
+#
+#     python -m benchmarks.journal_recovery [--records 1000000] [--users 5000] [--threads 8] [--ops 2000]
+import argparse
+import hashlib
+import marshal
+import random
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+from benchmarks.route_suite import actual_results, make_template
+from durable_store import DurableMemoryStore
+from repositories import MemoryStore
+
+
+def fill(store, args, rnd):
+    """Додає користувачів, шаблони та --records тренувань і записів ваги (порівну)."""
+    admin = store.users.add({'username': 'admin', 'email': 'admin@example.com', 'password': 'hash', 'role': 'admin'})
+    templates = [store.templates.add(make_template(rnd, i, admin['id'], True)) for i in range(100)]
+    per_user = args.records // args.users // 2
+    first_day = date.today() - timedelta(days=per_user)
+    days = [(first_day + timedelta(days=i)).isoformat() for i in range(per_user)]
+    for number in range(args.users):
+        user_id = store.users.add({'username': f'u{number}', 'email': f'u{number}@example.com',
+                                   'password': 'hash'})['id']
+        # Один кадр журналу на користувача, як у POST /daily_workouts/bulk
+        with store.transaction(user_id):
+            planned = [rnd.choice(templates) for _ in days]
+            created = store.workouts.add_many([{
+                'user_id': user_id, 'template_id': template['id'], 'workout_date': day, 'date': day,
+                'status': 'upcoming', 'template_name': template['name'], 'description': template['description'],
+                'exercises': template['exercises'],
+            } for day, template in zip(days, planned)])
+            for day, template, workout in zip(days, planned, created):
+                weight = round(rnd.uniform(60, 100), 1)
+                previous = store.progress.save_weight(user_id, day, weight)
+                store.analytics.record_weight(user_id, day, previous, weight)
+                if rnd.random() < 0.6:
+                    store.workouts.mark_completed(user_id, workout['id'], actual_results(template, rnd), 3600)
+                    store.progress.record_completed(user_id, day)
+                    store.analytics.record_completed(user_id, day, 3600)
+    return per_user * args.users * 2
+
+
+def write_throughput(store, args):
+    """Записи ваги з --threads потоків; повертає (операцій/с, fsync на операцію)."""
+    users = list(store.users)[1:args.threads + 1]
+    syncs = store.stats()['syncs'] if isinstance(store, DurableMemoryStore) else 0
+
+    def worker(user_id):
+        for i in range(args.ops):
+            day = (date(2000, 1, 1) + timedelta(days=i)).isoformat()
+            with store.transaction(user_id):
+                previous = store.progress.save_weight(user_id, day, 70.0)
+                store.analytics.record_weight(user_id, day, previous, 70.0)
+
+    threads = [threading.Thread(target=worker, args=(user_id,)) for user_id in users]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    operations = args.ops * len(users)
+    if isinstance(store, DurableMemoryStore):
+        store._journal.flush()
+        syncs = store.stats()['syncs'] - syncs
+    return operations / elapsed, syncs / operations
+
+
+def digest(store):
+    # Версія 0 marshal не має посилань на спільні об'єкти, тож однаковий стан дає однакові байти;
+    # зберігати копію всього стану для порівняння на мільйоні записів задорого
+    return hashlib.sha1(marshal.dumps(store.dump_state(), 0)).hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Запис журналу, знімки та час відновлення in-memory сховища')
+    parser.add_argument('--records', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=8, help='потоків для вимірювання запису')
+    parser.add_argument('--ops', type=int, default=2000, help='записів ваги на потік')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='journal_recovery_')
+    try:
+        print(f"{'запис змін':<28} {'операцій/с':>11} {'fsync/операцію':>15}")
+        baseline = MemoryStore()
+        fill(baseline, argparse.Namespace(records=args.threads * 2 * 10, users=args.threads * 2), random.Random(1))
+        rate, _ = write_throughput(baseline, args)
+        print(f"{'без журналу':<28} {rate:>11.0f} {'-':>15}")
+        for label, sync_interval in (('group commit (fsync)', 0), ('write-behind, 10 мс', 0.01)):
+            store = DurableMemoryStore(f'{directory}/write-{sync_interval}', sync_interval=sync_interval)
+            fill(store, argparse.Namespace(records=args.threads * 2 * 10, users=args.threads * 2), random.Random(1))
+            rate, syncs = write_throughput(store, args)
+            store.close()
+            print(f'{label:<28} {rate:>11.0f} {syncs:>15.3f}')
+
+        path = f'{directory}/store'
+        store = DurableMemoryStore(path, sync_interval=0.01, snapshot_bytes=1 << 62)
+        started = time.perf_counter()
+        records = fill(store, args, random.Random(1))
+        print(f'\nзаповнення: {records} записів за {time.perf_counter() - started:.1f} с, '
+              f"журнал {store.stats()['bytes'] / 2 ** 20:.0f} МБ")
+        expected = digest(store)
+        store.close()
+
+        store = DurableMemoryStore(path, snapshot_bytes=1 << 62)
+        recovery = store.recovery
+        assert digest(store) == expected, 'стан після програвання журналу відрізняється'
+        print(f"відновлення лише з журналу: {recovery['seconds']:.2f} с "
+              f"({recovery['operations']} операцій у {recovery['frames']} кадрах)")
+
+        snapshot = store.snapshot()
+        print(f"знімок: {snapshot['bytes'] / 2 ** 20:.0f} МБ за {snapshot['seconds']:.2f} с, "
+              f"зміни зупинено на {snapshot['pause_seconds']:.2f} с")
+        # Хвіст журналу після знімка: по одному запису ваги для сотні користувачів
+        for user_id in list(store.users)[1:101]:
+            store.progress.save_weight(user_id, '2000-01-01', 70.0)
+        expected = digest(store)
+        store.close()
+
+        store = DurableMemoryStore(path, snapshot_bytes=1 << 62)
+        recovery = store.recovery
+        assert digest(store) == expected, 'стан після знімка й журналу відрізняється'
+        print(f"відновлення зі знімка: {recovery['seconds']:.2f} с (знімок {recovery['snapshot_seconds']:.2f} с, "
+              f"журнал — {recovery['operations']} операцій)")
+        store.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
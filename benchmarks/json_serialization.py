@@ -0,0 +1,89 @@
+# benchmarks/json_serialization.py
+# Розмір і час серіалізації великих списків (GET /workout_templates та
+# GET /daily_workouts): стандартний провайдер Flask (json з екрануванням \uXXXX)
+# проти FastJSONProvider зі стандартним json та з orjson, а для шаблонів —
+# ще й зі склеюванням заздалегідь серіалізованих глобальних шаблонів.
+#
+#     python -m benchmarks.json_serialization [--templates 200] [--workouts 1000] [--repeat 200]
+import argparse
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from benchmarks.record_memory import make_templates
+from json_provider import FastJSONProvider, orjson
+from repositories import MemoryStore
+
+
+def make_payloads(args, rnd):
+    """Повертає списки шаблонів і тренувань у тому вигляді, в якому їх віддають маршрути."""
+    store = MemoryStore()
+    for template in make_templates(args.templates, rnd):
+        store.templates.add(template)
+    templates = list(store.templates.iter_accessible('admin', {}))
+    first_day = date(2025, 1, 1)
+    for i in range(args.workouts):
+        template = rnd.choice(templates)
+        day = (first_day + timedelta(days=rnd.randrange(365))).isoformat()
+        store.workouts.add({
+            'user_id': 'u1', 'template_id': template['id'], 'workout_date': day, 'date': day,
+            'status': 'upcoming', 'template_name': template['name'], 'description': template['description'],
+            'exercises': template['exercises'],
+        })
+    return templates, list(store.workouts.iter_for_user('u1'))
+
+
+def measure(app, build, repeat):
+    """Повертає (байтів у відповіді, медіану мкс на відповідь)."""
+    with app.app_context():
+        body = build().get_data()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            build().get_data()
+            timings.append(time.perf_counter() - started)
+    return len(body), statistics.median(timings) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Байти та мкс на JSON-відповідь')
+    parser.add_argument('--templates', type=int, default=200)
+    parser.add_argument('--workouts', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    templates, workouts = make_payloads(args, random.Random(1))
+    app = Flask(__name__)
+    providers = [('flask (json, \\uXXXX)', DefaultJSONProvider(app)), ('json', FastJSONProvider(app, 'json'))]
+    if orjson is not None:
+        providers.append(('orjson', FastJSONProvider(app, 'orjson')))
+    else:
+        print('orjson не встановлено — вимірюється лише стандартний json')
+
+    cases = []
+    for label, provider in providers:
+        cases.append(('шаблони', label, lambda provider=provider: provider.response(templates)))
+        if isinstance(provider, FastJSONProvider):
+            # Як у GET /workout_templates: фрагменти глобальних шаблонів уже серіалізовані
+            def fragments(provider=provider):
+                return provider.response([provider.preserialized(template['id'], (0,), template)
+                                          for template in templates])
+            cases.append(('шаблони', label + ' + фрагменти', fragments))
+    for label, provider in providers:
+        cases.append(('тренування', label, lambda provider=provider: provider.response(workouts)))
+
+    print(f'шаблонів: {len(templates)}, тренувань: {len(workouts)}')
+    print(f"{'список':<11} {'провайдер':<26} {'байтів':>9} {'мкс':>9} {'швидше':>7}")
+    baseline = {}
+    for payload, label, build in cases:
+        size, micros = measure(app, build, args.repeat)
+        baseline.setdefault(payload, micros)
+        print(f'{payload:<11} {label:<26} {size:>9} {micros:>9.0f} {baseline[payload] / micros:>6.1f}x')
+
+
+if __name__ == '__main__':
+    main()
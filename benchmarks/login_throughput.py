@@ -0,0 +1,76 @@
+# benchmarks/login_throughput.py
+# Пропускна здатність перевірки паролів (основна вартість /login) залежно від
+# кількості процесів пулу PasswordHasher. --threads потоків імітують потоки
+# запитів, що одночасно перевіряють паролі; паралельно окремий потік виконує
+# дрібну роботу на Python, і його p99 показує, наскільки вхід гальмує інші запити.
+# workers=0 — перевірка прямо в потоках запитів, як без пулу.
+#
+#     python -m benchmarks.login_throughput [--method scrypt] [--workers 0,1,2,4] [--threads 16] [--duration 5]
+import argparse
+import os
+import threading
+import time
+
+from passwords import PasswordHasher
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(hasher, stored, threads, duration):
+    """Повертає (кількість перевірок, час, латентності потоку-проби в секундах)."""
+    verified = [0] * threads
+    probe = []
+    stop = threading.Event()
+
+    def login_worker(index):
+        while not stop.is_set():
+            matches, _ = hasher.verify(stored, 'correct horse battery staple')
+            verified[index] += matches
+
+    def probe_worker():
+        while not stop.is_set():
+            started = time.perf_counter()
+            sum(range(2000))  # імітація легкого запиту
+            probe.append(time.perf_counter() - started)
+            time.sleep(0.001)
+
+    workers = [threading.Thread(target=login_worker, args=(i,)) for i in range(threads)]
+    workers.append(threading.Thread(target=probe_worker))
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    time.sleep(duration)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    return sum(verified), time.perf_counter() - started, probe
+
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description='Перевірок паролів за секунду на ядро')
+    parser.add_argument('--method', default='scrypt', help="метод werkzeug, наприклад 'pbkdf2:sha256:600000'")
+    parser.add_argument('--workers', default=','.join(str(n) for n in sorted({0, 1, cores, 2 * cores})))
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f'ядер: {cores}, метод: {args.method}, потоків запитів: {args.threads}')
+    print(f"{'процесів':>9} {'входів/с':>10} {'на ядро':>9} {'проба p50, мс':>14} {'проба p99, мс':>14}")
+    for workers in (int(n) for n in args.workers.split(',')):
+        hasher = PasswordHasher(args.method, workers).start()
+        try:
+            stored = hasher.hash('correct horse battery staple')
+            count, elapsed, probe = run(hasher, stored, args.threads, args.duration)
+        finally:
+            hasher.shutdown()
+        busy_cores = min(cores, workers or args.threads)
+        print(f'{workers:>9} {count / elapsed:>10.1f} {count / elapsed / busy_cores:>9.1f} '
+              f'{percentile(probe, 50) * 1000:>14.2f} {percentile(probe, 99) * 1000:>14.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+# benchmarks/record_memory.py
+# Пам'ять in-memory сховища: записи-словники (як раніше в app.py) проти
+# компактних записів із models.py, якими користуються репозиторії.
+#
+#     python -m benchmarks.record_memory [--workouts 100000] [--progress 100000] [--users 2000] [--templates 200]
+import argparse
+import copy
+import gc
+import random
+import tracemalloc
+from datetime import date, timedelta
+
+from repositories import MemoryStore
+
+GOALS = ['Набір маси', 'Сила', 'Сушка', 'Загальний тонус']
+DIFFICULTIES = ['Початківець', 'Середній', 'Просунутий']
+DURATIONS = ['До 30 хв', '30-60 хв', 'Понад 60 хв']
+
+
+def make_templates(count, rnd):
+    return [{
+        'id': f't{i}', 'user_id': 'admin', 'name': f'Шаблон {i}', 'description': 'Опис тренування ' * 4,
+        'exercises': [{'name': f'Вправа {j}', 'sets': 3, 'reps': '8-12'} for j in range(5)],
+        'is_global': True, 'muscle_groups': ['Груди', 'Трицепс'],
+        'goal': rnd.choice(GOALS), 'difficulty': rnd.choice(DIFFICULTIES),
+        'equipment': ['Штанга'], 'duration_category': rnd.choice(DURATIONS),
+    } for i in range(count)]
+
+
+def make_rows(args, rnd):
+    """Генерує тренування та записи прогресу у форматі, який приходить у репозиторії."""
+    templates = make_templates(args.templates, rnd)
+    first_day = date(2025, 1, 1)
+    workouts = []
+    for i in range(args.workouts):
+        template = rnd.choice(templates)
+        day = (first_day + timedelta(days=rnd.randrange(365))).isoformat()
+        workouts.append({
+            'id': f'w{i}', 'user_id': f'u{rnd.randrange(args.users)}', 'template_id': template['id'],
+            'workout_date': day, 'date': day, 'status': 'upcoming',
+            'template_name': template['name'], 'description': template['description'],
+            'exercises': template['exercises'],
+        })
+    progress = [(f'u{rnd.randrange(args.users)}',
+                 {'date': (first_day + timedelta(days=i % 365)).isoformat(),
+                  'weight': round(rnd.uniform(55, 110), 1), 'workouts_completed': 0})
+                for i in range(args.progress)]
+    return templates, workouts, progress
+
+
+def measure(build):
+    """Повертає кількість байтів, виділених під час build() і ще не звільнених."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+    return used
+
+
+def build_dicts(templates, workouts, progress):
+    # Як раніше: кожне тренування — словник із власною копією вправ шаблону
+    stored_templates = {template['id']: copy.deepcopy(template) for template in templates}
+    stored_workouts = {}
+    for workout in workouts:
+        stored_workouts.setdefault(workout['user_id'], []).append(copy.deepcopy(workout))
+    stored_progress = {}
+    for user_id, entry in progress:
+        stored_progress.setdefault(user_id, []).append(dict(entry))
+    return stored_templates, stored_workouts, stored_progress
+
+
+def build_records(templates, workouts, progress):
+    store = MemoryStore()
+    for template in templates:
+        store.templates.add(template)
+    for workout in workouts:
+        store.workouts.add(workout)
+    for user_id, entry in progress:
+        store.progress.save_weight(user_id, entry['date'], entry['weight'])
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пам'ять записів-словників проти компактних записів")
+    parser.add_argument('--workouts', type=int, default=100000)
+    parser.add_argument('--progress', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--templates', type=int, default=200)
+    args = parser.parse_args()
+
+    templates, workouts, progress = make_rows(args, random.Random(1))
+    dicts = measure(lambda: build_dicts(templates, workouts, progress))
+    records = measure(lambda: build_records(templates, workouts, progress))
+    rows = args.workouts + args.progress
+    print(f"{'':<18} {'МБ':>10} {'байт/запис':>12}")
+    print(f"{'словники':<18} {dicts / 2**20:>10.1f} {dicts / rows:>12.0f}")
+    print(f"{'записи models.py':<18} {records / 2**20:>10.1f} {records / rows:>12.0f}")
+    print(f'економія: {1 - records / dicts:.0%}')
+
+
+if __name__ == '__main__':
+    main()
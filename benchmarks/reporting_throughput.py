@@ -0,0 +1,72 @@
+# benchmarks/reporting_throughput.py
+# Швидкість адміністративних звітів: знімок тренувань у колонки та пакетний
+# підрахунок агрегатів на мільйонах рядків (з NumPy, якщо він встановлений,
+# і без нього).
+#
+#     python -m benchmarks.reporting_throughput [--workouts 1000000] [--users 20000] [--templates 500]
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+import reporting
+from repositories import MemoryStore
+
+
+def fill(store, workouts, users, templates, seed=1):
+    """Заповнює сховище шаблонами, тренуваннями та записами ваги за останній рік."""
+    rnd = random.Random(seed)
+    template_ids = [store.templates.add({'name': f'Шаблон {i}', 'description': '', 'exercises': [],
+                                         'is_global': True, 'user_id': 'admin'})['id']
+                    for i in range(templates)]
+    first_day = date.today() - timedelta(days=365)
+    days = [(first_day + timedelta(days=i)).isoformat() for i in range(366)]
+    for i in range(workouts):
+        template = store.templates.get(rnd.choice(template_ids))
+        completed = rnd.random() < 0.6
+        store.workouts.add({
+            'user_id': f'u{rnd.randrange(users)}', 'template_id': template['id'], 'date': rnd.choice(days),
+            'status': 'completed' if completed else 'upcoming', 'template_name': template['name'],
+            'description': template['description'], 'exercises': template['exercises'],
+            # Частина тривалостей дробова: POST /daily_workouts/<id>/complete приймає float
+            **({'duration_seconds': rnd.choice((rnd.randrange(1800, 5400), round(rnd.uniform(1800, 5400), 1)))}
+               if completed else {}),
+        })
+    for user in range(users):
+        for day in rnd.sample(days, 10):
+            store.progress.save_weight(f'u{user}', day, round(rnd.uniform(55, 110), 1))
+
+
+def timed(label, function, *args, **kwargs):
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    print(f'{label:<32} {time.perf_counter() - started:>8.2f} с')
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Швидкість адміністративних звітів на великій кількості тренувань')
+    parser.add_argument('--workouts', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--templates', type=int, default=500)
+    args = parser.parse_args()
+
+    store = MemoryStore()
+    timed(f'заповнення ({args.workouts} тренувань)', fill, store, args.workouts, args.users, args.templates)
+    snapshot = timed('знімок у колонки', reporting.Snapshot.take, store)
+
+    report = timed('звіт (array, без NumPy)', reporting.build_report, snapshot, use_numpy=False)
+    if reporting.np is not None:
+        numpy_report = timed('звіт (NumPy)', reporting.build_report, snapshot, use_numpy=True)
+        # Обидві реалізації мають давати однаковий результат (з точністю до округлення)
+        rate = abs(numpy_report.pop('average_user_completion_rate') - report.pop('average_user_completion_rate'))
+        assert rate < 1e-9 and numpy_report == report, 'Звіти NumPy та array не збігаються'
+    else:
+        print('NumPy не встановлено — пропускаємо векторизований варіант')
+
+    print(f"рядків: {len(snapshot)}, завершено: {report['workouts_completed']}, "
+          f"днів з активністю: {len(report['active_users_per_day'])}")
+
+
+if __name__ == '__main__':
+    main()
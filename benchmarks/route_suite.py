@@ -0,0 +1,671 @@
+# benchmarks/route_suite.py
+# Відтворюваний бенчмарк усіх маршрутів app.py. Сховище заповнюється
+# синтетичними даними заданого масштабу: користувачі, глобальні та особисті
+# шаблони з різними фасетами, роки щоденних тренувань (частина завершена з
+# фактичними вагами) і записів ваги. Кожен маршрут проганяється через тестовий
+# клієнт Flask (без мережі) і через справжній HTTP-сервер werkzeug (багатопотоковий,
+# як app.run; клієнти — keep-alive з'єднання в потоках того ж процесу). Для кожного
+# маршруту виводяться запити/с та p50/p95/p99 латентності.
+#
+# Маршрут без сценарію — помилка: новий маршрут має отримати сценарій тут.
+# З --save-baseline результати зберігаються у файл, з --baseline — порівнюються
+# з ним: якщо p95 якогось маршруту зріс більше ніж на --tolerance або маршрут
+# повернув неочікуваний код, скрипт завершується з кодом 1.
+#
+#     python -m benchmarks.route_suite [--backend memory] [--users 200] [--templates 300] [--years 2]
+#                                      [--modes client,http] [--requests 200] [--concurrency 8]
+#                                      [--save-baseline routes.json] [--baseline routes.json]
+import argparse
+import contextlib
+import http.client
+import io
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from urllib.parse import quote
+
+from benchmarks.asgi_load import percentile
+from benchmarks.record_memory import DIFFICULTIES, DURATIONS, GOALS
+
+PASSWORD = 'bench-pass'
+
+# Вправи за групами м'язів; шаблон складається з вправ своїх груп
+EXERCISES = {
+    'Груди': ['Жим лежачи', 'Жим гантелей на похилій лаві', 'Віджимання на брусах'],
+    'Спина': ['Тяга верхнього блоку', 'Тяга штанги в нахилі', 'Підтягування'],
+    'Ноги': ['Присідання зі штангою', 'Жим ногами', 'Випади з гантелями'],
+    'Плечі': ['Махи гантелями в сторони', 'Жим гантелей сидячи', 'Армійський жим'],
+    'Біцепс': ['Згинання рук зі штангою', 'Молотки'],
+    'Трицепс': ['Французький жим', 'Розгинання рук на блоці'],
+    'Прес': ['Скручування', 'Підйом ніг у висі'],
+}
+EQUIPMENT = ['Штанга', 'Гантелі', 'Тренажери', 'Гирі', 'Без обладнання']
+
+# Маршрути, кожен запит до яких коштує хешування пароля або створення користувача з даними
+SLOW_ROUTES = {('POST', '/register'), ('POST', '/login'), ('DELETE', '/reset_my_data')}
+
+# Запит сценарію: метод, шлях з параметрами, заголовки, JSON-тіло та очікуваний код відповіді
+Call = namedtuple('Call', 'method path headers body status')
+
+SCENARIOS = {}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Запити/с і латентність кожного маршруту')
+    parser.add_argument('--backend', default='memory', choices=['memory', 'sqlite'])
+    parser.add_argument('--modes', default='client,http', help='client (тестовий клієнт), http або обидва')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--active', type=int, default=16, help='користувачів, від імені яких надсилаються запити')
+    parser.add_argument('--templates', type=int, default=300, help='глобальних шаблонів')
+    parser.add_argument('--personal', type=int, default=3, help='до скількох особистих шаблонів на користувача')
+    parser.add_argument('--years', type=float, default=2, help='скільки років історії на користувача')
+    parser.add_argument('--workout-rate', type=float, default=0.5, help='частка днів з тренуванням')
+    parser.add_argument('--completion-rate', type=float, default=0.7, help='частка минулих тренувань, що завершені')
+    parser.add_argument('--progress-rate', type=float, default=0.6, help='частка днів із записом ваги')
+    parser.add_argument('--requests', type=int, default=200, help='запитів на маршрут')
+    parser.add_argument('--slow-requests', type=int, default=20,
+                        help='запитів на маршрут для /register, /login і /reset_my_data')
+    parser.add_argument('--warmup', type=int, default=5, help='запитів на маршрут перед вимірюванням')
+    parser.add_argument('--concurrency', type=int, default=8, help='паралельних з\'єднань у режимі http')
+    parser.add_argument('--accept-encoding', default='gzip', help='Accept-Encoding запитів (порожній — без стиснення)')
+    parser.add_argument('--routes', help='лише маршрути, що містять цей рядок')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--save-baseline', help='зберегти результати у JSON-файл')
+    parser.add_argument('--baseline', help='порівняти результати з JSON-файлом')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='допустимий ріст p95 відносно базового')
+    parser.add_argument('--min-delta-ms', type=float, default=0.5,
+                        help='ріст p95 менше за стільки мілісекунд не вважається регресією')
+    return parser.parse_args()
+
+
+# --- Синтетичні дані ---
+
+def make_template(rnd, number, owner_id, is_global):
+    groups = rnd.sample(sorted(EXERCISES), rnd.randint(1, 3))
+    names = [name for group in groups for name in EXERCISES[group]]
+    return {
+        'name': f'Шаблон {number}', 'description': f'Тренування: {", ".join(groups).lower()}.',
+        'exercises': [{'name': name, 'sets': rnd.randint(3, 5), 'reps': rnd.choice(['6-8', '8-12', '10-15'])}
+                      for name in rnd.sample(names, min(len(names), rnd.randint(3, 6)))],
+        'is_global': is_global, 'user_id': owner_id, 'muscle_groups': groups,
+        'goal': rnd.choice(GOALS), 'difficulty': rnd.choice(DIFFICULTIES),
+        'equipment': rnd.sample(EQUIPMENT, rnd.randint(1, 3)), 'duration_category': rnd.choice(DURATIONS),
+    }
+
+
+def actual_results(template, rnd, strength=1.0):
+    """Вправи шаблону з фактичними вагами та підходами, як їх надсилає застосунок."""
+    exercises = []
+    for exercise in template['exercises']:
+        reps = rnd.randint(6, 12)
+        weight = round(rnd.uniform(20, 100) * strength / 2.5) * 2.5
+        exercises.append(dict(exercise, actual_weight=str(weight),
+                              actual_sets_reps=f"{exercise['sets']}x{reps}"))
+    return exercises
+
+
+def complete(api, user_id, workout, results, duration_seconds):
+    """Завершує тренування так само, як POST /daily_workouts/<id>/complete."""
+    api.user_workouts_data.mark_completed(user_id, workout['id'], results, duration_seconds)
+    api.user_progress.record_completed(user_id, workout['date'])
+    api.user_analytics.record_completed(user_id, workout['date'], duration_seconds)
+
+
+def fill_user(api, user_id, templates, days, args, rnd):
+    """Записи ваги й тренування користувача за days (минулі — частково завершені) та на 4 тижні вперед."""
+    today = date.today()
+    with api.store.transaction(user_id):
+        weight = rnd.uniform(60, 100)
+        for day in days:
+            weight += rnd.uniform(-0.3, 0.25)
+            if rnd.random() < args.progress_rate:
+                previous = api.user_progress.save_weight(user_id, day.isoformat(), round(weight, 1))
+                api.user_analytics.record_weight(user_id, day.isoformat(), previous, round(weight, 1))
+
+        upcoming = [today + timedelta(days=i) for i in range(28)]
+        planned = [(day, rnd.choice(templates)) for day in days + upcoming if rnd.random() < args.workout_rate]
+        created = api.user_workouts_data.add_many(
+            [api.build_daily_workout(user_id, template, day.isoformat()) for day, template in planned])
+        for index, (workout, (day, template)) in enumerate(zip(created, planned)):
+            if day < today and rnd.random() < args.completion_rate:
+                # Сила поступово зростає, тож рекорди й 1ПМ оновлюються впродовж історії
+                results = actual_results(template, rnd, 0.7 + 0.6 * index / len(planned))
+                # Частина тривалостей дробова, як дозволяє POST /daily_workouts/<id>/complete
+                duration = rnd.randrange(1800, 5400) if rnd.random() < 0.5 else round(rnd.uniform(1800, 5400), 1)
+                complete(api, user_id, workout, results, duration)
+
+
+def make_token(api, user_id):
+    """Токен доступу, як його видає POST /login (без перевірки пароля)."""
+    import jwt
+    return jwt.encode({'user_id': user_id, 'exp': datetime.utcnow() + timedelta(hours=24)},
+                      api.app.config['SECRET_KEY'], algorithm='HS256')
+
+
+def add_user(api, name, password_hash):
+    api.users.add({'username': name, 'email': f'{name}@example.com', 'password': password_hash, 'role': 'user'})
+    return api.users.get_by_email(f'{name}@example.com')
+
+
+class Context:
+    """Засіяні дані та стан, з якого сценарії складають запити."""
+
+    def __init__(self, api, args):
+        self.api = api
+        self.args = args
+        self.rnd = random.Random(args.seed)
+        self.serial = 0
+        self.password_hash = api.password_hasher.hash(PASSWORD)  # Один хеш на всіх засіяних користувачів
+        self.accept_encoding = args.accept_encoding
+
+    def seed(self):
+        api, args, rnd = self.api, self.args, self.rnd
+        admin = api.users.get_by_email('admin@example.com')
+        self.admin_headers = {'x-access-token': make_token(api, admin['id'])}
+        self.global_templates = [api.workout_templates.add(make_template(rnd, i, admin['id'], True))
+                                 for i in range(args.templates)]
+        today = date.today()
+        self.days = [today - timedelta(days=i) for i in range(int(args.years * 365), 0, -1)]
+        self.users = []
+        for i in range(args.users):
+            user = add_user(api, f'bench{i}', self.password_hash)
+            personal = [api.workout_templates.add(make_template(rnd, f'{i}.{j}', user['id'], False))
+                        for j in range(rnd.randint(0, args.personal))]
+            fill_user(api, user['id'], self.global_templates + personal, self.days, args, rnd)
+            if i < args.active:
+                user['headers'] = {'x-access-token': make_token(api, user['id'])}
+                user['templates'] = personal
+                user['exercises'] = [item['name'] for item in api.user_exercises.list_for_user(user['id'])]
+                user['workout_ids'] = [workout['id'] for workout in
+                                       api.user_workouts_data.iter_for_user(user['id'], None, 500)]
+                self.users.append(user)
+
+    def user(self):
+        return self.rnd.choice(self.users)
+
+    def next_serial(self):
+        self.serial += 1
+        return self.serial
+
+    def date_range(self, days):
+        start = self.rnd.choice(self.days[:-days] or self.days)
+        return f'from={start.isoformat()}&to={(start + timedelta(days=days)).isoformat()}'
+
+
+def scenario(method, rule):
+    """Реєструє функцію (контекст, кількість) -> список Call для маршруту."""
+    def register(build):
+        SCENARIOS[(method, rule)] = build
+        return build
+    return register
+
+
+# --- Сценарії маршрутів ---
+
+@scenario('POST', '/register')
+def register_calls(ctx, count):
+    calls = []
+    for _ in range(count):
+        name = f'new{ctx.next_serial()}'
+        calls.append(Call('POST', '/register', {},
+                          {'username': name, 'email': f'{name}@example.com', 'password': PASSWORD}, 201))
+    # Пароль не рядком відхиляється до хешування, а ім'я не рядком — до унікального індексу
+    for i in range(0, count, 10):
+        calls[i] = calls[i]._replace(body=dict(calls[i].body, password=12345678), status=400)
+    for i in range(5, count, 10):
+        calls[i] = calls[i]._replace(body=dict(calls[i].body, username=[calls[i].body['username']]), status=400)
+    return calls
+
+
+@scenario('POST', '/login')
+def login_calls(ctx, count):
+    calls = [Call('POST', '/login', {}, {'email': user['email'], 'password': PASSWORD}, 200)
+             for user in (ctx.user() for _ in range(count))]
+    for i in range(0, count, 10):
+        calls[i] = calls[i]._replace(body=dict(calls[i].body, password=12345678), status=400)
+    return calls
+
+
+@scenario('GET', '/metrics')
+def metrics_calls(ctx, count):
+    token = ctx.api.app.config['METRICS_TOKEN']
+    headers = {'Authorization': f'Bearer {token}'} if token else {}
+    return [Call('GET', '/metrics', headers, None, 200)] * count
+
+
+def admin_get(path):
+    def build(ctx, count):
+        return [Call('GET', path, ctx.admin_headers, None, 200)] * count
+    return build
+
+
+scenario('GET', '/admin/token_cache')(admin_get('/admin/token_cache'))
+scenario('GET', '/admin/compression')(admin_get('/admin/compression'))
+scenario('GET', '/admin/profiler')(admin_get('/admin/profiler'))
+scenario('GET', '/admin/journal')(admin_get('/admin/journal'))
+
+
+@scenario('POST', '/admin/profiler')
+def profiler_calls(ctx, count):
+    # Вимкнення вже вимкненого профайлера: вимірюється сам маршрут, а не вибірка стеків
+    return [Call('POST', '/admin/profiler', ctx.admin_headers, {'enabled': False}, 200)] * count
+
+
+@scenario('GET', '/admin/reports')
+def report_calls(ctx, count):
+    return [Call('GET', f'/admin/reports?{ctx.date_range(90)}', ctx.admin_headers, None, 200)
+            for _ in range(count)]
+
+
+@scenario('GET', '/my_profile_data')
+def profile_calls(ctx, count):
+    return [Call('GET', '/my_profile_data', ctx.user()['headers'], None, 200) for _ in range(count)]
+
+
+@scenario('PUT', '/my_profile_data')
+def update_profile_calls(ctx, count):
+    # Ті самі ім'я та email: проходить перевірку унікальності та оновлює запис
+    return [Call('PUT', '/my_profile_data', user['headers'],
+                 {'username': user['username'], 'email': user['email']}, 200)
+            for user in (ctx.user() for _ in range(count))]
+
+
+@scenario('GET', '/my_progress')
+def progress_calls(ctx, count):
+    calls = [Call('GET', '/my_progress' + ctx.rnd.choice(['', '?limit=30', f'?{ctx.date_range(90)}']),
+                  ctx.user()['headers'], None, 200) for _ in range(count)]
+    # Курсор іншої форми (число 0 замість дати) відхиляється, а не падає під час порівняння ключів
+    for i in range(0, count, 20):
+        calls[i] = calls[i]._replace(path='/my_progress?limit=30&cursor=MA', status=400)
+    return calls
+
+
+@scenario('POST', '/my_progress')
+def add_progress_calls(ctx, count):
+    calls = [Call('POST', '/my_progress', ctx.user()['headers'], {'weight': round(ctx.rnd.uniform(60, 100), 1)}, 200)
+             for _ in range(count)]
+    # Вага рядком відхиляється до збереження; інакше наступні записи ваги того дня падали з 500
+    for i in range(0, count, 20):
+        calls[i] = Call('POST', '/my_progress', calls[i].headers, {'weight': '75'}, 400)
+    return calls
+
+
+@scenario('GET', '/my_analytics')
+def analytics_calls(ctx, count):
+    queries = ['', '?period=month&limit=24', '?period=week&limit=52&window=8']
+    return [Call('GET', f'/my_analytics{ctx.rnd.choice(queries)}', ctx.user()['headers'], None, 200)
+            for _ in range(count)]
+
+
+@scenario('GET', '/my_exercises')
+def exercises_calls(ctx, count):
+    return [Call('GET', '/my_exercises', ctx.user()['headers'], None, 200) for _ in range(count)]
+
+
+def exercise_calls(path, query=''):
+    def build(ctx, count):
+        calls = []
+        for _ in range(count):
+            user = ctx.user()
+            name = ctx.rnd.choice(user['exercises'])
+            calls.append(Call('GET', f'{path}?name={name}{query}', user['headers'], None, 200))
+        return calls
+    return build
+
+
+scenario('GET', '/my_exercises/history')(exercise_calls('/my_exercises/history', '&limit=20'))
+scenario('GET', '/my_exercises/records')(exercise_calls('/my_exercises/records'))
+scenario('GET', '/my_exercises/stats')(exercise_calls('/my_exercises/stats', '&weeks=12'))
+
+
+@scenario('GET', '/workout_templates')
+def templates_calls(ctx, count):
+    def query():
+        return ctx.rnd.choice([
+            '', '?limit=20',
+            f'?muscle_group={ctx.rnd.choice(sorted(EXERCISES))}',
+            f'?goal={ctx.rnd.choice(GOALS)}&difficulty={ctx.rnd.choice(DIFFICULTIES)}',
+            '?' + '&'.join(f'equipment={item}' for item in ctx.rnd.sample(EQUIPMENT, 2)),
+        ])
+    return [Call('GET', f'/workout_templates{query()}', ctx.user()['headers'], None, 200) for _ in range(count)]
+
+
+@scenario('POST', '/workout_templates')
+def add_template_calls(ctx, count):
+    admin_id = ctx.global_templates[0]['user_id']
+    # Особисті шаблони адміністратора: спільний кеш глобальних шаблонів лишається чинним
+    calls = [Call('POST', '/workout_templates', ctx.admin_headers,
+                  make_template(ctx.rnd, f'new{ctx.next_serial()}', admin_id, False), 201)
+             for _ in range(count)]
+    # Вправи рядком відхиляються, а не зберігаються посимвольно
+    for i in range(0, count, 20):
+        calls[i] = calls[i]._replace(body=dict(calls[i].body, exercises='Жим лежачи 3x10'), status=400)
+    return calls
+
+
+@scenario('GET', '/workout_templates/<template_id>')
+def template_calls(ctx, count):
+    calls = []
+    for _ in range(count):
+        user = ctx.user()
+        template = ctx.rnd.choice(ctx.global_templates + user['templates'])
+        calls.append(Call('GET', f"/workout_templates/{template['id']}", user['headers'], None, 200))
+    return calls
+
+
+def admin_templates(ctx, count):
+    admin_id = ctx.global_templates[0]['user_id']
+    return [ctx.api.workout_templates.add(make_template(ctx.rnd, f'tmp{ctx.next_serial()}', admin_id, False))
+            for _ in range(count)]
+
+
+@scenario('PUT', '/workout_templates/<template_id>')
+def update_template_calls(ctx, count):
+    templates = admin_templates(ctx, min(count, 20))
+    return [Call('PUT', f"/workout_templates/{templates[i % len(templates)]['id']}", ctx.admin_headers,
+                 {'description': f'Оновлений опис {i}', 'difficulty': ctx.rnd.choice(DIFFICULTIES)}, 200)
+            for i in range(count)]
+
+
+@scenario('DELETE', '/workout_templates/<template_id>')
+def delete_template_calls(ctx, count):
+    return [Call('DELETE', f"/workout_templates/{template['id']}", ctx.admin_headers, None, 200)
+            for template in admin_templates(ctx, count)]
+
+
+@scenario('GET', '/daily_workouts')
+def workouts_calls(ctx, count):
+    return [Call('GET', '/daily_workouts' + ctx.rnd.choice(['', '?limit=50', f'?{ctx.date_range(30)}']),
+                 ctx.user()['headers'], None, 200) for _ in range(count)]
+
+
+@scenario('POST', '/daily_workouts')
+def add_workout_calls(ctx, count):
+    calls = []
+    for _ in range(count):
+        day = date.today() + timedelta(days=ctx.rnd.randrange(1, 60))
+        calls.append(Call('POST', '/daily_workouts', ctx.user()['headers'],
+                          {'template_id': ctx.rnd.choice(ctx.global_templates)['id'], 'date': day.isoformat()}, 201))
+    return calls
+
+
+@scenario('POST', '/daily_workouts/bulk')
+def bulk_calls(ctx, count):
+    start = date.today() + timedelta(days=1)
+    recurrence = {'days_of_week': [0, 2, 4], 'start_date': start.isoformat(),
+                  'end_date': (start + timedelta(weeks=4)).isoformat()}
+    calls = [Call('POST', '/daily_workouts/bulk', ctx.user()['headers'],
+                  {'template_id': ctx.rnd.choice(ctx.global_templates)['id'], 'recurrence': recurrence}, 201)
+             for _ in range(count)]
+    # template_id списком відхиляється разом з іншими помилками формату
+    for i in range(0, count, 20):
+        calls[i] = calls[i]._replace(body=dict(calls[i].body, template_id=['x']), status=400)
+    return calls
+
+
+@scenario('GET', '/daily_workouts/<workout_id>')
+def workout_calls(ctx, count):
+    calls = []
+    for _ in range(count):
+        user = ctx.user()
+        calls.append(Call('GET', f"/daily_workouts/{ctx.rnd.choice(user['workout_ids'])}", user['headers'], None, 200))
+    return calls
+
+
+def planned_workouts(ctx, count):
+    """Нові заплановані тренування активних користувачів: [(користувач, шаблон, тренування)]."""
+    planned = []
+    for _ in range(count):
+        user, template = ctx.user(), ctx.rnd.choice(ctx.global_templates)
+        day = date.today() - timedelta(days=ctx.rnd.randrange(1, 60))
+        workout = ctx.api.user_workouts_data.add(ctx.api.build_daily_workout(user['id'], template, day.isoformat()))
+        planned.append((user, template, workout))
+    return planned
+
+
+@scenario('DELETE', '/daily_workouts/<workout_id>')
+def delete_workout_calls(ctx, count):
+    calls = []
+    for index, (user, template, workout) in enumerate(planned_workouts(ctx, count)):
+        # Кожне друге тренування завершене: видалення прибирає його й з аналітики
+        if index % 2:
+            with ctx.api.store.transaction(user['id']):
+                complete(ctx.api, user['id'], workout, actual_results(template, ctx.rnd), 3600)
+        calls.append(Call('DELETE', f"/daily_workouts/{workout['id']}", user['headers'], None, 200))
+    return calls
+
+
+@scenario('POST', '/daily_workouts/<workout_id>/complete')
+def complete_calls(ctx, count):
+    calls = [Call('POST', f"/daily_workouts/{workout['id']}/complete", user['headers'],
+                  {'exercises': actual_results(template, ctx.rnd), 'duration_seconds': ctx.rnd.randrange(1800, 5400)},
+                  200)
+             for user, template, workout in planned_workouts(ctx, count)]
+    # true не є тривалістю, хоча bool — підклас int
+    for i in range(0, count, 20):
+        calls[i] = calls[i]._replace(body=dict(calls[i].body, duration_seconds=True), status=400)
+    return calls
+
+
+@scenario('POST', '/daily_workouts/<workout_id>/reset_status')
+def reset_status_calls(ctx, count):
+    calls = []
+    for user, template, workout in planned_workouts(ctx, count):
+        with ctx.api.store.transaction(user['id']):
+            complete(ctx.api, user['id'], workout, actual_results(template, ctx.rnd), 3600)
+        calls.append(Call('POST', f"/daily_workouts/{workout['id']}/reset_status", user['headers'], None, 200))
+    return calls
+
+
+@scenario('DELETE', '/reset_my_data')
+def reset_data_calls(ctx, count):
+    # Кожен запит стирає окремого користувача з місяцем історії
+    calls = []
+    for _ in range(count):
+        user = add_user(ctx.api, f'reset{ctx.next_serial()}', ctx.password_hash)
+        fill_user(ctx.api, user['id'], ctx.global_templates, ctx.days[-30:], ctx.args, ctx.rnd)
+        calls.append(Call('DELETE', '/reset_my_data', {'x-access-token': make_token(ctx.api, user['id'])}, None, 200))
+    return calls
+
+
+# --- Виконання ---
+
+def app_routes(app):
+    """Усі (метод, шаблон маршруту) застосунку, крім статичних файлів."""
+    return sorted((method, rule.rule) for rule in app.url_map.iter_rules() if rule.endpoint != 'static'
+                  for method in rule.methods - {'HEAD', 'OPTIONS'})
+
+
+def route_order(route):
+    # Спершу читання, потім зміни та видалення: записи не впливають на виміри читання в тому ж режимі
+    return ({'GET': 0, 'POST': 1, 'PUT': 1, 'DELETE': 2}[route[0]], route[1])
+
+
+class Result:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.first_error = None
+        self.elapsed = 0.0
+
+    def record(self, call, status, body, latency):
+        self.latencies.append(latency)
+        if status != call.status:
+            self.errors += 1
+            if self.first_error is None:
+                self.first_error = f'{call.method} {call.path}: {status} {body[:200]!r}'
+
+
+def headers_for(ctx, call):
+    headers = dict(call.headers)
+    if ctx.accept_encoding:
+        headers['Accept-Encoding'] = ctx.accept_encoding
+    return headers
+
+
+def run_client(ctx, client, calls, result):
+    for call in calls:
+        started = time.perf_counter()
+        response = client.open(call.path, method=call.method, headers=headers_for(ctx, call), json=call.body)
+        body = response.get_data()
+        result.record(call, response.status_code, body, time.perf_counter() - started)
+
+
+def run_http(ctx, port, calls, result):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    try:
+        for call in calls:
+            headers = headers_for(ctx, call)
+            body = None
+            if call.body is not None:
+                body = json.dumps(call.body).encode('utf-8')
+                headers['Content-Type'] = 'application/json'
+            started = time.perf_counter()
+            try:
+                # Кириличні значення параметрів (назви вправ, фасети) кодуються, як у браузері
+                connection.request(call.method, quote(call.path, safe='/?&=%'), body, headers)
+                response = connection.getresponse()
+                data = response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                status, data = None, str(e).encode('utf-8')
+            result.record(call, status, data, time.perf_counter() - started)
+    finally:
+        connection.close()
+
+
+def measure(ctx, mode, target, route, count):
+    """Проганяє запити сценарію маршруту; повертає Result лише для виміряних запитів."""
+    calls = SCENARIOS[route](ctx, ctx.args.warmup + count)
+    warmup, calls = calls[:ctx.args.warmup], calls[ctx.args.warmup:]
+    result = Result()
+    if mode == 'client':
+        run_client(ctx, target, warmup, Result())
+        started = time.perf_counter()
+        run_client(ctx, target, calls, result)
+    else:
+        run_http(ctx, target, warmup, Result())
+        workers = max(1, min(ctx.args.concurrency, len(calls)))
+        threads = [threading.Thread(target=run_http, args=(ctx, target, calls[i::workers], result))
+                   for i in range(workers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+@contextlib.contextmanager
+def http_server(app):
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    # threaded=True, як app.run: потік на з'єднання, HTTP/1.1 з keep-alive
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server.server_port
+    finally:
+        server.shutdown()
+        thread.join()
+
+
+def compare(results, baseline, args):
+    """Повертає опис регресій p95 відносно базових результатів."""
+    regressions = []
+    for key, current in sorted(results.items()):
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        limit = max(previous['p95'] * (1 + args.tolerance), previous['p95'] + args.min_delta_ms)
+        if current['p95'] > limit:
+            regressions.append(f"{key}: p95 {previous['p95']:.2f} -> {current['p95']:.2f} мс")
+    return regressions
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix='route_suite_')
+    # app.py читає налаштування сховища під час імпорту
+    os.environ['STORAGE_BACKEND'] = args.backend
+    os.environ['DATABASE_NAME'] = os.path.join(workdir, 'routes.db')
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):  # DEBUG-повідомлення застосунку
+            import app as api
+
+        routes = app_routes(api.app)
+        missing = [f'{method} {rule}' for method, rule in routes if (method, rule) not in SCENARIOS]
+        if missing:
+            sys.exit('маршрути без сценарію: ' + ', '.join(missing))
+        if args.routes:
+            routes = [route for route in routes if args.routes in route[1]]
+        routes.sort(key=route_order)
+
+        ctx = Context(api, args)
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            ctx.seed()
+        workouts = sum(1 for user in ctx.users for _ in api.user_workouts_data.iter_for_user(user['id']))
+        print(f'засіяно за {time.perf_counter() - started:.1f} с: {args.users} користувачів, '
+              f'{args.templates} глобальних шаблонів, {args.years:g} р. історії '
+              f'(~{workouts // max(1, len(ctx.users))} тренувань на користувача), сховище {args.backend}')
+
+        results = {}
+        failures = []
+        print(f"{'режим':<7} {'маршрут':<46} {'запитів':>8} {'помилок':>8} {'запитів/с':>10} "
+              f"{'p50, мс':>8} {'p95, мс':>8} {'p99, мс':>8}")
+        for mode in args.modes.split(','):
+            with contextlib.ExitStack() as stack:
+                target = (api.app.test_client() if mode == 'client'
+                          else stack.enter_context(http_server(api.app)))
+                for route in routes:
+                    count = args.slow_requests if route in SLOW_ROUTES else args.requests
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        result = measure(ctx, mode, target, route, count)
+                    latencies = result.latencies
+                    summary = {
+                        'rps': len(latencies) / result.elapsed,
+                        'p50': percentile(latencies, 50) * 1000,
+                        'p95': percentile(latencies, 95) * 1000,
+                        'p99': percentile(latencies, 99) * 1000,
+                        'errors': result.errors,
+                    }
+                    key = f'{mode} {route[0]} {route[1]}'
+                    results[key] = summary
+                    print(f"{mode:<7} {route[0] + ' ' + route[1]:<46} {len(latencies):>8} {result.errors:>8} "
+                          f"{summary['rps']:>10.0f} {summary['p50']:>8.2f} {summary['p95']:>8.2f} "
+                          f"{summary['p99']:>8.2f}")
+                    if result.errors:
+                        failures.append(f'{key}: {result.errors} неочікуваних відповідей, '
+                                        f'перша — {result.first_error}')
+
+        if args.save_baseline:
+            with open(args.save_baseline, 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2, sort_keys=True)
+            print(f'результати збережено у {args.save_baseline}')
+        if args.baseline:
+            with open(args.baseline, encoding='utf-8') as file:
+                failures += compare(results, json.load(file), args)
+
+        if failures:
+            print('\nрегресії та помилки:')
+            for failure in failures:
+                print(f'  {failure}')
+            sys.exit(1)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# benchmarks/signup_latency.py
+# Навантажувальний тест реєстрації: латентність додавання користувача
+# (атомарна перевірка унікальності + резервування) має залишатися сталою
+# незалежно від того, скільки користувачів уже є в системі.
+#
+#     python -m benchmarks.signup_latency [--sizes 1000,10000,100000,1000000] [--samples 2000]
+import argparse
+import statistics
+import time
+
+from repositories import UserRepository
+
+
+def fill(repo, start, stop):
+    """Швидко заповнює репозиторій користувачами з номерами [start, stop)."""
+    for i in range(start, stop):
+        repo.add({'id': f'u{i}', 'username': f'user{i}', 'email': f'user{i}@example.com',
+                  'password': 'x', 'role': 'user'})
+
+
+def measure(repo, offset, samples):
+    """Вимірює час реєстрації `samples` нових користувачів (у наносекундах)."""
+    timings = []
+    for i in range(offset, offset + samples):
+        user = {'id': f'n{i}', 'username': f'new{i}', 'email': f'new{i}@example.com',
+                'password': 'x', 'role': 'user'}
+        started = time.perf_counter_ns()
+        repo.add(user)
+        timings.append(time.perf_counter_ns() - started)
+    return timings
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Латентність реєстрації залежно від кількості користувачів')
+    parser.add_argument('--sizes', default='1000,10000,100000,1000000')
+    parser.add_argument('--samples', type=int, default=2000)
+    args = parser.parse_args()
+
+    sizes = sorted(int(s) for s in args.sizes.split(','))
+    repo = UserRepository()
+    filled = 0
+    print(f"{'users':>10} {'mean, µs':>10} {'p50, µs':>10} {'p99, µs':>10}")
+    for size in sizes:
+        fill(repo, filled, size)
+        filled = size
+        timings = measure(repo, size, args.samples)
+        print(f"{size:>10} {statistics.mean(timings) / 1000:>10.2f} "
+              f"{percentile(timings, 50) / 1000:>10.2f} {percentile(timings, 99) / 1000:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+# compression.py
+# Стиснення відповідей для клієнтів на повільних мережах. Відповіді, більші за
+# поріг, стискаються brotli (якщо встановлено пакет brotli) або gzip — залежно
+# від Accept-Encoding клієнта. Стиснене тіло відповіді з ETag зберігається в
+# кеші за (шлях і параметри запиту, ETag, кодування): спільний список
+# глобальних шаблонів стискається один раз на версію, а не на кожен запит.
+#
+# ETag стисненої відповіді отримує суфікс кодування ("...-gzip"), бо це інше
+# представлення ресурсу; responses.not_modified приймає будь-який із варіантів.
+import gzip
+import threading
+from collections import OrderedDict
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli необов'язковий: без нього відповіді стискаються лише gzip
+    brotli = None
+
+# Типи вмісту, які має сенс стискати
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/')
+
+
+def encoded_etag(etag, encoding):
+    """ETag стисненого представлення відповіді з ETag etag."""
+    return f'{etag}-{encoding}'
+
+
+def etag_variants(etag):
+    """ETag відповіді та всіх її стиснених представлень."""
+    return [etag] + [encoded_etag(etag, encoding) for encoding in ('br', 'gzip')]
+
+
+class ResponseCompressor:
+    """
+    Стискає відповіді в after_request. Не стискаються потокові відповіді,
+    відповіді з кодом, відмінним від 200, менші за min_size байтів, уже стиснені
+    та з нетекстовим вмістом. Стиснені тіла відповідей з ETag кешуються
+    (до cache_size записів, LRU).
+    """
+
+    def __init__(self, min_size=1024, gzip_level=6, brotli_quality=5, cache_size=256):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache_size = cache_size
+        # Кодування в порядку переваги сервера при однаковій якості в Accept-Encoding
+        self.encodings = ('br', 'gzip') if brotli is not None else ('gzip',)
+        self._cache = OrderedDict()  # {(шлях, параметри, etag, кодування): стиснене тіло}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def init_app(self, app):
+        app.after_request(self.compress_response)
+        return self
+
+    def encode(self, body, encoding):
+        if encoding == 'br':
+            return brotli.compress(body, quality=self.brotli_quality)
+        # mtime=0: однакове тіло завжди дає однакові байти
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    def _compressed(self, body, encoding, etag):
+        if etag is None:
+            return self.encode(body, encoding)
+        # ETag різних ресурсів можуть збігатися (версії рахуються окремо для кожної області)
+        key = (request.path, request.query_string, etag, encoding)
+        with self._lock:
+            compressed = self._cache.get(key)
+            if compressed is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return compressed
+            self.misses += 1
+        compressed = self.encode(body, encoding)
+        with self._lock:
+            self._cache[key] = compressed
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return compressed
+
+    def compress_response(self, response):
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(self.encodings)
+        etag, weak = response.get_etag()
+
+        if response.status_code == 304:
+            # Клієнт має стиснене представлення — повертаємо його ETag
+            if etag is not None and encoding is not None and \
+                    request.if_none_match.contains(encoded_etag(etag, encoding)):
+                response.set_etag(encoded_etag(etag, encoding), weak)
+            return response
+        if (encoding is None or response.status_code != 200 or response.is_streamed
+                or response.direct_passthrough or 'Content-Encoding' in response.headers
+                or not response.mimetype.startswith(COMPRESSIBLE_MIMETYPES)):
+            return response
+        body = response.get_data()
+        if len(body) < self.min_size:
+            return response
+
+        compressed = self._compressed(body, encoding, etag)
+        with self._lock:
+            self.bytes_in += len(body)
+            self.bytes_out += len(compressed)
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        if etag is not None:
+            response.set_etag(encoded_etag(etag, encoding), weak)
+        return response
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'encodings': list(self.encodings),
+                'min_size': self.min_size,
+                'cache_size': len(self._cache),
+                'cache_max_size': self.cache_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+            }
@@ -1,19 +1,32 @@
+import json
 import sqlite3
 from werkzeug.security import generate_password_hash
 
+from analytics import period_key
+from exercises import exercise_key, performed_exercises, session_stats
+from indexes import UniqueConstraintError
+
 # Ім'я файлу, де буде зберігатися база даних
 DATABASE_NAME = 'my_training_data.db'
 
-def create_database_tables():
-    """
-    Ця функція створює таблиці в базі даних,
-    якщо їх ще немає.
-    """
-    # Підключаємося до бази даних (якщо файлу немає, він створиться)
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
+# Міграції схеми. MIGRATIONS[i] переводить базу з версії i на версію i + 1;
+# номер версії зберігається в заголовку файлу бази (PRAGMA user_version).
+# Бази, створені до появи міграцій, мають версію 0 і можуть уже містити частину
+# змін, тому перші міграції ідемпотентні. Нові міграції лише додаються в кінець
+# списку, а вже застосовані не змінюються.
 
-    # Створюємо таблицю для користувачів (де буде їх логін, пароль тощо)
+def add_missing_columns(cursor, table, columns):
+    """Додає до таблиці колонки, яких у ній ще немає."""
+    cursor.execute(f"PRAGMA table_info({table})")
+    existing = {column[1] for column in cursor.fetchall()}
+    for name, definition in columns:
+        if name not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+            print(f"Колонка '{name}' додана до таблиці '{table}'.")
+
+def _create_base_tables(cursor):
+    """Версія 1: користувачі, прогрес, шаблони та щоденні тренування."""
+    # Таблиця користувачів (логін, пароль тощо)
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS users (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -23,7 +36,7 @@ def create_database_tables():
         )
     ''')
 
-    # Створюємо таблицю для прогресу користувачів (вага, завершені тренування)
+    # Прогрес користувачів (вага, завершені тренування)
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS user_progress (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -35,29 +48,21 @@ def create_database_tables():
         )
     ''')
 
-    # ОНОВЛЕНА ТАБЛИЦЯ: workout_templates з додаванням is_global
-    cursor.execute("PRAGMA table_info(workout_templates)")
-    columns = [column[1] for column in cursor.fetchall()]
-
-    if 'workout_templates' not in columns: # Якщо таблиці взагалі немає, створюємо її
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS workout_templates (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                name TEXT NOT NULL,
-                description TEXT,
-                exercises_json TEXT, -- Зберігатиме JSON-рядок зі списком вправ, підходів, повторень
-                is_global BOOLEAN DEFAULT 0, -- НОВА КОЛОНКА: 0 (False) для особистих, 1 (True) для глобальних
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-    elif 'is_global' not in columns: # Якщо таблиця є, але колонки is_global немає, додаємо її
-        cursor.execute('''
-            ALTER TABLE workout_templates ADD COLUMN is_global BOOLEAN DEFAULT 0
-        ''')
-        print("Колонка 'is_global' додана до таблиці 'workout_templates'.")
-
-    # НОВА ТАБЛИЦЯ: user_workouts для зберігання фактичних виконаних/запланованих тренувань
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS workout_templates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            description TEXT,
+            exercises_json TEXT, -- Зберігатиме JSON-рядок зі списком вправ, підходів, повторень
+            is_global BOOLEAN DEFAULT 0, -- 0 (False) для особистих, 1 (True) для глобальних
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+    # У старих базах таблиця шаблонів могла бути створена ще без is_global
+    add_missing_columns(cursor, 'workout_templates', [('is_global', 'BOOLEAN DEFAULT 0')])
+
+    # Фактичні виконані/заплановані тренування
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS user_workouts (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -65,9 +70,8 @@ def create_database_tables():
             template_id INTEGER NOT NULL, -- Посилання на шаблон тренування
             workout_date TEXT NOT NULL, -- Дата, коли це тренування було заплановано/виконано
             status TEXT DEFAULT 'upcoming', -- Може бути 'upcoming', 'in-progress', 'completed'
-            -- Можна також скопіювати name, description, exercises_json з шаблону,
-            -- щоб зберегти стан тренування на момент його створення,
-            -- навіть якщо шаблон пізніше зміниться.
+            -- Копія name, description, exercises_json з шаблону зберігає стан
+            -- тренування на момент його створення, навіть якщо шаблон пізніше зміниться.
             name TEXT NOT NULL,
             description TEXT,
             exercises_json TEXT,
@@ -76,11 +80,322 @@ def create_database_tables():
         )
     ''')
 
-    # Зберігаємо зміни
-    conn.commit()
-    # Закриваємо з'єднання
-    conn.close()
-    print("База даних успішно створена або оновлена.")
+def _add_app_columns(cursor):
+    """Версія 2: роль користувача, фасети шаблонів та тривалість тренування."""
+    add_missing_columns(cursor, 'users', [('role', "TEXT NOT NULL DEFAULT 'user'")])
+    add_missing_columns(cursor, 'workout_templates', [
+        ('muscle_groups', 'TEXT'),  # JSON-список груп м'язів
+        ('goal', 'TEXT'),
+        ('difficulty', 'TEXT'),
+        ('equipment', 'TEXT'),  # JSON-список обладнання
+        ('duration_category', 'TEXT'),
+    ])
+    add_missing_columns(cursor, 'user_workouts', [('duration_seconds', 'INTEGER')])
+
+    # Індекси для фільтрів GET /workout_templates. Фільтри за muscle_groups та equipment
+    # перевіряються через json_each лише для рядків, які вже відібрали ці індекси.
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_workout_templates_user_id ON workout_templates (user_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_workout_templates_is_global ON workout_templates (is_global)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_workout_templates_goal ON workout_templates (goal)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_workout_templates_difficulty ON workout_templates (difficulty)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_workout_templates_duration_category '
+                   'ON workout_templates (duration_category)')
+
+def _create_analytics_tables(cursor):
+    """Версія 3: агрегати для GET /my_analytics."""
+    # Підсумки за тижні ('week'), місяці ('month') та загальні ('total'),
+    # що оновлюються разом із прогресом і статусом тренувань
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_activity (
+            user_id INTEGER NOT NULL,
+            period TEXT NOT NULL,
+            bucket TEXT NOT NULL, -- '2025-W27', '2025-07' або '' для загальних підсумків
+            workouts_completed INTEGER NOT NULL DEFAULT 0,
+            training_seconds INTEGER NOT NULL DEFAULT 0,
+            weight_sum REAL NOT NULL DEFAULT 0,
+            weight_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, period, bucket),
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+
+    # Дні із завершеними тренуваннями — для підрахунку серій
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_activity_days (
+            user_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            workouts_completed INTEGER NOT NULL,
+            PRIMARY KEY (user_id, date),
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+
+def _create_template_versions(cursor):
+    """Версія 4: лічильники версій шаблонів для ETag."""
+    # Див. repositories.TemplateRepository.versions. Зберігаються в базі,
+    # щоб усі процеси видавали однакові ETag.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS template_versions (
+            scope TEXT PRIMARY KEY, -- 'global', 'owner:<user_id>', 'template:<template_id>' або 'epoch'
+            version INTEGER NOT NULL
+        )
+    ''')
+    # Епоха відрізняє лічильники нової бази від лічильників попередньої
+    cursor.execute("INSERT OR IGNORE INTO template_versions (scope, version) VALUES ('epoch', abs(random() % 2147483648))")
+
+def _add_user_indexes(cursor):
+    """Версія 5: індекси для вибірок прогресу й тренувань користувача."""
+    # Записи користувача видаються за датою від новіших до старіших. Для
+    # user_workouts id (rowid) неявно входить в індекс, тож він покриває і
+    # ORDER BY workout_date DESC, id DESC. Префікс user_id обслуговує вибірки
+    # та видалення всіх записів користувача.
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_progress_user_date ON user_progress (user_id, date)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_workouts_user_date ON user_workouts (user_id, workout_date)')
+
+def _create_exercise_tables(cursor):
+    """Версія 6: виконані вправи та підходи завершених тренувань."""
+    # exercises_json лишається документом тренування для клієнта, а ці таблиці
+    # дублюють фактичні результати так, щоб історію та рекорди вправи можна
+    # було отримати індексованим запитом, не розбираючи JSON кожного тренування
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS workout_exercises (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            workout_id INTEGER NOT NULL,
+            position INTEGER NOT NULL, -- Порядковий номер вправи в тренуванні
+            user_id INTEGER NOT NULL,
+            workout_date TEXT NOT NULL,
+            name TEXT NOT NULL,
+            exercise_key TEXT NOT NULL, -- Назва без зайвих пробілів і регістру (exercises.exercise_key)
+            FOREIGN KEY (workout_id) REFERENCES user_workouts (id),
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS exercise_sets (
+            exercise_id INTEGER NOT NULL,
+            set_number INTEGER NOT NULL,
+            reps INTEGER,
+            weight REAL,
+            PRIMARY KEY (exercise_id, set_number),
+            FOREIGN KEY (exercise_id) REFERENCES workout_exercises (id)
+        ) WITHOUT ROWID
+    ''')
+    # Історія вправи користувача впорядкована за датою (і тренуванням, і позицією)
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_workout_exercises_user_exercise '
+                   'ON workout_exercises (user_id, exercise_key, workout_date, workout_id, position)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_workout_exercises_workout ON workout_exercises (workout_id)')
+
+    # Переносимо результати вже завершених тренувань
+    rows = cursor.execute(
+        "SELECT id, user_id, workout_date, exercises_json FROM user_workouts WHERE status = 'completed'").fetchall()
+    for workout_id, user_id, workout_date, exercises_json in rows:
+        try:
+            exercises = json.loads(exercises_json or '[]')
+        except ValueError:
+            continue
+        insert_workout_exercises(cursor, user_id, workout_id, workout_date, exercises)
+
+def _create_exercise_stats(cursor):
+    """Версія 7: показники вправ, що оновлюються разом із виконаними вправами."""
+    # Рядок на вправу користувача: читання показників — пошук за первинним ключем
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS exercise_stats (
+            user_id INTEGER NOT NULL,
+            exercise_key TEXT NOT NULL,
+            sessions INTEGER NOT NULL,
+            max_weight REAL,
+            max_e1rm REAL, -- Найбільший оцінений 1ПМ (exercises.estimated_1rm)
+            PRIMARY KEY (user_id, exercise_key)
+        ) WITHOUT ROWID
+    ''')
+    # sessions — скільки виконань з ненульовим об'ємом дали цей тиждень
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS exercise_weekly_volume (
+            user_id INTEGER NOT NULL,
+            exercise_key TEXT NOT NULL,
+            week TEXT NOT NULL, -- Ключ тижня з analytics.period_key
+            volume REAL NOT NULL,
+            sessions INTEGER NOT NULL,
+            PRIMARY KEY (user_id, exercise_key, week)
+        ) WITHOUT ROWID
+    ''')
+
+    # Рахуємо показники для вже записаних виконань
+    for user_id, workout_date, name, sets in select_workout_exercises(cursor, '1', ()):
+        add_exercise_stats(cursor, user_id, workout_date, [(None, name, sets)])
+
+MIGRATIONS = [
+    _create_base_tables,
+    _add_app_columns,
+    _create_analytics_tables,
+    _create_template_versions,
+    _add_user_indexes,
+    _create_exercise_tables,
+    _create_exercise_stats,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def migrate(conn):
+    """
+    Застосовує до бази міграції, яких у ній ще немає, в одній транзакції.
+    Повертає кількість застосованих міграцій. Якщо схема актуальна, виконується
+    лише читання PRAGMA user_version.
+    """
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    if version == SCHEMA_VERSION:
+        return 0
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(f'Версія схеми бази ({version}) новіша за підтримувану ({SCHEMA_VERSION}).')
+
+    # BEGIN IMMEDIATE одразу бере лок на запис: процеси, що стартують одночасно,
+    # мігрують базу по черзі, а версію перечитуємо вже під локом
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        cursor = conn.cursor()
+        for migration in MIGRATIONS[version:]:
+            migration(cursor)
+        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
+    return max(SCHEMA_VERSION - version, 0)
+
+def create_database_tables(database_name=DATABASE_NAME):
+    """
+    Створює базу даних (якщо файлу немає) та доводить її схему
+    до актуальної версії.
+    """
+    conn = sqlite3.connect(database_name, isolation_level=None)  # Транзакцією керує migrate
+    try:
+        applied = migrate(conn)
+    finally:
+        conn.close()
+    if applied:
+        print(f"База даних успішно створена або оновлена до версії {SCHEMA_VERSION}.")
+
+def unique_violation(error):
+    """
+    Перетворює порушення UNIQUE-обмеження SQLite на UniqueConstraintError,
+    щоб база даних і in-memory індекси повідомляли про конфлікти однаково.
+    Повертає None, якщо помилка має іншу причину.
+    """
+    message = str(error)
+    prefix = 'UNIQUE constraint failed: '
+    if not message.startswith(prefix):
+        return None
+    # Повідомлення має вигляд "UNIQUE constraint failed: users.email"
+    column = message[len(prefix):].split(',')[0].strip().split('.')[-1]
+    return UniqueConstraintError(column)
+
+def insert_user(conn, username, email, password, role='user'):
+    """
+    Додає користувача в таблицю users. Перевірку унікальності email та username
+    виконують UNIQUE-обмеження самої таблиці в межах того ж INSERT,
+    тож окремий SELECT перед вставкою не потрібен.
+    """
+    try:
+        cursor = conn.execute(
+            'INSERT INTO users (username, email, password, role) VALUES (?, ?, ?, ?)',
+            (username, email, password, role)
+        )
+    except sqlite3.IntegrityError as e:
+        error = unique_violation(e)
+        if error is None:
+            raise
+        raise error from e
+    return cursor.lastrowid
+
+def insert_workout_exercises(conn, user_id, workout_id, workout_date, exercises):
+    """
+    Записує виконані вправи тренування та їхні підходи. Повертає записане
+    (див. exercises.performed_exercises) для add_exercise_stats.
+    """
+    performed = performed_exercises(exercises)
+    for position, name, sets in performed:
+        cursor = conn.execute(
+            'INSERT INTO workout_exercises (workout_id, position, user_id, workout_date, name, exercise_key) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (workout_id, position, user_id, workout_date, name, exercise_key(name)))
+        conn.executemany(
+            'INSERT INTO exercise_sets (exercise_id, set_number, reps, weight) VALUES (?, ?, ?, ?)',
+            [(cursor.lastrowid, number, reps, weight) for number, (reps, weight) in enumerate(sets, 1)])
+    return performed
+
+def select_workout_exercises(conn, condition, params):
+    """Повертає (user_id, дата, назва, підходи) для виконаних вправ, що відповідають умові."""
+    rows = conn.execute(
+        'SELECT e.id, e.user_id, e.workout_date, e.name, s.reps, s.weight FROM workout_exercises AS e '
+        f'LEFT JOIN exercise_sets AS s ON s.exercise_id = e.id WHERE {condition} ORDER BY e.id, s.set_number',
+        params).fetchall()
+    selected = []
+    for row in rows:
+        if not selected or selected[-1][0] != row[0]:
+            selected.append((row[0], row[1], row[2], row[3], []))
+        if row[4] is not None or row[5] is not None:
+            selected[-1][4].append((row[4], row[5]))
+    return [entry[1:] for entry in selected]
+
+def add_exercise_stats(conn, user_id, workout_date, performed):
+    """Додає до показників вправ виконання одного тренування (performed з insert_workout_exercises)."""
+    week = period_key(workout_date, 'week')
+    for _, name, sets in performed:
+        key = exercise_key(name)
+        max_weight, max_e1rm, volume = session_stats(sets)
+        # MAX з кількома аргументами повертає NULL, якщо один з них NULL
+        conn.execute(
+            'INSERT INTO exercise_stats (user_id, exercise_key, sessions, max_weight, max_e1rm) '
+            'VALUES (?, ?, 1, ?, ?) ON CONFLICT (user_id, exercise_key) DO UPDATE SET '
+            'sessions = sessions + 1, '
+            'max_weight = COALESCE(MAX(max_weight, excluded.max_weight), max_weight, excluded.max_weight), '
+            'max_e1rm = COALESCE(MAX(max_e1rm, excluded.max_e1rm), max_e1rm, excluded.max_e1rm)',
+            (user_id, key, max_weight, max_e1rm))
+        if volume is not None:
+            conn.execute(
+                'INSERT INTO exercise_weekly_volume (user_id, exercise_key, week, volume, sessions) '
+                'VALUES (?, ?, ?, ?, 1) ON CONFLICT (user_id, exercise_key, week) DO UPDATE SET '
+                'volume = volume + excluded.volume, sessions = sessions + 1',
+                (user_id, key, week, volume))
+
+def remove_exercise_stats(conn, removed):
+    """
+    Прибирає з показників уже видалені виконання (removed з select_workout_exercises).
+    Максимуми перераховуються із записаних підходів лише тоді, коли видалене
+    виконання дало поточний максимум вправи.
+    """
+    stale = set()
+    for user_id, workout_date, name, sets in removed:
+        key = exercise_key(name)
+        max_weight, max_e1rm, volume = session_stats(sets)
+        current = conn.execute('SELECT max_weight, max_e1rm FROM exercise_stats WHERE user_id = ? AND exercise_key = ?',
+                               (user_id, key)).fetchone()
+        if current is None:
+            continue
+        conn.execute('UPDATE exercise_stats SET sessions = sessions - 1 WHERE user_id = ? AND exercise_key = ?',
+                     (user_id, key))
+        if (max_weight is not None and max_weight == current[0]) or (max_e1rm is not None and max_e1rm == current[1]):
+            stale.add((user_id, key))
+        if volume is not None:
+            week = period_key(workout_date, 'week')
+            conn.execute('UPDATE exercise_weekly_volume SET volume = volume - ?, sessions = sessions - 1 '
+                         'WHERE user_id = ? AND exercise_key = ? AND week = ?', (volume, user_id, key, week))
+            conn.execute('DELETE FROM exercise_weekly_volume '
+                         'WHERE user_id = ? AND exercise_key = ? AND week = ? AND sessions <= 0',
+                         (user_id, key, week))
+    for user_id, key in stale:
+        conn.execute(
+            'UPDATE exercise_stats SET '
+            'max_weight = (SELECT MAX(s.weight) FROM exercise_sets AS s '
+            'JOIN workout_exercises AS e ON e.id = s.exercise_id WHERE e.user_id = ? AND e.exercise_key = ?), '
+            # Та сама формула, що в exercises.estimated_1rm
+            'max_e1rm = (SELECT MAX(CASE WHEN s.reps = 1 THEN s.weight '
+            'WHEN s.reps > 1 THEN s.weight * (1 + s.reps / 30.0) END) FROM exercise_sets AS s '
+            'JOIN workout_exercises AS e ON e.id = s.exercise_id WHERE e.user_id = ? AND e.exercise_key = ?) '
+            'WHERE user_id = ? AND exercise_key = ?', (user_id, key) * 3)
+    conn.executemany('DELETE FROM exercise_stats WHERE user_id = ? AND exercise_key = ? AND sessions <= 0',
+                     {(user_id, exercise_key(name)) for user_id, _, name, _ in removed})
 
 # Ця частина коду запускається, коли ти запускаєш database.py
 if __name__ == '__main__':
@@ -0,0 +1,453 @@
+# durable_store.py
+# In-memory сховище, що переживає перезапуск: кожна зміна репозиторіїв
+# дописується в журнал операцій (append-only), а періодичні знімки стану
+# дозволяють не програвати журнал з самого початку.
+#
+# Файли в каталозі сховища:
+#   journal-<N>.log   — сегменти журналу; кадр — довжина, CRC32 і marshal-кортеж
+#                       операцій (репозиторій, метод, аргументи). Транзакція
+#                       (store.transaction) записується одним кадром.
+#   snapshot-<N>.snap — знімок стану (MemoryStore.dump_state, marshal) перед
+#                       сегментом N; після запису знімка старші файли видаляються.
+# Під час запуску останній знімок читається через mmap (без копіювання файлу в
+# пам'ять), а потім програються сегменти журналу, новіші за нього. Обірваний
+# кадр у кінці сегмента (збій під час запису) відкидається.
+#
+# Стійкість: за sync_interval=0 запит чекає, поки його кадр буде записано й
+# синхронізовано з диском (fsync). Паралельні запити ділять один fsync (group
+# commit): потік, що першим дійшов до запису, скидає на диск кадри всіх, хто
+# встиг їх додати. За sync_interval>0 журнал пишеться у фоні (write-behind) раз
+# на sync_interval секунд, і після збою можна втратити зміни за цей час.
+import gc
+import marshal
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+from locks import SharedExclusiveLock
+from repositories import MemoryStore
+
+JOURNAL_PREFIX = 'journal'
+SNAPSHOT_PREFIX = 'snapshot'
+_FILE_NAME = re.compile(r'^(journal|snapshot)-(\d{10})\.(log|snap)$')
+_SUFFIXES = {JOURNAL_PREFIX: 'log', SNAPSHOT_PREFIX: 'snap'}
+
+# Кадр журналу: довжина та CRC32 вмісту
+FRAME = struct.Struct('<II')
+# Заголовок знімка: сигнатура, версія формату, версія marshal, довжина та CRC32 вмісту
+SNAPSHOT_HEADER = struct.Struct('<4sBBxxQI')
+SNAPSHOT_MAGIC = b'WTSS'
+SNAPSHOT_FORMAT = 1
+
+# Змінювальні методи репозиторіїв, що записуються в журнал: {репозиторій: {метод: чи
+# записувати результат замість аргументів}}. Результат записується для методів, що
+# генерують ID: під час відновлення запис додається з тим самим ID.
+JOURNALED = {
+    'users': {'add': True, 'update_profile': False, 'set_role': False, 'set_password': False, 'delete': False},
+    'progress': {'add': False, 'save_weight': False, 'record_completed': False, 'revert_completed': False,
+                 'delete_for_user': False},
+    'templates': {'add': True, 'update': False, 'delete': False},
+    'workouts': {'add': True, 'add_many': True, 'mark_completed': False, 'mark_upcoming': False,
+                 'delete': False, 'delete_for_user': False},
+    'analytics': {'record_weight': False, 'record_completed': False, 'revert_completed': False,
+                  'delete_for_user': False},
+}
+
+
+class SnapshotCorruptedError(RuntimeError):
+    """Файл знімка пошкоджено або записано в невідомому форматі."""
+
+
+@contextmanager
+def _gc_paused():
+    """
+    Вимикає збирач сміття на час відновлення: мільйони нових об'єктів інакше
+    запускають повні проходи, які нічого не звільняють.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _fsync_directory(directory):
+    # Після створення чи перейменування файлу синхронізується і запис каталогу
+    descriptor = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+class Journal:
+    """
+    Один сегмент журналу, відкритий на дописування. append додає кадр до буфера
+    й повертає його номер; wait(номер) повертається, коли кадр уже на диску.
+    Записує й синхронізує буфер потік, що першим почав чекати; решта чекають
+    на той самий fsync, а кадри, додані за цей час, ідуть наступним записом.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'ab')
+        self._buffer = []
+        self._appended = 0  # Номер останнього доданого кадру
+        self._durable = 0  # Номер останнього кадру, синхронізованого з диском
+        self._writing = False
+        self._condition = threading.Condition()
+        self.records = 0
+        self.bytes = 0
+        self.syncs = 0
+
+    def append(self, payload):
+        frame = FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+        with self._condition:
+            self._buffer.append(frame)
+            self._appended += 1
+            self.records += 1
+            self.bytes += len(frame)
+            return self._appended
+
+    def wait(self, number):
+        with self._condition:
+            while self._durable < number:
+                if self._writing:
+                    self._condition.wait()
+                    continue
+                frames, self._buffer = self._buffer, []
+                target = self._appended
+                self._writing = True
+                self._condition.release()
+                try:
+                    self._file.write(b''.join(frames))
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+                finally:
+                    self._condition.acquire()
+                    self._writing = False
+                    self._condition.notify_all()
+                self._durable = target
+                self.syncs += 1
+
+    def flush(self):
+        """Записує та синхронізує всі додані кадри."""
+        with self._condition:
+            number = self._appended
+        self.wait(number)
+
+    def pending(self):
+        with self._condition:
+            return self._appended - self._durable
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+def write_snapshot(path, state):
+    """Записує знімок у тимчасовий файл і атомарно замінює ним path."""
+    body = marshal.dumps(state)
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT, marshal.version, len(body),
+                                        zlib.crc32(body)))
+        file.write(body)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+    _fsync_directory(os.path.dirname(path) or '.')
+    return SNAPSHOT_HEADER.size + len(body)
+
+
+def read_snapshot(path):
+    """Читає знімок через mmap: marshal розбирає відображений файл без проміжної копії."""
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if len(mapped) < SNAPSHOT_HEADER.size:
+            raise SnapshotCorruptedError(f'Знімок {path} обрізаний.')
+        magic, version, marshal_version, length, checksum = SNAPSHOT_HEADER.unpack_from(mapped)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_FORMAT:
+            raise SnapshotCorruptedError(f'Невідомий формат знімка {path}.')
+        if marshal_version > marshal.version:
+            raise SnapshotCorruptedError(f'Знімок {path} записано новішою версією Python.')
+        with memoryview(mapped) as view, view[SNAPSHOT_HEADER.size:SNAPSHOT_HEADER.size + length] as body:
+            if len(body) != length or zlib.crc32(body) != checksum:
+                raise SnapshotCorruptedError(f'Знімок {path} пошкоджено.')
+            return marshal.loads(body)
+
+
+def read_journal(path):
+    """
+    Повертає (кадри, довжина цілої частини файлу). Читання зупиняється на першому
+    обірваному чи пошкодженому кадрі — усе після нього відкидається.
+    """
+    size = os.path.getsize(path)
+    if not size:
+        return [], 0
+    frames = []
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped, \
+            memoryview(mapped) as view:
+        offset = 0
+        while offset + FRAME.size <= size:
+            length, checksum = FRAME.unpack_from(view, offset)
+            end = offset + FRAME.size + length
+            if end > size:
+                break
+            with view[offset + FRAME.size:end] as payload:
+                if zlib.crc32(payload) != checksum:
+                    break
+                frames.append(marshal.loads(payload))
+            offset = end
+    return frames, offset
+
+
+class DurableMemoryStore(MemoryStore):
+    """
+    MemoryStore з журналом операцій і знімками в каталозі directory. Читання
+    працюють так само швидко, як у MemoryStore; кожна зміна додатково
+    серіалізується в журнал.
+
+    Знімок робиться у фоні, коли журнал з останнього знімка перевищив
+    snapshot_bytes байтів або минуло snapshot_interval секунд: на час копіювання
+    стану (dump_state) зміни зупиняються, а серіалізація й запис файлу
+    виконуються вже паралельно з запитами.
+    """
+
+    def __init__(self, directory, sync_interval=0, snapshot_bytes=64 << 20, snapshot_interval=3600,
+                 lock_stripes=64):
+        super().__init__(lock_stripes)
+        self.directory = directory
+        self.sync_interval = sync_interval
+        self.snapshot_bytes = snapshot_bytes
+        self.snapshot_interval = snapshot_interval
+        os.makedirs(directory, exist_ok=True)
+
+        # Зміни тримають спільний режим, знімок — виключний: стан копіюється між змінами
+        self._gate = SharedExclusiveLock()
+        # Зміни користувачів упорядковуються між собою, бо email та username унікальні для всіх
+        self._users_lock = threading.RLock()
+        self._local = threading.local()
+        self._snapshot_lock = threading.Lock()
+        self._last_snapshot = {}
+
+        self.recovery = self._recover()
+        self._journal = Journal(self._path(JOURNAL_PREFIX, self._segment))
+        self._journal_started = time.monotonic()
+        for repository, methods in JOURNALED.items():
+            self._journal_repository(repository, methods)
+
+        self._stop = threading.Event()
+        self._threads = [threading.Thread(target=self._snapshot_loop, name='journal-snapshots', daemon=True)]
+        if sync_interval:
+            self._threads.append(threading.Thread(target=self._flush_loop, name='journal-flush', daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    # --- Відновлення ---
+
+    def _path(self, prefix, segment):
+        return os.path.join(self.directory, f'{prefix}-{segment:010d}.{_SUFFIXES[prefix]}')
+
+    def _files(self, prefix):
+        segments = []
+        for name in os.listdir(self.directory):
+            match = _FILE_NAME.match(name)
+            if match and match.group(1) == prefix:
+                segments.append(int(match.group(2)))
+        return sorted(segments)
+
+    def _recover(self):
+        """Завантажує останній знімок і програє новіші сегменти журналу."""
+        started = time.perf_counter()
+        recovery = {'snapshot': None, 'snapshot_seconds': 0.0, 'segments': 0, 'frames': 0, 'operations': 0,
+                    'discarded_bytes': 0}
+        with _gc_paused():
+            snapshots = self._files(SNAPSHOT_PREFIX)
+            base = snapshots[-1] if snapshots else 0
+            if snapshots:
+                self.load_state(read_snapshot(self._path(SNAPSHOT_PREFIX, base)))
+                recovery['snapshot'] = os.path.basename(self._path(SNAPSHOT_PREFIX, base))
+                recovery['snapshot_seconds'] = time.perf_counter() - started
+
+            segments = [segment for segment in self._files(JOURNAL_PREFIX) if segment >= base]
+            for segment in segments:
+                path = self._path(JOURNAL_PREFIX, segment)
+                frames, valid = read_journal(path)
+                # Обірваний запис у кінці: кадр не було підтверджено, тож його просто відкидаємо
+                recovery['discarded_bytes'] += os.path.getsize(path) - valid
+                if not valid:
+                    os.remove(path)  # Порожній сегмент (після запуску не було змін) не потрібен
+                elif valid < os.path.getsize(path):
+                    os.truncate(path, valid)
+                for operations in frames:
+                    for repository, method, args, kwargs in operations:
+                        # Методи класу, а не екземпляра: під час відновлення журнал ще не ведеться
+                        repository = getattr(self, repository)
+                        getattr(type(repository), method)(repository, *args, **kwargs)
+                    recovery['operations'] += len(operations)
+                recovery['frames'] += len(frames)
+        recovery['segments'] = len(segments)
+        # Кожен запуск пише новий сегмент, тож старі файли не дописуються після обірваного кадру
+        self._segment = max([base] + segments) + 1
+        # Відновлений стан живе до кінця процесу: збирач сміття більше його не переглядає
+        gc.freeze()
+        recovery['seconds'] = time.perf_counter() - started
+        return recovery
+
+    # --- Журнал ---
+
+    def _ordering_lock(self, repository, method, args):
+        """
+        Лок, під яким зміна виконується та додається до журналу, щоб порядок кадрів
+        збігався з порядком змін: лок користувача, шаблонів або всіх користувачів.
+        """
+        if repository == 'users':
+            return self._users_lock
+        if repository == 'templates':
+            return self.templates._lock
+        if repository == 'workouts' and method == 'add':
+            user_id = args[0]['user_id']
+        elif method == 'add_many':
+            user_id = args[0][0]['user_id'] if args[0] else None
+        else:
+            user_id = args[0]
+        return self._locks.lock(user_id)
+
+    def _journal_repository(self, repository, methods):
+        target = getattr(self, repository)
+        for name, logs_result in methods.items():
+            setattr(target, name, self._journaled(repository, name, getattr(target, name), logs_result))
+
+    def _journaled(self, repository, name, method, logs_result):
+        local = self._local
+
+        def journaled(*args, **kwargs):
+            if getattr(local, 'nested', False):
+                # Виклик з іншого методу репозиторію (наприклад, add усередині save_weight)
+                return method(*args, **kwargs)
+            with self._gate.shared(), self._ordering_lock(repository, name, args):
+                local.nested = True
+                try:
+                    result = method(*args, **kwargs)
+                finally:
+                    local.nested = False
+                self._record((repository, name, (result,) if logs_result else args, kwargs))
+            self._sync()
+            return result
+
+        journaled.__wrapped__ = method
+        journaled.__doc__ = method.__doc__
+        return journaled
+
+    def _append(self, operations):
+        # Запам'ятовується і сам сегмент: поки потік дочекається запису, знімок може почати новий
+        journal = self._journal
+        self._local.pending = (journal, journal.append(marshal.dumps(operations)))
+
+    def _record(self, operation):
+        operations = getattr(self._local, 'operations', None)
+        if operations is not None:
+            operations.append(operation)
+        else:
+            self._append((operation,))
+
+    def _sync(self):
+        """Чекає на запис кадрів цього потоку на диск (лише за sync_interval=0 і поза транзакцією)."""
+        if self.sync_interval or getattr(self._local, 'operations', None) is not None:
+            return
+        pending = getattr(self._local, 'pending', None)
+        if pending is not None:
+            self._local.pending = None
+            journal, number = pending
+            journal.wait(number)
+
+    @contextmanager
+    def transaction(self, user_id=None):
+        local = self._local
+        if getattr(local, 'operations', None) is not None:
+            with super().transaction(user_id):
+                yield
+            return
+        with self._gate.shared(), super().transaction(user_id):
+            local.operations = []
+            try:
+                yield
+            finally:
+                # Виконані зміни записуються, навіть якщо блок завершився винятком:
+                # журнал має збігатися зі станом у пам'яті, який не відкочується
+                operations, local.operations = local.operations, None
+                if operations:
+                    self._append(tuple(operations))
+        self._sync()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.sync_interval):
+            self._journal.flush()
+
+    # --- Знімки ---
+
+    def snapshot(self):
+        """
+        Записує знімок поточного стану й видаляє старші файли. Не можна викликати
+        всередині транзакції чи зміни: знімок чекає, поки всі зміни завершаться.
+        """
+        with self._snapshot_lock:
+            started = time.perf_counter()
+            with self._gate.exclusive():
+                state = self.dump_state()
+                segment = self._segment + 1
+                previous = self._journal
+                self._journal = Journal(self._path(JOURNAL_PREFIX, segment))
+                self._segment = segment
+                self._journal_started = time.monotonic()
+            paused = time.perf_counter() - started
+            previous.close()
+            size = write_snapshot(self._path(SNAPSHOT_PREFIX, segment), state)
+            for prefix in (JOURNAL_PREFIX, SNAPSHOT_PREFIX):
+                for old in self._files(prefix):
+                    if old < segment:
+                        os.remove(self._path(prefix, old))
+            self._last_snapshot = {'segment': segment, 'bytes': size, 'pause_seconds': paused,
+                                   'seconds': time.perf_counter() - started}
+            return self._last_snapshot
+
+    def _snapshot_due(self):
+        journal = self._journal
+        if not journal.records:
+            return False
+        return (journal.bytes >= self.snapshot_bytes
+                or time.monotonic() - self._journal_started >= self.snapshot_interval)
+
+    def _snapshot_loop(self):
+        while not self._stop.wait(1.0):
+            if self._snapshot_due():
+                self.snapshot()
+
+    def stats(self):
+        journal = self._journal
+        return {
+            'directory': self.directory,
+            'sync': 'group' if not self.sync_interval else 'interval',
+            'sync_interval': self.sync_interval,
+            'segment': self._segment,
+            'records': journal.records,
+            'bytes': journal.bytes,
+            'syncs': journal.syncs,
+            'pending': journal.pending(),
+            'last_snapshot': dict(self._last_snapshot),
+            'recovery': dict(self.recovery),
+        }
+
+    def close(self):
+        """Зупиняє фонові потоки й записує на диск усе, що залишилося в журналі."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._journal.close()
@@ -0,0 +1,179 @@
+# exercises.py
+# Виконані вправи завершених тренувань у нормалізованому вигляді: вправа
+# тренування та її підходи (повторення, вага). Клієнт надсилає фактичні дані
+# в полях вправи actual_weight ("60") та actual_sets_reps ("4x10" або "10,10,8");
+# тут вони розбираються на підходи, а для історії й рекордів вправи
+# будуються однакові для обох сховищ словники.
+import re
+
+# Найбільша кількість підходів, яку приймаємо з "NxM" (захист від "100000x1")
+MAX_SETS = 100
+
+_SETS_TIMES_REPS = re.compile(r'^\s*(\d+)\s*[xXхХ×*]\s*(\d+)\s*$')
+_REPS_LIST = re.compile(r'^\s*\d+(\s*[,;/ ]\s*\d+)*\s*$')
+
+
+def exercise_key(name):
+    """Ключ вправи для пошуку: без зайвих пробілів і без урахування регістру."""
+    return ' '.join(name.split()).casefold()
+
+
+def _weight(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value.strip().replace(',', '.'))
+        except ValueError:
+            return None
+    return None
+
+
+def performed_sets(exercise):
+    """
+    Підходи вправи як список (повторення, вага). Якщо підходи не вдається
+    розібрати, але вагу вказано, повертається один підхід без кількості повторень.
+    """
+    weight = _weight(exercise.get('actual_weight'))
+    text = exercise.get('actual_sets_reps')
+    if isinstance(text, str):
+        match = _SETS_TIMES_REPS.match(text)
+        if match and 0 < int(match[1]) <= MAX_SETS:
+            return [(int(match[2]), weight)] * int(match[1])
+        if _REPS_LIST.match(text):
+            reps = [int(part) for part in re.split(r'[,;/ ]+', text.strip()) if part]
+            if len(reps) <= MAX_SETS:
+                return [(count, weight) for count in reps]
+    return [(None, weight)] if weight is not None else []
+
+
+def performed_exercises(exercises):
+    """Повертає (позиція, назва, підходи) для вправ тренування з фактичними даними."""
+    performed = []
+    for position, exercise in enumerate(exercises or []):
+        if not isinstance(exercise, dict):
+            continue
+        name = exercise.get('name')
+        if not isinstance(name, str) or not name.strip():
+            continue
+        sets = performed_sets(exercise)
+        if sets:
+            performed.append((position, name, sets))
+    return performed
+
+
+def session_volume(sets):
+    """Об'єм вправи за тренування (сума повторення x вага) або None без ваги чи повторень."""
+    volumes = [reps * weight for reps, weight in sets if reps is not None and weight is not None]
+    return sum(volumes) if volumes else None
+
+
+def estimated_1rm(reps, weight):
+    """Оцінка максимуму на одне повторення за формулою Еплі: вага * (1 + повторення / 30)."""
+    if reps is None or weight is None or reps < 1:
+        return None
+    return weight if reps == 1 else weight * (1 + reps / 30)
+
+
+def session_stats(sets):
+    """(найбільша вага, найбільший оцінений 1ПМ, об'єм) одного виконання вправи; None — немає даних."""
+    weights = [weight for _, weight in sets if weight is not None]
+    estimates = [estimate for estimate in (estimated_1rm(reps, weight) for reps, weight in sets)
+                 if estimate is not None]
+    return (max(weights) if weights else None, max(estimates) if estimates else None,
+            session_volume(sets))
+
+
+class MaxTracker:
+    """
+    Найбільше значення мультимножини з підтримкою видалення. Значення
+    зберігаються з кількістю входжень, тож максимум перераховується лише тоді,
+    коли видаляється останнє входження поточного максимуму.
+    """
+
+    __slots__ = ('_counts', 'max')
+
+    def __init__(self):
+        self._counts = {}
+        self.max = None
+
+    def add(self, value):
+        if value is None:
+            return
+        self._counts[value] = self._counts.get(value, 0) + 1
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def remove(self, value):
+        if value is None:
+            return
+        remaining = self._counts[value] - 1
+        if remaining:
+            self._counts[value] = remaining
+            return
+        del self._counts[value]
+        if value == self.max:
+            self.max = max(self._counts, default=None)
+
+    def dump_state(self):
+        return dict(self._counts)
+
+    @classmethod
+    def load_state(cls, counts):
+        tracker = cls()
+        tracker._counts = counts
+        tracker.max = max(counts, default=None)
+        return tracker
+
+
+def history_entry(workout_id, date, position, name, sets):
+    """Запис історії вправи: одне виконання вправи в тренуванні."""
+    weights = [weight for _, weight in sets if weight is not None]
+    reps = [count for count, _ in sets if count is not None]
+    return {
+        'workout_id': workout_id,
+        'date': date,
+        'position': position,  # Порядковий номер вправи в тренуванні
+        'name': name,
+        'sets': [{'reps': count, 'weight': weight} for count, weight in sets],
+        'top_weight': max(weights) if weights else None,
+        'total_reps': sum(reps) if reps else None,
+        'volume': session_volume(sets),
+    }
+
+
+def set_record(reps, weight, date, workout_id):
+    return {'reps': reps, 'weight': weight, 'date': date, 'workout_id': workout_id}
+
+
+def build_records(name, sessions, first_date, last_date, heaviest_set, most_reps, best_volume):
+    """
+    Рекорди вправи. heaviest_set та most_reps — підходи з set_record
+    (найбільша вага; найбільше повторень), best_volume — {volume, date, workout_id}.
+    Серед однакових результатів рекордом вважається перший за датою.
+    """
+    return {
+        'name': name,
+        'sessions': sessions,
+        'first_date': first_date,
+        'last_date': last_date,
+        'heaviest_set': heaviest_set,
+        'most_reps': most_reps,
+        'best_volume': best_volume,
+    }
+
+
+def build_stats(name, sessions, max_weight, max_estimated_1rm, weekly_volume):
+    """
+    Показники вправи з інкрементального індексу. weekly_volume — пари
+    (тиждень, об'єм) від найновішого тижня.
+    """
+    return {
+        'name': name,
+        'sessions': sessions,
+        'max_weight': max_weight,
+        'estimated_1rm': round(max_estimated_1rm, 2) if max_estimated_1rm is not None else None,
+        'weekly_volume': [{'week': week, 'volume': round(volume, 2)} for week, volume in weekly_volume],
+    }
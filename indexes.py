@@ -0,0 +1,162 @@
+# indexes.py
+# Допоміжні індексні структури для in-memory сховища.
+import threading
+from bisect import bisect_left, bisect_right, insort
+
+
+class UniqueConstraintError(ValueError):
+    """Значення унікального поля вже зайняте іншим записом."""
+
+    def __init__(self, field, value=None):
+        super().__init__(f"Значення поля '{field}' вже використовується: {value!r}")
+        self.field = field
+        self.value = value
+
+
+class UniqueIndex:
+    """
+    Унікальний індекс {значення: id власника}.
+
+    Перевірка та резервування значення виконуються атомарно під локом за O(1),
+    тож два паралельні запити не можуть отримати однаковий email чи username.
+    """
+
+    def __init__(self, field):
+        self.field = field
+        self._owners = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._owners)
+
+    def __contains__(self, value):
+        return value in self._owners
+
+    def get(self, value):
+        """Повертає id власника значення або None."""
+        return self._owners.get(value)
+
+    def reserve(self, value, owner):
+        """Закріплює значення за власником або кидає UniqueConstraintError."""
+        if not isinstance(value, str):
+            # Маршрути відхиляють такі значення з 400; сюди вони доходять лише через помилку в коді
+            raise TypeError(f"Значення поля '{self.field}' має бути рядком, отримано {type(value).__name__}")
+        with self._lock:
+            current = self._owners.setdefault(value, owner)
+        if current != owner:
+            raise UniqueConstraintError(self.field, value)
+
+    def release(self, value, owner):
+        """Звільняє значення, якщо воно належить цьому власнику."""
+        with self._lock:
+            if self._owners.get(value) == owner:
+                del self._owners[value]
+
+
+class InvertedIndex:
+    """
+    Інвертований індекс {значення: множина id записів}.
+
+    Використовується для фільтрів за фасетами (ціль, складність, обладнання тощо):
+    замість перевірки кожного запису беремо готову множину id для значення.
+    """
+
+    _EMPTY = frozenset()
+
+    def __init__(self):
+        self._ids = {}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def get(self, value):
+        """Повертає множину id для значення (порожню, якщо їх немає)."""
+        return self._ids.get(value, self._EMPTY)
+
+    def add(self, value, item_id):
+        self._ids.setdefault(value, set()).add(item_id)
+
+    def discard(self, value, item_id):
+        ids = self._ids.get(value)
+        if ids is not None:
+            ids.discard(item_id)
+            if not ids:
+                del self._ids[value]
+
+
+def intersect(sets):
+    """
+    Перетин множин, починаючи з найменшої: перебираємо лише її елементи
+    і перевіряємо належність до решти за O(1).
+    """
+    if not sets:
+        return set()
+    ordered = sorted(sets, key=len)
+    smallest, rest = ordered[0], ordered[1:]
+    return {item for item in smallest if all(item in other for other in rest)}
+
+
+class SortedIndex:
+    """
+    Впорядкований індекс {ключ: запис} з відсортованим списком ключів.
+
+    Ключі підтримуються в порядку зростання за допомогою bisect, тож записи
+    видаються вже відсортованими, пошук за ключем — O(1) через словник,
+    а вибірка діапазону — O(log n) на пошук меж. bound_key виділяє з ключа
+    частину, за якою задаються межі діапазону (наприклад, дату з пари (дата, id)).
+    """
+
+    def __init__(self, bound_key=None):
+        self._keys = []
+        self._items = {}
+        self._bound_key = bound_key
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    @classmethod
+    def from_sorted(cls, pairs, bound_key=None):
+        """Індекс з пар (ключ, запис), ключі яких уже впорядковані за зростанням і не повторюються."""
+        index = cls(bound_key)
+        index._items = dict(pairs)
+        index._keys = list(index._items)
+        return index
+
+    def values(self):
+        """Записи від найменшого ключа до найбільшого."""
+        return [self._items[key] for key in self._keys]
+
+    def get(self, key):
+        return self._items.get(key)
+
+    def insert(self, key, item):
+        """Додає або замінює запис за ключем."""
+        if key not in self._items:
+            insort(self._keys, key)
+        self._items[key] = item
+
+    def remove(self, key):
+        """Видаляє запис за ключем і повертає його (None, якщо ключа немає)."""
+        item = self._items.pop(key, None)
+        if item is not None:
+            del self._keys[bisect_left(self._keys, key)]
+        return item
+
+    def iter_desc(self, after=None, lower=None, upper=None):
+        """
+        Повертає записи від найбільшого ключа до найменшого.
+        after — ключ, після якого продовжити (виключно), lower/upper —
+        межі діапазону для bound_key(ключ) (включно).
+        """
+        keys = self._keys
+        end = len(keys)
+        if upper is not None:
+            end = bisect_right(keys, upper, key=self._bound_key)
+        if after is not None:
+            end = min(end, bisect_left(keys, after))
+        start = 0 if lower is None else bisect_left(keys, lower, key=self._bound_key)
+        for position in range(end - 1, start - 1, -1):
+            yield self._items[keys[position]]
@@ -0,0 +1,105 @@
+# json_provider.py
+# Серіалізація JSON для відповідей Flask. Якщо встановлено orjson, відповіді
+# серіалізуються ним одразу в байти UTF-8, інакше — стандартним json. Кирилиця
+# в обох випадках не екранується як \uXXXX, тож відповіді з українськими назвами
+# й описами майже вдвічі менші. Вихід сумісний з DefaultJSONProvider Flask:
+# ключі впорядковані, дати — у форматі HTTP, dataclass — словники.
+import threading
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson необов'язковий: без нього працює стандартний json
+    orjson = None
+
+# Серіалізатори для JSON_BACKEND
+BACKENDS = ('orjson', 'json')
+
+
+class RawJSON(str):
+    """Уже серіалізоване JSON-значення; провайдер вставляє його у відповідь як є."""
+
+    __slots__ = ()
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    JSON-провайдер з orjson і запасним стандартним json (backend='json' або
+    orjson не встановлено). Значення, яких orjson не підтримує (наприклад, цілі
+    понад 64 біти), серіалізуються стандартним json.
+
+    preserialized() зберігає серіалізовані незмінні записи (глобальні шаблони),
+    щоб кожна відповідь лише склеювала готові фрагменти.
+    """
+
+    ensure_ascii = False
+
+    def __init__(self, app, backend='orjson'):
+        super().__init__(app)
+        if backend not in BACKENDS:
+            raise ValueError(f'Невідомий серіалізатор JSON: {backend}')
+        self.backend = backend if orjson is not None else 'json'
+        self._fragments = {}
+        self._fragments_version = None
+        self._fragments_lock = threading.Lock()
+
+    def _orjson_options(self, pretty=False):
+        # Дати й dataclass передаються в default, щоб формат збігався з DefaultJSONProvider
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if pretty:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def _dumps_bytes(self, obj, pretty=False):
+        if isinstance(obj, RawJSON):
+            return obj.encode('utf-8')
+        if isinstance(obj, list) and any(isinstance(item, RawJSON) for item in obj):
+            # Список з готовими фрагментами склеюється без повторної серіалізації
+            return b'[' + b','.join(self._dumps_bytes(item) for item in obj) + b']'
+        if self.backend == 'orjson':
+            try:
+                return orjson.dumps(obj, default=self.default, option=self._orjson_options(pretty))
+            except TypeError:  # orjson.JSONEncodeError
+                pass
+        dump_args = {'indent': 2} if pretty else {'separators': (',', ':')}
+        return super().dumps(obj, **dump_args).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        # Додаткові аргументи json.dumps підтримує лише стандартний json
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        if isinstance(obj, RawJSON):
+            return obj
+        return self._dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if self.backend == 'orjson' and not kwargs:
+            return orjson.loads(s)  # orjson.JSONDecodeError — підклас ValueError
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(self._dumps_bytes(obj, pretty) + b'\n', mimetype=self.mimetype)
+
+    def preserialized(self, key, version, obj):
+        """
+        Повертає obj, серіалізований один раз (RawJSON), для незмінного запису key.
+        version — версія даних, до яких належать записи (наприклад, версія
+        глобальних шаблонів), що лише зростає; з новою версією всі збережені
+        фрагменти скидаються, а запити зі старішою серіалізують запис без кешу.
+        """
+        with self._fragments_lock:
+            if self._fragments_version is None or version > self._fragments_version:
+                self._fragments = {}
+                self._fragments_version = version
+            fragment = self._fragments.get(key) if version == self._fragments_version else None
+        if fragment is None:
+            fragment = RawJSON(self.dumps(obj))
+            with self._fragments_lock:
+                if version == self._fragments_version:
+                    self._fragments[key] = fragment
+        return fragment
@@ -0,0 +1,76 @@
+# locks.py
+# Блокування для in-memory сховища.
+import threading
+from contextlib import contextmanager
+
+
+class StripedLock:
+    """
+    Фіксований набір реентерабельних локів, між якими розподіляються ключі
+    (ID користувачів). Операції різних користувачів здебільшого потрапляють на
+    різні локи й не чекають одна на одну, а пам'ять не залежить від кількості
+    користувачів. Лок реентерабельний, тож репозиторій може брати його всередині
+    транзакції маршруту, що вже тримає лок того самого користувача.
+    """
+
+    def __init__(self, stripes=64):
+        self._locks = tuple(threading.RLock() for _ in range(stripes))
+
+    def __len__(self):
+        return len(self._locks)
+
+    def lock(self, key):
+        """Повертає лок, що відповідає ключу."""
+        return self._locks[hash(key) % len(self._locks)]
+
+
+class SharedExclusiveLock:
+    """
+    Лок зі спільним і виключним режимами. Спільний режим реентерабельний у межах
+    потоку: вкладені операції не чекають. Поки виключного режиму чекає інший
+    потік, нові спільні захоплення (не вкладені) чекають, тож виключний режим
+    не голодує під постійним навантаженням.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._shared = 0  # Скільки потоків тримають спільний режим
+        self._exclusive = False
+        self._waiting_exclusive = 0
+        self._local = threading.local()
+
+    @contextmanager
+    def shared(self):
+        depth = getattr(self._local, 'depth', 0)
+        if depth == 0:
+            with self._condition:
+                while self._exclusive or self._waiting_exclusive:
+                    self._condition.wait()
+                self._shared += 1
+        self._local.depth = depth + 1
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            if depth == 0:
+                with self._condition:
+                    self._shared -= 1
+                    if not self._shared:
+                        self._condition.notify_all()
+
+    @contextmanager
+    def exclusive(self):
+        with self._condition:
+            self._waiting_exclusive += 1
+            try:
+                while self._exclusive or self._shared:
+                    self._condition.wait()
+            finally:
+                self._waiting_exclusive -= 1
+            self._exclusive = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._exclusive = False
+                self._condition.notify_all()
@@ -0,0 +1,273 @@
+# metrics.py
+# Метрики застосунку у текстовому форматі Prometheus (GET /metrics):
+# гістограми латентності маршрутів і операцій сховища, лічильники помилок
+# автентифікації та показники кешів. Тут же — вибірковий профайлер, який
+# вмикається під час роботи (POST /admin/profiler) і, поки вимкнений, нічого
+# не коштує: окремий потік з'являється лише на час профілювання.
+import sys
+import threading
+import time
+import types
+from bisect import bisect_left
+from collections import Counter as _StackCounter
+
+# Межі кошиків гістограм латентності, секунди
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Методи репозиторіїв, які не є операціями зі сховищем
+_NOT_TIMED = {'page_key', 'subscribe'}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{_escape(value)}"' for name, value in extra]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Лічильник з мітками: {значення міток: кількість}."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for labelvalues, value in values:
+            yield f'{self.name}{_labels(self.labelnames, labelvalues)} {_number(value)}'
+
+
+class Histogram:
+    """
+    Гістограма з фіксованими межами кошиків. Для кожного набору міток
+    зберігаються лічильники кошиків, сума та кількість спостережень.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # {значення міток: [лічильники кошиків + переповнення, сума]}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        with self._lock:
+            series = sorted((labelvalues, list(counts), total) for labelvalues, (counts, total) in self._series.items())
+        for labelvalues, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                yield (f'{self.name}_bucket{_labels(self.labelnames, labelvalues, [("le", _number(bound))])} '
+                       f'{cumulative}')
+            yield f'{self.name}_sum{_labels(self.labelnames, labelvalues)} {_number(total)}'
+            yield f'{self.name}_count{_labels(self.labelnames, labelvalues)} {cumulative}'
+
+
+class Registry:
+    """
+    Набір метрик для /metrics. Крім лічильників і гістограм, приймає функції,
+    що під час кожного збору повертають показники (наприклад, stats() кешів).
+    """
+
+    def __init__(self, prefix=''):
+        self.prefix = prefix
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(self.prefix + name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(self.prefix + name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, name, documentation, stats, kinds):
+        """
+        Показники зі словника stats() як метрики name_<ключ>. kinds — {ключ: 'gauge'
+        або 'counter'}; ключі, яких немає в kinds, і нечислові значення пропускаються.
+        """
+        self._collectors.append((self.prefix + name, documentation, stats, kinds))
+
+    def render(self):
+        """Текстовий формат Prometheus (версія 0.0.4)."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.render())
+        for name, documentation, stats, kinds in self._collectors:
+            values = stats()
+            for key, kind in kinds.items():
+                value = values.get(key)
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                metric_name = f'{name}_{key}' + ('_total' if kind == 'counter' else '')
+                lines.append(f'# HELP {metric_name} {documentation}: {key}')
+                lines.append(f'# TYPE {metric_name} {kind}')
+                lines.append(f'{metric_name} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _timed_iterator(iterator, observe):
+    """Ітератор, що рахує лише час всередині next() (без часу споживача) і повідомляє його в кінці."""
+    elapsed = 0.0
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                elapsed += time.perf_counter() - started
+                return
+            elapsed += time.perf_counter() - started
+            yield item
+    finally:
+        iterator.close()
+        observe(elapsed)
+
+
+def _timed(method, histogram, repository, operation):
+    def timed(*args, **kwargs):
+        started = time.perf_counter()
+        result = method(*args, **kwargs)
+        elapsed = time.perf_counter() - started
+        if isinstance(result, types.GeneratorType):
+            # Вибірки (iter_*) виконуються під час перебору, тож час додається до перебору
+            return _timed_iterator(result, lambda iterated: histogram.observe(elapsed + iterated,
+                                                                              repository, operation))
+        histogram.observe(elapsed, repository, operation)
+        return result
+
+    timed.__wrapped__ = method
+    timed.__doc__ = method.__doc__
+    return timed
+
+
+def instrument_store(store, histogram, repositories=('users', 'progress', 'templates', 'workouts',
+                                                     'analytics', 'exercises')):
+    """
+    Обгортає публічні методи репозиторіїв сховища так, що кожен виклик
+    спостерігається в histogram з мітками (репозиторій, операція). Обгортки
+    ставляться на самі об'єкти репозиторіїв, тож посилання на них (у app.py
+    та між репозиторіями) лишаються чинними.
+    """
+    for repository_name in repositories:
+        repository = getattr(store, repository_name)
+        for name in dir(type(repository)):
+            if name.startswith('_') or name in _NOT_TIMED:
+                continue
+            method = getattr(repository, name)
+            if callable(method) and not isinstance(method, type):
+                setattr(repository, name, _timed(method, histogram, repository_name, name))
+    return store
+
+
+class SamplingProfiler:
+    """
+    Вибірковий профайлер: окремий потік кожні interval секунд знімає стеки всіх
+    інших потоків (sys._current_frames) і рахує однакові стеки. Результат —
+    у згорнутому форматі "модуль:функція;модуль:функція кількість", який
+    приймають flamegraph.pl та speedscope.
+    """
+
+    def __init__(self, interval=0.01, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._stacks = _StackCounter()
+        self._samples = 0
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self, interval=None):
+        with self._lock:
+            if interval is not None:
+                self.interval = interval
+            if self._thread is not None:
+                return False
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return False
+        self._stop.set()
+        thread.join()
+        return True
+
+    def reset(self):
+        with self._lock:
+            self._stacks.clear()
+            self._samples = 0
+
+    def _collapse(self, frame):
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            stacks = [self._collapse(frame) for ident, frame in sys._current_frames().items() if ident != own]
+            with self._lock:
+                self._stacks.update(stacks)
+                self._samples += 1
+
+    def stats(self, limit=50):
+        with self._lock:
+            return {
+                'running': self.running,
+                'interval': self.interval,
+                'samples': self._samples,
+                'stacks': [{'stack': stack, 'count': count} for stack, count in self._stacks.most_common(limit)],
+            }
+
+    def collapsed(self):
+        with self._lock:
+            return ''.join(f'{stack} {count}\n' for stack, count in self._stacks.most_common())
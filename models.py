@@ -0,0 +1,256 @@
+# models.py
+# Компактні записи in-memory сховища. Кожен запис — об'єкт зі __slots__ замість
+# словника, а повторювані значення-перелічення (статус, мета, складність,
+# категорія тривалості, групи м'язів, обладнання) зберігаються як один спільний
+# рядок на всі записи. У формат JSON, який очікує фронтенд, записи
+# перетворюються методом to_dict лише при видачі з репозиторію.
+from collections.abc import Mapping
+from types import MappingProxyType
+
+from exercises import history_entry
+
+# Поля шаблону, які копіюються в заплановані тренування (через знімок шаблону)
+SNAPSHOT_FIELDS = {'name', 'description', 'exercises'}
+
+# Позначка відсутнього значення (на відміну від None, яке клієнт може передати явно)
+MISSING = object()
+
+# Пул спільних рядків для intern_value. Значення приходять від клієнтів, тому
+# пул обмежений: рідкісні значення понад ліміт просто не діляться між записами.
+_INTERNED = {}
+MAX_INTERNED = 4096
+
+
+def intern_value(value):
+    """Повертає спільний екземпляр рядка-перелічення; інші значення — без змін."""
+    if not isinstance(value, str):
+        return value
+    shared = _INTERNED.get(value)
+    if shared is None:
+        if len(_INTERNED) >= MAX_INTERNED:
+            return value
+        shared = _INTERNED.setdefault(value, value)
+    return shared
+
+
+def freeze(value):
+    """Глибока незмінна копія JSON-значення: словники стають MappingProxyType, списки — кортежами."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """Звичайна (змінна) копія значення, замороженого freeze."""
+    # Перевірка конкретних типів замість abc.Mapping: thaw викликається для кожного значення
+    if isinstance(value, (MappingProxyType, dict)):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+def _freeze_enum_list(values):
+    """Незмінний кортеж значень-перелічень (наприклад, груп м'язів) зі спільними рядками."""
+    if not isinstance(values, list):
+        return freeze(values)
+    return tuple(intern_value(value) for value in freeze(values))
+
+
+class UserRecord:
+    __slots__ = ('id', 'username', 'email', 'password', 'role')
+
+    def __init__(self, user_id, username, email, password, role='user'):
+        self.id = user_id
+        self.username = username
+        self.email = email
+        self.password = password
+        self.role = intern_value(role)
+
+    @classmethod
+    def from_dict(cls, user):
+        return cls(user['id'], user['username'], user['email'], user.get('password'), user.get('role', 'user'))
+
+    def to_dict(self):
+        return {'id': self.id, 'username': self.username, 'email': self.email,
+                'password': self.password, 'role': self.role}
+
+
+class ProgressRecord:
+    __slots__ = ('date', 'weight', 'workouts_completed')
+
+    def __init__(self, date, weight=None, workouts_completed=0):
+        self.date = date
+        self.weight = weight
+        self.workouts_completed = workouts_completed
+
+    @classmethod
+    def from_dict(cls, entry):
+        return cls(entry['date'], entry.get('weight'), entry.get('workouts_completed', 0))
+
+    def to_dict(self):
+        return {'date': self.date, 'weight': self.weight, 'workouts_completed': self.workouts_completed}
+
+
+class TemplateSnapshot:
+    """
+    Незмінний знімок шаблону (назва, опис, вправи) певної версії.
+
+    Заплановані тренування посилаються на знімок, а не копіюють вправи.
+    Зміна шаблону створює новий знімок, тож історія тренувань не змінюється.
+    """
+
+    __slots__ = ('template_id', 'version', 'name', 'description', 'exercises')
+
+    def __init__(self, template_id, version, name, description, exercises):
+        self.template_id = template_id
+        self.version = version
+        self.name = name
+        self.description = description
+        self.exercises = freeze(list(exercises or []))
+
+
+class TemplateRecord:
+    """
+    Шаблон тренування. Назва, опис і вправи зберігаються лише в поточному
+    знімку (snapshot), який спільний із запланованими за шаблоном тренуваннями.
+    """
+
+    __slots__ = ('id', 'user_id', 'is_global', 'muscle_groups', 'goal', 'difficulty',
+                 'equipment', 'duration_category', 'snapshot')
+
+    def __init__(self, template_id, user_id):
+        self.id = template_id
+        self.user_id = user_id
+        self.is_global = False
+        self.muscle_groups = ()
+        self.goal = self.difficulty = self.duration_category = None
+        self.equipment = ()
+        self.snapshot = TemplateSnapshot(template_id, 0, None, None, None)
+
+    def set(self, changes):
+        """Змінює передані поля. Зміна назви, опису чи вправ створює нову версію знімка."""
+        if 'is_global' in changes:
+            self.is_global = bool(changes['is_global'])
+        for field in ('muscle_groups', 'equipment'):
+            if field in changes:
+                setattr(self, field, _freeze_enum_list(changes[field]))
+        for field in ('goal', 'difficulty', 'duration_category'):
+            if field in changes:
+                setattr(self, field, intern_value(changes[field]))
+
+        snapshot = self.snapshot
+        if changes.keys() & SNAPSHOT_FIELDS:
+            self.snapshot = TemplateSnapshot(
+                self.id, snapshot.version + 1, changes.get('name', snapshot.name),
+                changes.get('description', snapshot.description),
+                changes['exercises'] if 'exercises' in changes else thaw(snapshot.exercises))
+
+    def facet_values(self, field):
+        """Значення поля для фасетних індексів (для списків — кожен елемент)."""
+        value = getattr(self, field)
+        return value if isinstance(value, tuple) else (value,)
+
+    def to_dict(self):
+        snapshot = self.snapshot
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'name': snapshot.name,
+            'description': snapshot.description,
+            'exercises': thaw(snapshot.exercises),
+            'is_global': self.is_global,
+            'muscle_groups': thaw(self.muscle_groups),
+            'goal': self.goal,
+            'difficulty': self.difficulty,
+            'equipment': thaw(self.equipment),
+            'duration_category': self.duration_category,
+        }
+
+
+class WorkoutRecord:
+    """
+    Запис запланованого тренування. Назва, опис і вправи не копіюються:
+    запис посилається на незмінний знімок шаблону, а власні дані тренування
+    (фактичні результати) зберігаються окремо як накладка на вправи знімка.
+    """
+
+    __slots__ = ('id', 'user_id', 'template_id', 'date', 'status', 'snapshot',
+                 'exercise_changes', 'exercises_override', 'duration_seconds')
+
+    def __init__(self, workout_id, user_id, template_id, date, status, snapshot):
+        self.id = workout_id
+        self.user_id = user_id
+        self.template_id = template_id
+        self.date = date
+        self.status = intern_value(status)
+        self.snapshot = snapshot
+        self.exercise_changes = None  # кортеж змінених полів для кожної вправи знімка (None — без змін)
+        self.exercises_override = None  # повний список вправ, якщо він не збігається зі знімком за структурою
+        self.duration_seconds = MISSING
+
+    def set_exercises(self, exercises):
+        """Зберігає вправи як різницю відносно знімка або, якщо структура інша, повністю."""
+        self.exercise_changes, self.exercises_override = _exercise_overlay(self.snapshot.exercises, exercises)
+
+    def exercises(self):
+        if self.exercises_override is not None:
+            return thaw(self.exercises_override)
+        if self.exercise_changes is None:
+            return thaw(self.snapshot.exercises)
+        return [dict(thaw(exercise), **thaw(changes)) if changes else thaw(exercise)
+                for exercise, changes in zip(self.snapshot.exercises, self.exercise_changes)]
+
+    def to_dict(self):
+        workout = {
+            'id': self.id,
+            'user_id': self.user_id,
+            'template_id': self.template_id,
+            'workout_date': self.date,
+            'date': self.date,  # Для сумісності з фронтендом, який очікує 'date'
+            'status': self.status,
+            'template_name': self.snapshot.name,
+            'description': self.snapshot.description,
+            'exercises': self.exercises(),
+        }
+        if self.duration_seconds is not MISSING:
+            workout['duration_seconds'] = self.duration_seconds
+        return workout
+
+
+class ExerciseEntry:
+    """Виконання вправи в завершеному тренуванні; підходи — кортеж пар (повторення, вага)."""
+
+    __slots__ = ('workout_id', 'date', 'position', 'name', 'sets')
+
+    def __init__(self, workout_id, date, position, name, sets):
+        self.workout_id = workout_id
+        self.date = date
+        self.position = position
+        self.name = name
+        self.sets = tuple(sets)
+
+    def to_dict(self):
+        return history_entry(self.workout_id, self.date, self.position, self.name, self.sets)
+
+
+def _exercise_overlay(base, exercises):
+    """
+    Порівнює вправи тренування з вправами знімка. Повертає (changes, override):
+    changes — кортеж змінених полів для кожної вправи, якщо список збігається зі
+    знімком за структурою; інакше override — незмінна копія всього списку.
+    """
+    exercises = exercises or []
+    if len(exercises) != len(base) or not all(
+            isinstance(exercise, dict) and isinstance(original, Mapping)
+            and all(key in exercise for key in original)
+            for original, exercise in zip(base, exercises)):
+        return None, freeze(list(exercises))
+    changes = tuple(
+        freeze({key: value for key, value in exercise.items()
+                if key not in original or freeze(value) != original[key]}) or None
+        for original, exercise in zip(base, exercises)
+    )
+    return (changes if any(changes) else None), None
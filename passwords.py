@@ -0,0 +1,87 @@
+# passwords.py
+# Хешування паролів. PBKDF2/scrypt навмисно дорогі й займають процесор на
+# десятки-сотні мілісекунд, тож виконуються в окремих процесах: потоки запитів
+# лише чекають на результат і не тримають GIL, а інші запити обробляються далі.
+import hmac
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# Методи у форматі werkzeug: хеш має вигляд "метод:параметри$сіль$хеш"
+HASH_PREFIXES = ('pbkdf2:', 'scrypt:')
+
+
+def is_hashed(stored):
+    """Чи схожий збережений пароль на хеш werkzeug (інакше це старий відкритий пароль)."""
+    return stored.startswith(HASH_PREFIXES) and stored.count('$') >= 2
+
+
+def _hash_method(stored):
+    return stored.split('$', 1)[0]
+
+
+class PasswordHasher:
+    """
+    Хешування та перевірка паролів у пулі з workers процесів.
+
+    method — метод werkzeug разом із вартістю, наприклад 'scrypt:32768:8:1' чи
+    'pbkdf2:sha256:600000'. Якщо збережений хеш створено іншим методом (або
+    пароль зберігався відкритим текстом), verify після успішної перевірки
+    повертає новий хеш, щоб маршрут входу непомітно оновив його.
+    workers=0 — обчислення в потоці, що викликає (без пулу процесів).
+    """
+
+    def __init__(self, method='scrypt', workers=None):
+        self.method = method
+        self.workers = workers
+        self._executor = None
+        self._canonical_method = None
+
+    def start(self):
+        """
+        Запускає процеси пулу. Викликається під час старту застосунку, поки
+        ще немає інших потоків (ні потоків запитів, ні фонових потоків
+        сховища): на POSIX процеси створюються через fork і не імпортують
+        застосунок заново.
+        """
+        if self._executor is None and self.workers != 0:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        # Повна назва методу з параметрами за замовчуванням ('scrypt' -> 'scrypt:32768:8:1')
+        self._canonical_method = _hash_method(self._run(generate_password_hash, '', self.method))
+        return self
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _run(self, func, *args):
+        if self._executor is None:
+            return func(*args)
+        return self._executor.submit(func, *args).result()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def needs_rehash(self, stored):
+        if self._canonical_method is None:
+            self.start()
+        return not is_hashed(stored) or _hash_method(stored) != self._canonical_method
+
+    def verify(self, stored, password):
+        """
+        Перевіряє пароль. Повертає (чи збігається, новий хеш або None);
+        новий хеш обчислюється лише для правильного пароля з застарілим хешем.
+        """
+        if not stored:
+            return False, None
+        if is_hashed(stored):
+            matches = self._run(check_password_hash, stored, password)
+        else:
+            matches = hmac.compare_digest(stored.encode('utf-8'), password.encode('utf-8'))
+        if not matches:
+            return False, None
+        return True, (self.hash(password) if self.needs_rehash(stored) else None)
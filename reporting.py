@@ -0,0 +1,201 @@
+# reporting.py
+# Звіти для адміністраторів по всіх користувачах. Тренування та прогрес
+# знімаються в колонки (масиви чисел), після чого агрегати рахуються пакетно:
+# через NumPy, якщо він встановлений, інакше — по масивах модуля array.
+from array import array
+from collections import Counter
+from datetime import date
+
+try:
+    import numpy as np
+except ImportError:  # NumPy — необов'язкова залежність
+    np = None
+
+
+class _Codes:
+    """Замінює значення (ID користувачів, шаблонів) послідовними цілими кодами."""
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def code(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class Snapshot:
+    """
+    Колонковий знімок тренувань і прогресу: по масиву на кожне поле.
+
+    ID користувачів і шаблонів кодуються цілими числами, дати — порядковими
+    номерами днів, тож кожен рядок займає кілька машинних слів замість словника.
+    """
+
+    def __init__(self):
+        self.users = _Codes()
+        self.templates = _Codes()
+        self.workout_user = array('l')
+        self.workout_template = array('l')
+        self.workout_day = array('l')
+        self.workout_completed = array('b')
+        self.workout_duration = array('d')  # Тривалість може бути дробовою (POST .../complete приймає float)
+        self.progress_user = array('l')
+        self.progress_day = array('l')
+        self._days = {}
+
+    def __len__(self):
+        return len(self.workout_user)
+
+    def _day(self, value):
+        # Різних дат небагато, тож перетворення рядка кешується
+        day = self._days.get(value)
+        if day is None:
+            day = self._days[value] = date.fromisoformat(value).toordinal()
+        return day
+
+    @classmethod
+    def take(cls, store):
+        """Знімає тренування та прогрес зі сховища (repositories.Store)."""
+        snapshot = cls()
+        user_code = snapshot.users.code
+        template_code = snapshot.templates.code
+        day = snapshot._day
+        users, templates, days = [], [], []
+        completed, durations = bytearray(), []
+        for user_id, template_id, workout_date, status, duration_seconds in store.workouts.iter_rows():
+            users.append(user_code(user_id))
+            templates.append(template_code(template_id))
+            days.append(day(workout_date))
+            completed.append(status == 'completed')
+            durations.append(duration_seconds or 0)
+        snapshot.workout_user.extend(users)
+        snapshot.workout_template.extend(templates)
+        snapshot.workout_day.extend(days)
+        snapshot.workout_completed.frombytes(bytes(completed))
+        snapshot.workout_duration.extend(durations)
+
+        for user_id, progress_date, weight in store.progress.iter_rows():
+            # Запис прогресу з вагою означає, що користувач був активний того дня
+            if weight is not None:
+                snapshot.progress_user.append(user_code(user_id))
+                snapshot.progress_day.append(day(progress_date))
+        return snapshot
+
+
+def _date_bounds(date_from, date_to):
+    return (date.fromisoformat(date_from).toordinal() if date_from else 1,
+            date.fromisoformat(date_to).toordinal() if date_to else date.max.toordinal())
+
+
+def _report_numpy(snapshot, low, high, top):
+    def column(values):
+        return np.frombuffer(values, dtype=values.typecode) if len(values) else np.zeros(0, dtype=values.typecode)
+
+    day = column(snapshot.workout_day)
+    mask = (day >= low) & (day <= high)
+    day = day[mask]
+    user = column(snapshot.workout_user)[mask]
+    template = column(snapshot.workout_template)[mask]
+    completed = column(snapshot.workout_completed)[mask].astype(bool)
+    duration = column(snapshot.workout_duration)[mask]
+
+    user_count = len(snapshot.users)
+    per_user = np.bincount(user, minlength=user_count)
+    per_user_completed = np.bincount(user, weights=completed, minlength=user_count)
+    scheduled = per_user > 0
+
+    per_template = np.bincount(template, minlength=len(snapshot.templates))
+    # Більше запланованих — вище; за рівної кількості — у порядку появи шаблону
+    order = np.lexsort((np.arange(len(per_template)), -per_template))[:top]
+    top_templates = [(int(code), int(per_template[code])) for code in order if per_template[code]]
+
+    progress_day = column(snapshot.progress_day)
+    progress_mask = (progress_day >= low) & (progress_day <= high)
+    active_days = np.concatenate((day[completed], progress_day[progress_mask])).astype(np.int64)
+    active_users = np.concatenate((user[completed], column(snapshot.progress_user)[progress_mask]))
+    # Пара (день, користувач) кодується одним числом, щоб прибрати повтори одним np.unique
+    pairs = np.unique(active_days * max(user_count, 1) + active_users)
+    days, counts = np.unique(pairs // max(user_count, 1), return_counts=True)
+
+    return {
+        'workouts': int(len(day)),
+        'completed': int(completed.sum()),
+        'training_seconds': int(duration[completed].sum()),
+        'users': int(scheduled.sum()),
+        'average_user_completion_rate':
+            float((per_user_completed[scheduled] / per_user[scheduled]).mean()) if scheduled.any() else 0.0,
+        'top_templates': top_templates,
+        'active_users_per_day': list(zip(days.tolist(), counts.tolist())),
+    }
+
+
+def _report_python(snapshot, low, high, top):
+    per_user, per_user_completed, per_template = Counter(), Counter(), Counter()
+    active = set()
+    workouts = completed_count = training_seconds = 0
+    for user, template, day, completed, duration in zip(
+            snapshot.workout_user, snapshot.workout_template, snapshot.workout_day,
+            snapshot.workout_completed, snapshot.workout_duration):
+        if day < low or day > high:
+            continue
+        workouts += 1
+        per_user[user] += 1
+        per_template[template] += 1
+        if completed:
+            completed_count += 1
+            training_seconds += duration
+            per_user_completed[user] += 1
+            active.add((day, user))
+    for user, day in zip(snapshot.progress_user, snapshot.progress_day):
+        if low <= day <= high:
+            active.add((day, user))
+
+    top_templates = sorted(per_template.items(), key=lambda item: (-item[1], item[0]))[:top]
+    active_per_day = Counter(day for day, _ in active)
+    return {
+        'workouts': workouts,
+        'completed': completed_count,
+        'training_seconds': int(training_seconds),
+        'users': len(per_user),
+        'average_user_completion_rate':
+            sum(per_user_completed[user] / total for user, total in per_user.items()) / len(per_user)
+            if per_user else 0.0,
+        'top_templates': top_templates,
+        'active_users_per_day': sorted(active_per_day.items()),
+    }
+
+
+def build_report(snapshot, date_from=None, date_to=None, top=10, use_numpy=None):
+    """
+    Рахує по знімку (у межах дат 'РРРР-ММ-ДД', включно):
+      кількість запланованих і завершених тренувань, частку завершених,
+      середню частку завершених на користувача, загальний час тренувань,
+      top найчастіше запланованих шаблонів та кількість активних користувачів
+      (завершили тренування або записали вагу) за кожен день.
+    use_numpy=None — NumPy, якщо він доступний.
+    """
+    low, high = _date_bounds(date_from, date_to)
+    if use_numpy is None:
+        use_numpy = np is not None
+    report = (_report_numpy if use_numpy else _report_python)(snapshot, low, high, top)
+
+    workouts = report['workouts']
+    return {
+        'workouts_scheduled': workouts,
+        'workouts_completed': report['completed'],
+        'completion_rate': report['completed'] / workouts if workouts else 0.0,
+        'average_user_completion_rate': report['average_user_completion_rate'],
+        'users_with_workouts': report['users'],
+        'training_seconds': report['training_seconds'],
+        'top_templates': [{'template_id': snapshot.templates.values[code], 'scheduled': count}
+                          for code, count in report['top_templates']],
+        'active_users_per_day': [{'date': date.fromordinal(day).isoformat(), 'active_users': count}
+                                 for day, count in report['active_users_per_day']],
+    }
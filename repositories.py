@@ -0,0 +1,1073 @@
+# repositories.py
+# Шар доступу до даних. Маршрути в app.py працюють лише через ці класи,
+# а не напряму зі словниками, тож індекси завжди залишаються узгодженими.
+#
+# Кожне сховище (Store) складається з п'яти репозиторіїв з однаковим інтерфейсом:
+#   users     — користувачі (get, get_by_email, get_by_username, add, update_profile,
+#               set_role, set_password, delete, subscribe)
+#   progress  — прогрес (iter_for_user, iter_rows, has_entries, add, save_weight,
+#               record_completed, revert_completed, delete_for_user)
+#   templates — шаблони тренувань (get, add, update, delete, iter_accessible,
+#               has_personal, versions)
+#   workouts  — щоденні тренування (iter_for_user, iter_rows, get, add, add_many,
+#               mark_completed, mark_upcoming, delete, delete_for_user)
+#   analytics — агрегати для аналітики прогресу (record_weight, record_completed,
+#               revert_completed, summary, delete_for_user)
+#   exercises — виконані вправи завершених тренувань (iter_history, records, stats,
+#               list_for_user); оновлюються разом зі статусом тренувань у workouts
+# Записи повертаються як словники у форматі, який очікує фронтенд; in-memory
+# сховище тримає їх як компактні записи з models.py.
+#
+# Методи iter_* повертають записи у порядку видачі та приймають after (ключ
+# останнього запису попередньої сторінки, див. page_key) і limit — для
+# пагінації за курсором без OFFSET.
+#
+# In-memory репозиторії також мають dump_state/load_state: стан у вигляді
+# кортежів і списків простих значень (для знімків, див. durable_store.py).
+import random
+import threading
+import uuid
+from contextlib import contextmanager
+from itertools import count, islice
+from operator import itemgetter
+
+from analytics import PERIODS, Bucket, StreakTracker, build_summary, period_key
+from exercises import (MaxTracker, build_records, build_stats, exercise_key, performed_exercises, session_stats,
+                       session_volume, set_record)
+from indexes import InvertedIndex, SortedIndex, UniqueIndex, intersect
+from locks import StripedLock
+from models import (MISSING, ExerciseEntry, ProgressRecord, TemplateRecord, TemplateSnapshot, UserRecord,
+                    WorkoutRecord, freeze, intern_value, thaw)
+
+# Поля шаблону, які можна задати при створенні чи змінити через PUT
+TEMPLATE_FIELDS = ('name', 'description', 'exercises', 'is_global', 'muscle_groups',
+                   'goal', 'difficulty', 'equipment', 'duration_category')
+
+# Поля з фактичними результатами, які додаються до вправ при завершенні тренування
+ACTUAL_EXERCISE_FIELDS = ('actual_weight', 'actual_sets_reps')
+
+
+# Області, для яких шаблони ведуть лічильники версій (див. TemplateRepository.versions):
+# усі глобальні шаблони, особисті шаблони одного власника та окремий шаблон.
+GLOBAL_SCOPE = 'global'
+
+
+def owner_scope(user_id):
+    return f'owner:{user_id}'
+
+
+def template_scope(template_id):
+    return f'template:{template_id}'
+
+
+def generate_unique_id():
+    """Генерує унікальний ID."""
+    return str(uuid.uuid4())
+
+
+def strip_actual_results(exercises):
+    """Повертає копію списку вправ без фактичних даних про виконання."""
+    return [
+        {key: value for key, value in exercise.items() if key not in ACTUAL_EXERCISE_FIELDS}
+        if isinstance(exercise, dict) else exercise
+        for exercise in exercises
+    ]
+
+
+class SnapshotTable:
+    """
+    Знімки шаблонів у стані сховища. Тренування та шаблони посилаються на спільні
+    знімки, тож у стані кожен знімок зберігається один раз, а записи — його номер.
+    """
+
+    def __init__(self, rows=()):
+        self.rows = list(rows)  # [(template_id, версія, назва, опис, вправи)]
+        self._positions = {}
+        self._snapshots = [TemplateSnapshot(*row) for row in self.rows]
+
+    def position(self, snapshot):
+        position = self._positions.get(id(snapshot))
+        if position is None:
+            position = self._positions[id(snapshot)] = len(self.rows)
+            self.rows.append((snapshot.template_id, snapshot.version, snapshot.name, snapshot.description,
+                              thaw(snapshot.exercises)))
+            self._snapshots.append(snapshot)  # Тримає знімок живим, поки його id() є в таблиці
+        return position
+
+    def snapshot(self, position):
+        return self._snapshots[position]
+
+
+class UserChangeNotifier:
+    """
+    Повідомляє підписників про зміну чи видалення користувача
+    (наприклад, щоб скинути закешовані дані користувача).
+    """
+
+    _subscribers = ()
+
+    def subscribe(self, callback):
+        """Реєструє callback(user_id), який викликається після зміни користувача."""
+        self._subscribers = self._subscribers + (callback,)
+
+    def _notify(self, user_id):
+        for callback in self._subscribers:
+            callback(user_id)
+
+
+class UserRepository(UserChangeNotifier):
+    """
+    In-memory сховище користувачів з індексами.
+
+    Первинний індекс — {id: UserRecord}, вторинні унікальні індекси —
+    {email: id} та {username: id}, тому пошук не залежить від кількості користувачів.
+    Зміни одного користувача виконуються під його локом із locks (StripedLock).
+    """
+
+    def __init__(self, locks=None):
+        self._by_id = {}
+        self._locks = locks or StripedLock()
+        self._emails = UniqueIndex('email')
+        self._usernames = UniqueIndex('username')
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __iter__(self):
+        # Ітерація по ID у порядку реєстрації (як у звичайного словника)
+        return iter(self._by_id)
+
+    def get(self, user_id):
+        """Повертає користувача за ID або None."""
+        user = self._by_id.get(user_id)
+        return user.to_dict() if user is not None else None
+
+    def get_by_email(self, email):
+        """Повертає користувача за email або None."""
+        user_id = self._emails.get(email)
+        return self.get(user_id) if user_id is not None else None
+
+    def get_by_username(self, username):
+        """Повертає користувача за ім'ям або None."""
+        user_id = self._usernames.get(username)
+        return self.get(user_id) if user_id is not None else None
+
+    def add(self, user):
+        """
+        Додає користувача (ID генерується, якщо його немає). Email та username
+        резервуються атомарно; якщо хоч одне значення зайняте, кидається
+        UniqueConstraintError і жодних змін не залишається.
+        """
+        user = UserRecord.from_dict(dict(user, id=user.get('id') or generate_unique_id()))
+        self._emails.reserve(user.email, user.id)
+        try:
+            self._usernames.reserve(user.username, user.id)
+        except Exception:
+            self._emails.release(user.email, user.id)
+            raise
+        self._by_id[user.id] = user
+        return user.to_dict()
+
+    def update_profile(self, user_id, username, email):
+        """
+        Змінює ім'я та email користувача. Нові значення резервуються до того,
+        як звільняються старі, тому конфлікт не залишає профіль напівзміненим.
+        """
+        with self._locks.lock(user_id):
+            user = self._by_id[user_id]
+            old_email, old_username = user.email, user.username
+
+            self._emails.reserve(email, user_id)
+            try:
+                self._usernames.reserve(username, user_id)
+            except Exception:
+                if email != old_email:
+                    self._emails.release(email, user_id)
+                raise
+
+            if email != old_email:
+                self._emails.release(old_email, user_id)
+            if username != old_username:
+                self._usernames.release(old_username, user_id)
+            user.username = username
+            user.email = email
+            self._notify(user_id)
+            return user.to_dict()
+
+    def set_role(self, user_id, role):
+        with self._locks.lock(user_id):
+            user = self._by_id[user_id]
+            user.role = intern_value(role)
+            self._notify(user_id)
+            return user.to_dict()
+
+    def set_password(self, user_id, password):
+        """Замінює збережений пароль (хеш) користувача."""
+        with self._locks.lock(user_id):
+            user = self._by_id[user_id]
+            user.password = password
+            self._notify(user_id)
+            return user.to_dict()
+
+    def dump_state(self):
+        return [(user.id, user.username, user.email, user.password, user.role) for user in self._by_id.values()]
+
+    def load_state(self, rows):
+        for row in rows:
+            user = UserRecord(*row)
+            self._emails.reserve(user.email, user.id)
+            self._usernames.reserve(user.username, user.id)
+            self._by_id[user.id] = user
+
+    def delete(self, user_id):
+        """Видаляє користувача та звільняє його email і username."""
+        with self._locks.lock(user_id):
+            user = self._by_id.pop(user_id, None)
+            if user is None:
+                return False
+            self._emails.release(user.email, user_id)
+            self._usernames.release(user.username, user_id)
+            self._notify(user_id)
+            return True
+
+
+class ProgressRepository:
+    """
+    In-memory сховище прогресу: {user_id: SortedIndex(дата -> ProgressRecord)}.
+
+    Записи кожного користувача впорядковані за датою, тому читання не потребує
+    сортування, а пошук запису за датою виконується за O(1). Операції з записами
+    користувача виконуються під його локом із locks (StripedLock).
+    """
+
+    def __init__(self, locks=None):
+        self._by_user = {}
+        self._locks = locks or StripedLock()
+
+    def __len__(self):
+        return len(self._by_user)
+
+    page_key_shape = str  # Дата 'РРРР-ММ-ДД'
+
+    @staticmethod
+    def page_key(entry):
+        # На кожну дату припадає не більше одного запису, тож дата однозначно задає позицію
+        return entry['date']
+
+    def iter_for_user(self, user_id, after=None, limit=None, date_from=None, date_to=None):
+        """Повертає записи прогресу користувача (за потреби в межах дат) від найновіших до найстаріших."""
+        with self._locks.lock(user_id):
+            entries = self._by_user.get(user_id)
+            if entries is None:
+                return iter(())
+            # Посилання на записи збираються під локом, щоб паралельна вставка не зсунула позиції
+            selected = list(islice(entries.iter_desc(after, date_from, date_to), limit))
+        return (entry.to_dict() for entry in selected)
+
+    def iter_rows(self):
+        """Повертає (user_id, date, weight) для всіх записів прогресу (для звітів)."""
+        for user_id, entries in list(self._by_user.items()):
+            for entry in list(entries.iter_desc()):
+                yield user_id, entry.date, entry.weight
+
+    def has_entries(self, user_id):
+        return user_id in self._by_user
+
+    def _find(self, user_id, date):
+        entries = self._by_user.get(user_id)
+        return entries.get(date) if entries is not None else None
+
+    def add(self, user_id, entry):
+        """Додає готовий запис прогресу (використовується для тестових даних)."""
+        with self._locks.lock(user_id):
+            self._by_user.setdefault(user_id, SortedIndex()).insert(entry['date'], ProgressRecord.from_dict(entry))
+
+    def save_weight(self, user_id, date, weight):
+        """
+        Оновлює вагу за дату або створює новий запис, зберігаючи кількість тренувань.
+        Повертає попередню вагу за цю дату (None, якщо її не було).
+        """
+        with self._locks.lock(user_id):
+            entry = self._find(user_id, date)
+            if entry is not None:
+                previous_weight, entry.weight = entry.weight, weight
+                return previous_weight
+            self.add(user_id, {'date': date, 'weight': weight, 'workouts_completed': 0})
+            return None
+
+    def record_completed(self, user_id, date):
+        """
+        Збільшує кількість завершених тренувань за дату. Як і раніше, прогрес
+        оновлюється лише для користувачів, які вже мають записи прогресу.
+        """
+        with self._locks.lock(user_id):
+            if not self.has_entries(user_id):
+                return
+            entry = self._find(user_id, date)
+            if entry is not None:
+                entry.workouts_completed += 1
+            else:
+                # Якщо запису прогресу за цей день не було, створюємо новий
+                self.add(user_id, {'date': date, 'weight': None, 'workouts_completed': 1})
+
+    def revert_completed(self, user_id, date):
+        """Зменшує кількість завершених тренувань за дату (але не нижче нуля)."""
+        with self._locks.lock(user_id):
+            entry = self._find(user_id, date)
+            if entry is not None and entry.workouts_completed > 0:
+                entry.workouts_completed -= 1
+
+    def delete_for_user(self, user_id):
+        """Видаляє весь прогрес користувача. Повертає True, якщо було що видаляти."""
+        with self._locks.lock(user_id):
+            return self._by_user.pop(user_id, None) is not None
+
+    def dump_state(self):
+        return [(user_id, [(entry.date, entry.weight, entry.workouts_completed) for entry in entries.values()])
+                for user_id, entries in self._by_user.items()]
+
+    def load_state(self, rows):
+        for user_id, entries in rows:
+            self._by_user[user_id] = SortedIndex.from_sorted((row[0], ProgressRecord(*row)) for row in entries)
+
+
+class TemplateRepository:
+    """
+    In-memory сховище шаблонів тренувань: {template_id: TemplateRecord}.
+
+    Для фільтрів GET /workout_templates підтримуються інвертовані індекси
+    за кожним фасетом, а також індекси глобальних шаблонів та шаблонів власника.
+    Запит перетинає відповідні множини id, починаючи з найменшої, тож час
+    залежить від розміру результату, а не від загальної кількості шаблонів.
+    Індекси оновлюються інкрементально в add, update та delete.
+
+    Кожна зміна також збільшує лічильники версій шаблону та його області
+    (глобальні чи особисті шаблони власника); за ними будуються ETag відповідей.
+    Шаблони змінюються рідко, тож зміни й читання індексів захищає один лок.
+    """
+
+    # Фільтр запиту -> поле шаблону. Для списків індексується кожен елемент.
+    FACETS = {
+        'muscle_group': 'muscle_groups',
+        'goal': 'goal',
+        'difficulty': 'difficulty',
+        'equipment': 'equipment',
+        'duration_category': 'duration_category',
+    }
+
+    def __init__(self):
+        self._by_id = {}
+        self._order = {}  # {template_id: порядковий номер}, щоб зберегти порядок створення
+        self._next_order = 0
+        self._global_ids = set()
+        self._by_owner = InvertedIndex()
+        self._facets = {facet: InvertedIndex() for facet in self.FACETS}
+        self._lock = threading.RLock()
+        # Епоха відрізняє лічильники різних запусків: після перезапуску версії починаються з нуля
+        self._versions = {'epoch': random.getrandbits(31)}
+        self._version_sequence = count(1)
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __iter__(self):
+        return iter(self._by_id)
+
+    @staticmethod
+    def _facet_values(template, field):
+        # Фільтри приходять рядками з query string, тож інші типи значень ніколи не збігаються
+        return {item for item in template.facet_values(field) if isinstance(item, str)}
+
+    def _index(self, template):
+        if template.is_global:
+            self._global_ids.add(template.id)
+        self._by_owner.add(template.user_id, template.id)
+        for facet, field in self.FACETS.items():
+            for value in self._facet_values(template, field):
+                self._facets[facet].add(value, template.id)
+
+    def _unindex(self, template):
+        self._global_ids.discard(template.id)
+        self._by_owner.discard(template.user_id, template.id)
+        for facet, field in self.FACETS.items():
+            for value in self._facet_values(template, field):
+                self._facets[facet].discard(value, template.id)
+
+    @staticmethod
+    def _scopes(template):
+        return {template_scope(template.id), GLOBAL_SCOPE if template.is_global else owner_scope(template.user_id)}
+
+    def _bump(self, scopes):
+        # Спільна послідовність: next() атомарний, тож паралельні зміни не отримають ту саму версію
+        version = next(self._version_sequence)
+        for scope in scopes:
+            self._versions[scope] = version
+
+    def versions(self, scopes):
+        """Повертає (епоха, версія кожної області); версія змінюється з кожною зміною шаблонів області."""
+        return (self._versions['epoch'],) + tuple(self._versions.get(scope, 0) for scope in scopes)
+
+    def has_personal(self, user_id):
+        """Чи є в користувача власні (не глобальні) шаблони."""
+        with self._lock:
+            return any(template_id not in self._global_ids for template_id in self._by_owner.get(user_id))
+
+    def get(self, template_id):
+        template = self._by_id.get(template_id)
+        return template.to_dict() if template is not None else None
+
+    def snapshot(self, template_id):
+        """Повертає незмінний знімок поточної версії шаблону (None, якщо шаблону немає)."""
+        template = self._by_id.get(template_id)
+        return template.snapshot if template is not None else None
+
+    def add(self, template):
+        """Додає шаблон (ID генерується, якщо його немає) і повертає його."""
+        with self._lock:
+            record = TemplateRecord(template.get('id') or generate_unique_id(), template.get('user_id'))
+            record.set({field: template[field] for field in TEMPLATE_FIELDS if field in template})
+            self._by_id[record.id] = record
+            self._order[record.id] = self._next_order
+            self._next_order += 1
+            self._index(record)
+            self._bump(self._scopes(record))
+            return record.to_dict()
+
+    def update(self, template_id, changes):
+        """Оновлює лише передані поля шаблону та перебудовує його записи в індексах."""
+        with self._lock:
+            template = self._by_id[template_id]
+            scopes = self._scopes(template)
+            self._unindex(template)
+            template.set(changes)
+            self._index(template)
+            self._bump(scopes | self._scopes(template))
+            return template.to_dict()
+
+    def delete(self, template_id):
+        with self._lock:
+            template = self._by_id.pop(template_id, None)
+            if template is None:
+                return False
+            del self._order[template_id]
+            # Уже заплановані тренування зберігають посилання на свої знімки
+            self._unindex(template)
+            self._bump(self._scopes(template))
+            return True
+
+    page_key_shape = int  # Порядковий номер створення
+
+    def page_key(self, template):
+        return self._order[template['id']]
+
+    def dump_state(self, snapshots):
+        """Шаблони в порядку створення; знімки записуються в snapshots (SnapshotTable)."""
+        rows = [(t.id, t.user_id, t.is_global, thaw(t.muscle_groups), t.goal, t.difficulty, thaw(t.equipment),
+                 t.duration_category, snapshots.position(t.snapshot), self._order[t.id])
+                for t in sorted(self._by_id.values(), key=lambda t: self._order[t.id])]
+        return rows, self._next_order
+
+    def load_state(self, state, snapshots):
+        rows, self._next_order = state
+        for (template_id, user_id, is_global, muscle_groups, goal, difficulty, equipment, duration_category,
+             snapshot, order) in rows:
+            record = TemplateRecord(template_id, user_id)
+            record.set({'is_global': is_global, 'muscle_groups': muscle_groups, 'goal': goal,
+                        'difficulty': difficulty, 'equipment': equipment, 'duration_category': duration_category})
+            record.snapshot = snapshots.snapshot(snapshot)
+            self._by_id[template_id] = record
+            self._order[template_id] = order
+            self._index(record)
+
+    def iter_accessible(self, user_id, filters, after=None, limit=None):
+        """Повертає глобальні та власні шаблони користувача, що відповідають фільтрам."""
+        with self._lock:
+            facet_sets = []
+            for facet in self.FACETS:
+                value = filters.get(facet)
+                # Для обладнання шаблон має містити всі вибрані елементи
+                for item in (value if isinstance(value, list) else [value]):
+                    if item:
+                        facet_sets.append(self._facets[facet].get(item))
+
+            # Шаблони доступні, якщо вони глобальні або створені поточним користувачем.
+            # Глобальні та власні шаблони перетинаємо з фасетами окремо, щоб не будувати їх об'єднання.
+            matched = set()
+            for scope in (self._global_ids, self._by_owner.get(user_id)):
+                matched |= intersect([scope] + facet_sets)
+            ordered = sorted(matched, key=self._order.__getitem__)
+            if after is not None:
+                ordered = (template_id for template_id in ordered if self._order[template_id] > after)
+            return [self._by_id[template_id].to_dict() for template_id in islice(ordered, limit)]
+
+
+class _ExerciseHistory:
+    """
+    Виконання однієї вправи користувача (SortedIndex((дата, workout_id, позиція)
+    -> ExerciseEntry)) разом з інкрементальними показниками: найбільша вага,
+    найбільший оцінений 1ПМ і об'єм за тижнями (SortedIndex(тиждень -> [тиждень, об'єм, виконань])).
+    """
+
+    __slots__ = ('entries', 'max_weight', 'max_e1rm', 'weekly')
+
+    def __init__(self):
+        self.entries = SortedIndex(bound_key=itemgetter(0))
+        self.max_weight = MaxTracker()
+        self.max_e1rm = MaxTracker()
+        self.weekly = SortedIndex()
+
+    def add(self, entry_key, entry):
+        self.entries.insert(entry_key, entry)
+        max_weight, max_e1rm, volume = session_stats(entry.sets)
+        self.max_weight.add(max_weight)
+        self.max_e1rm.add(max_e1rm)
+        if volume is not None:
+            week = period_key(entry.date, 'week')
+            totals = self.weekly.get(week)
+            if totals is None:
+                self.weekly.insert(week, [week, volume, 1])
+            else:
+                totals[1] += volume
+                totals[2] += 1
+
+    def remove(self, entry_key):
+        entry = self.entries.remove(entry_key)
+        max_weight, max_e1rm, volume = session_stats(entry.sets)
+        self.max_weight.remove(max_weight)
+        self.max_e1rm.remove(max_e1rm)
+        if volume is not None:
+            week = period_key(entry.date, 'week')
+            totals = self.weekly.get(week)
+            totals[1] -= volume
+            totals[2] -= 1
+            if not totals[2]:
+                self.weekly.remove(week)
+
+    def dump_state(self):
+        # Показники зберігаються разом із записами, щоб не перераховувати їх під час відновлення
+        return ([(entry.date, entry.workout_id, entry.position, entry.name, entry.sets) for entry in self.entries.values()],
+                self.max_weight.dump_state(), self.max_e1rm.dump_state(), [list(totals) for totals in self.weekly.values()])
+
+    @classmethod
+    def load_state(cls, state):
+        entries, max_weight, max_e1rm, weekly = state
+        history = cls()
+        history.entries = SortedIndex.from_sorted(
+            (((date, workout_id, position), ExerciseEntry(workout_id, date, position, name, sets))
+             for date, workout_id, position, name, sets in entries), bound_key=itemgetter(0))
+        history.max_weight = MaxTracker.load_state(max_weight)
+        history.max_e1rm = MaxTracker.load_state(max_e1rm)
+        history.weekly = SortedIndex.from_sorted((totals[0], totals) for totals in weekly)
+        return history
+
+    def stats(self, weeks):
+        latest = next(self.entries.iter_desc())
+        weekly_volume = [(week, volume) for week, volume, _ in islice(self.weekly.iter_desc(), weeks)]
+        return build_stats(latest.name, len(self.entries), self.max_weight.max, self.max_e1rm.max, weekly_volume)
+
+
+class ExerciseRepository:
+    """
+    In-memory історія виконаних вправ:
+    {user_id: {ключ вправи: _ExerciseHistory}}.
+
+    Записи додає та прибирає WorkoutRepository, коли тренування стає завершеним,
+    повертається в заплановані чи видаляється. Історія й рекорди вправи
+    переглядають лише виконання цієї вправи, а не всі тренування користувача;
+    показники (stats) оновлюються разом із записами й читаються без перегляду історії.
+    """
+
+    def __init__(self, locks=None):
+        self._locks = locks or StripedLock()
+        self._by_user = {}
+        self._by_workout = {}  # {workout_id: [(ключ вправи, ключ запису)]}
+
+    def __len__(self):
+        return len(self._by_user)
+
+    page_key_shape = (str, str, int)  # (дата, ID тренування, позиція вправи)
+
+    @staticmethod
+    def page_key(entry):
+        return (entry['date'], entry['workout_id'], entry['position'])
+
+    def record(self, user_id, workout_id, date, exercises):
+        """Додає виконані вправи завершеного тренування."""
+        with self._locks.lock(user_id):
+            user_exercises = self._by_user.setdefault(user_id, {})
+            refs = []
+            for position, name, sets in performed_exercises(exercises):
+                key = exercise_key(name)
+                history = user_exercises.get(key)
+                if history is None:
+                    history = user_exercises[key] = _ExerciseHistory()
+                entry_key = (date, workout_id, position)
+                history.add(entry_key, ExerciseEntry(workout_id, date, position, name, sets))
+                refs.append((key, entry_key))
+            if refs:
+                self._by_workout[workout_id] = refs
+            elif not user_exercises:
+                del self._by_user[user_id]
+
+    def remove(self, user_id, workout_id):
+        """Прибирає вправи тренування (якщо їх було записано)."""
+        with self._locks.lock(user_id):
+            refs = self._by_workout.pop(workout_id, None)
+            if refs is None:
+                return
+            user_exercises = self._by_user[user_id]
+            for key, entry_key in refs:
+                history = user_exercises[key]
+                history.remove(entry_key)
+                if not history.entries:
+                    del user_exercises[key]
+            if not user_exercises:
+                del self._by_user[user_id]
+
+    def iter_history(self, user_id, name, after=None, limit=None, date_from=None, date_to=None):
+        """Повертає виконання вправи (за потреби в межах дат) від найновіших до найстаріших."""
+        with self._locks.lock(user_id):
+            history = self._by_user.get(user_id, {}).get(exercise_key(name))
+            if history is None:
+                return iter(())
+            selected = list(islice(history.entries.iter_desc(after, date_from, date_to), limit))
+        # Записи незмінні, тож перетворюються вже без локу
+        return (entry.to_dict() for entry in selected)
+
+    def records(self, user_id, name):
+        """Рекорди вправи (див. exercises.build_records) або None, якщо вправу не виконували."""
+        with self._locks.lock(user_id):
+            exercise = self._by_user.get(user_id, {}).get(exercise_key(name))
+            if exercise is None:
+                return None
+            history = list(exercise.entries.iter_desc())
+        history.reverse()  # Від найстаріших: серед однакових результатів рекорд — перший
+
+        heaviest_set = most_reps = best_volume = None
+        heaviest_key = reps_key = None
+        for entry in history:
+            for reps, weight in entry.sets:
+                if weight is not None:
+                    key = (weight, -1 if reps is None else reps)
+                    if heaviest_key is None or key > heaviest_key:
+                        heaviest_key, heaviest_set = key, set_record(reps, weight, entry.date, entry.workout_id)
+                if reps is not None:
+                    key = (reps, float('-inf') if weight is None else weight)
+                    if reps_key is None or key > reps_key:
+                        reps_key, most_reps = key, set_record(reps, weight, entry.date, entry.workout_id)
+            volume = session_volume(entry.sets)
+            if volume is not None and (best_volume is None or volume > best_volume['volume']):
+                best_volume = {'volume': volume, 'date': entry.date, 'workout_id': entry.workout_id}
+        return build_records(history[-1].name, len(history), history[0].date, history[-1].date,
+                             heaviest_set, most_reps, best_volume)
+
+    def stats(self, user_id, name, weeks):
+        """
+        Показники вправи (див. exercises.build_stats) з об'ємом за останні weeks тижнів
+        або None, якщо вправу не виконували. Читаються з індексу без перегляду історії.
+        """
+        with self._locks.lock(user_id):
+            history = self._by_user.get(user_id, {}).get(exercise_key(name))
+            return history.stats(weeks) if history is not None else None
+
+    def list_for_user(self, user_id):
+        """Вправи, які виконував користувач: назва, кількість виконань, дата останнього."""
+        with self._locks.lock(user_id):
+            summaries = []
+            for key, history in sorted(self._by_user.get(user_id, {}).items()):
+                latest = next(history.entries.iter_desc())
+                summaries.append({'name': latest.name, 'sessions': len(history.entries), 'last_date': latest.date})
+        summaries.sort(key=itemgetter('last_date'), reverse=True)
+        return summaries
+
+    def delete_for_user(self, user_id):
+        with self._locks.lock(user_id):
+            user_exercises = self._by_user.pop(user_id, None)
+            if user_exercises is None:
+                return False
+            for history in user_exercises.values():
+                for entry in history.entries.iter_desc():
+                    self._by_workout.pop(entry.workout_id, None)
+            return True
+
+    def dump_state(self):
+        return [(user_id, [(key, history.dump_state()) for key, history in user_exercises.items()])
+                for user_id, user_exercises in self._by_user.items()]
+
+    def load_state(self, rows):
+        for user_id, histories in rows:
+            user_exercises = self._by_user[user_id] = {}
+            for key, state in histories:
+                user_exercises[key] = _ExerciseHistory.load_state(state)
+                for date, workout_id, position, _, _ in state[0]:
+                    self._by_workout.setdefault(workout_id, []).append((key, (date, workout_id, position)))
+
+
+class WorkoutRepository:
+    """
+    In-memory сховище щоденних тренувань: {user_id: SortedIndex((дата, id) -> запис)}.
+
+    Тренування кожного користувача впорядковані за датою (і ID для однакових дат),
+    тому список видається без сортування, а вибірка за діапазоном дат — O(log n).
+    Глобальний індекс {workout_id: запис} дає доступ до тренування за O(1);
+    належність користувачу перевіряється за полем user_id.
+
+    Запис посилається на знімок шаблону (TemplateSnapshot) замість копії його
+    вправ, тож пам'ять на тренування не залежить від розміру шаблону, а зміни
+    шаблону не зачіпають уже заплановані тренування. Назовні тренування
+    віддаються як нові словники, тому зміни в них не потрапляють у сховище.
+    Операції з тренуваннями користувача виконуються під його локом із locks.
+    Виконані вправи завершених тренувань ведуться в exercises (ExerciseRepository).
+    """
+
+    def __init__(self, templates, locks=None, exercises=None):
+        self._templates = templates
+        self._locks = locks or StripedLock()
+        self._exercises = exercises if exercises is not None else ExerciseRepository(self._locks)
+        self._by_user = {}
+        self._by_id = {}
+
+    def __len__(self):
+        return len(self._by_user)
+
+    page_key_shape = (str, str)  # (дата, ID тренування)
+
+    @staticmethod
+    def page_key(workout):
+        # На одну дату може бути кілька тренувань, тому порядок уточнюється за ID
+        return (workout['date'], workout['id'])
+
+    def iter_for_user(self, user_id, after=None, limit=None, date_from=None, date_to=None):
+        """Повертає тренування користувача (за потреби в межах дат) від найновіших до найстаріших."""
+        lock = self._locks.lock(user_id)
+        with lock:
+            workouts = self._by_user.get(user_id)
+            if workouts is None:
+                return iter(())
+            selected = list(islice(workouts.iter_desc(after, date_from, date_to), limit))
+        return self._to_dicts(lock, selected)
+
+    @staticmethod
+    def _to_dicts(lock, records):
+        # Кожен запис перетворюється під локом, щоб не побачити напівзавершену зміну статусу
+        for record in records:
+            with lock:
+                workout = record.to_dict()
+            yield workout
+
+    def iter_rows(self):
+        """
+        Повертає (user_id, template_id, date, status, duration_seconds) для всіх
+        тренувань (для звітів), не створюючи словників.
+        """
+        for record in list(self._by_id.values()):
+            duration_seconds = record.duration_seconds if record.duration_seconds is not MISSING else None
+            yield record.user_id, record.template_id, record.date, record.status, duration_seconds
+
+    def _get_record(self, user_id, workout_id):
+        record = self._by_id.get(workout_id)
+        # Чуже тренування поводиться так само, як відсутнє
+        if record is None or record.user_id != user_id:
+            return None
+        return record
+
+    def get(self, user_id, workout_id):
+        with self._locks.lock(user_id):
+            record = self._get_record(user_id, workout_id)
+            return record.to_dict() if record is not None else None
+
+    def add(self, workout):
+        """Додає тренування (ID генерується, якщо його немає) і повертає його."""
+        with self._locks.lock(workout['user_id']):
+            template_id = workout['template_id']
+            snapshot = self._templates.snapshot(template_id)
+            if (snapshot is None or snapshot.name != workout.get('template_name')
+                    or snapshot.description != workout.get('description')):
+                # Шаблон уже змінений чи видалений — тренування отримує власний знімок
+                snapshot = TemplateSnapshot(template_id, 0, workout.get('template_name'),
+                                            workout.get('description'), workout.get('exercises'))
+
+            record = WorkoutRecord(workout.get('id') or generate_unique_id(), workout['user_id'], template_id,
+                                   workout['date'], workout.get('status', 'upcoming'), snapshot)
+            record.set_exercises(workout.get('exercises'))
+            if 'duration_seconds' in workout:
+                record.duration_seconds = workout['duration_seconds']
+
+            workouts = self._by_user.setdefault(record.user_id, SortedIndex(bound_key=itemgetter(0)))
+            workouts.insert((record.date, record.id), record)
+            self._by_id[record.id] = record
+            if record.status == 'completed':
+                self._exercises.record(record.user_id, record.id, record.date, workout.get('exercises'))
+            return record.to_dict()
+
+    def add_many(self, workouts):
+        """
+        Додає кілька тренувань одного користувача і повертає їх у тому ж порядку.
+        Лок користувача тримається на весь пакет, тож читання не бачать його частково.
+        """
+        if not workouts:
+            return []
+        with self._locks.lock(workouts[0]['user_id']):
+            return [self.add(workout) for workout in workouts]
+
+    def mark_completed(self, user_id, workout_id, exercises, duration_seconds):
+        with self._locks.lock(user_id):
+            record = self._get_record(user_id, workout_id)
+            record.status = 'completed'
+            record.set_exercises(exercises)  # Оновлюємо вправи з фактичними даними
+            record.duration_seconds = duration_seconds
+            self._exercises.remove(user_id, workout_id)
+            self._exercises.record(user_id, workout_id, record.date, exercises)
+            return record.to_dict()
+
+    def mark_upcoming(self, user_id, workout_id):
+        """Повертає статус "заплановано" та очищає фактичні дані про виконання."""
+        with self._locks.lock(user_id):
+            record = self._get_record(user_id, workout_id)
+            record.status = 'upcoming'
+            record.set_exercises(strip_actual_results(record.exercises()))
+            record.duration_seconds = MISSING
+            self._exercises.remove(user_id, workout_id)
+            return record.to_dict()
+
+    def delete(self, user_id, workout_id):
+        with self._locks.lock(user_id):
+            record = self._get_record(user_id, workout_id)
+            if record is None:
+                return False
+            # Видалення ключа зі списку відбувається на місці, без перебудови всього списку
+            self._by_user[user_id].remove((record.date, record.id))
+            del self._by_id[workout_id]
+            self._exercises.remove(user_id, workout_id)
+            return True
+
+    def delete_for_user(self, user_id):
+        with self._locks.lock(user_id):
+            workouts = self._by_user.pop(user_id, None)
+            if workouts is None:
+                return False
+            for record in workouts.iter_desc():
+                del self._by_id[record.id]
+            self._exercises.delete_for_user(user_id)
+            return True
+
+    def dump_state(self, snapshots):
+        """Тренування користувачів; вправи — різниця відносно знімка (або повний список), як у записі."""
+        rows = []
+        for user_id, workouts in self._by_user.items():
+            rows.append((user_id, [
+                (r.id, r.template_id, r.date, r.status, snapshots.position(r.snapshot),
+                 None if r.exercise_changes is None else [thaw(changes) for changes in r.exercise_changes],
+                 thaw(r.exercises_override), r.duration_seconds is not MISSING,
+                 None if r.duration_seconds is MISSING else r.duration_seconds)
+                for r in workouts.values()]))
+        return rows
+
+    def load_state(self, rows, snapshots):
+        """Відновлює тренування; історію вправ відновлює окремо ExerciseRepository.load_state."""
+        for user_id, records in rows:
+            pairs = []
+            for (workout_id, template_id, date, status, snapshot, changes, override, has_duration,
+                 duration_seconds) in records:
+                record = WorkoutRecord(workout_id, user_id, template_id, date, status, snapshots.snapshot(snapshot))
+                if changes is not None:
+                    record.exercise_changes = tuple(freeze(item) for item in changes)
+                if override is not None:
+                    record.exercises_override = freeze(override)
+                if has_duration:
+                    record.duration_seconds = duration_seconds
+                self._by_id[workout_id] = record
+                pairs.append(((date, workout_id), record))
+            self._by_user[user_id] = SortedIndex.from_sorted(pairs, bound_key=itemgetter(0))
+
+
+class _UserActivity:
+    """Агрегати одного користувача: періоди тижнів і місяців, загальні підсумки та серії."""
+
+    __slots__ = ('buckets', 'workouts_completed', 'training_seconds', 'streaks')
+
+    def __init__(self):
+        self.buckets = {period: SortedIndex() for period in PERIODS}  # {period: SortedIndex(ключ -> Bucket)}
+        self.workouts_completed = 0
+        self.training_seconds = 0
+        self.streaks = StreakTracker()
+
+    def update(self, date, workouts=0, seconds=0, weight_sum=0.0, weight_count=0):
+        """Додає зміни до тижня й місяця, яким належить дата. Порожні періоди прибираються."""
+        for period, buckets in self.buckets.items():
+            key = period_key(date, period)
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = Bucket(key)
+                buckets.insert(key, bucket)
+            bucket.workouts_completed += workouts
+            bucket.training_seconds += seconds
+            bucket.weight_sum += weight_sum
+            bucket.weight_count += weight_count
+            if bucket.is_empty():
+                buckets.remove(key)
+        self.workouts_completed += workouts
+        self.training_seconds += seconds
+
+
+class AnalyticsRepository:
+    """
+    In-memory агрегати для GET /my_analytics: {user_id: _UserActivity}.
+
+    Агрегати оновлюються разом із прогресом і статусом тренувань, тож відповідь
+    будується з кількох останніх періодів без перегляду всієї історії.
+    """
+
+    def __init__(self, locks=None):
+        self._by_user = {}
+        self._locks = locks or StripedLock()
+
+    def __len__(self):
+        return len(self._by_user)
+
+    def _activity(self, user_id):
+        activity = self._by_user.get(user_id)
+        if activity is None:
+            activity = self._by_user[user_id] = _UserActivity()
+        return activity
+
+    def record_weight(self, user_id, date, previous_weight, weight):
+        """Враховує нову вагу за дату; previous_weight — вага, яку вона замінила (або None)."""
+        with self._locks.lock(user_id):
+            activity = self._activity(user_id)
+            if previous_weight is not None:
+                activity.update(date, weight_sum=-previous_weight, weight_count=-1)
+            if weight is not None:
+                activity.update(date, weight_sum=weight, weight_count=1)
+
+    def record_completed(self, user_id, date, duration_seconds):
+        with self._locks.lock(user_id):
+            activity = self._activity(user_id)
+            activity.update(date, workouts=1, seconds=duration_seconds or 0)
+            activity.streaks.add(date)
+
+    def revert_completed(self, user_id, date, duration_seconds):
+        with self._locks.lock(user_id):
+            activity = self._by_user.get(user_id)
+            if activity is None:
+                return
+            activity.update(date, workouts=-1, seconds=-(duration_seconds or 0))
+            activity.streaks.remove(date)
+
+    def summary(self, user_id, period, limit, window, today):
+        with self._locks.lock(user_id):
+            activity = self._by_user.get(user_id) or _UserActivity()
+            return build_summary(
+                period, activity.buckets[period].iter_desc(), limit, window,
+                {'workouts_completed': activity.workouts_completed, 'training_seconds': activity.training_seconds},
+                activity.streaks.current(today), activity.streaks.longest)
+
+    def delete_for_user(self, user_id):
+        with self._locks.lock(user_id):
+            return self._by_user.pop(user_id, None) is not None
+
+    def dump_state(self):
+        return [(user_id, activity.workouts_completed, activity.training_seconds,
+                 {period: [(b.key, b.workouts_completed, b.training_seconds, b.weight_sum, b.weight_count)
+                           for b in buckets.values()]
+                  for period, buckets in activity.buckets.items()},
+                 activity.streaks.dump_state())
+                for user_id, activity in self._by_user.items()]
+
+    def load_state(self, rows):
+        for user_id, workouts_completed, training_seconds, buckets, streaks in rows:
+            activity = self._by_user[user_id] = _UserActivity()
+            activity.workouts_completed = workouts_completed
+            activity.training_seconds = training_seconds
+            for period, items in buckets.items():
+                activity.buckets[period] = SortedIndex.from_sorted((item[0], Bucket(*item)) for item in items)
+            activity.streaks = StreakTracker.load_state(streaks)
+
+
+class Store:
+    """
+    Базовий клас сховища. Реалізації надають атрибути users, progress,
+    templates, workouts, analytics, exercises та контекстний менеджер transaction() для
+    операцій, які змінюють кілька репозиторіїв одночасно. transaction(user_id)
+    також не дає паралельним запитам того самого користувача переплестися
+    (наприклад, двом завершенням одного тренування).
+    """
+
+    users = progress = templates = workouts = analytics = exercises = None
+
+    @contextmanager
+    def transaction(self, user_id=None):
+        yield
+
+    def close(self):
+        pass
+
+
+class MemoryStore(Store):
+    """
+    Сховище в пам'яті процесу. Дані втрачаються при перезапуску; зручне для тестів.
+
+    Репозиторії ділять один набір локів за ID користувача (StripedLock): кожна
+    операція бере лок свого користувача, а transaction(user_id) тримає його
+    на весь блок, тож запити різних користувачів виконуються паралельно.
+    """
+
+    def __init__(self, lock_stripes=64):
+        self._locks = StripedLock(lock_stripes)
+        self.users = UserRepository(self._locks)
+        self.progress = ProgressRepository(self._locks)
+        self.templates = TemplateRepository()
+        self.exercises = ExerciseRepository(self._locks)
+        self.workouts = WorkoutRepository(self.templates, self._locks, self.exercises)
+        self.analytics = AnalyticsRepository(self._locks)
+
+    @contextmanager
+    def transaction(self, user_id=None):
+        if user_id is None:
+            yield
+            return
+        with self._locks.lock(user_id):
+            yield
+
+    def dump_state(self):
+        """
+        Стан усіх репозиторіїв як словник простих значень (рядки, числа, списки,
+        кортежі, словники). Викликається, коли жодна зміна не виконується.
+        """
+        snapshots = SnapshotTable()
+        state = {
+            'users': self.users.dump_state(),
+            'progress': self.progress.dump_state(),
+            'templates': self.templates.dump_state(snapshots),
+            'workouts': self.workouts.dump_state(snapshots),
+            'exercises': self.exercises.dump_state(),
+            'analytics': self.analytics.dump_state(),
+        }
+        state['snapshots'] = snapshots.rows
+        return state
+
+    def load_state(self, state):
+        """Відновлює стан, збережений dump_state, у порожньому сховищі."""
+        snapshots = SnapshotTable(state['snapshots'])
+        self.users.load_state(state['users'])
+        self.progress.load_state(state['progress'])
+        self.templates.load_state(state['templates'], snapshots)
+        self.workouts.load_state(state['workouts'], snapshots)
+        self.exercises.load_state(state['exercises'])
+        self.analytics.load_state(state['analytics'])
+
+
+def create_store(backend='memory', database_name=None, journal_dir=None, **journal_options):
+    """
+    Створює сховище за назвою бекенду: 'memory' або 'sqlite'. Для 'memory' з
+    journal_dir зміни записуються в журнал (durable_store.DurableMemoryStore).
+    """
+    if backend == 'memory':
+        if journal_dir:
+            from durable_store import DurableMemoryStore
+            return DurableMemoryStore(journal_dir, **journal_options)
+        return MemoryStore()
+    if backend == 'sqlite':
+        from sqlite_store import SQLiteStore
+        return SQLiteStore(database_name)
+    raise ValueError(f"Невідомий бекенд сховища: {backend}")
@@ -0,0 +1,69 @@
+# response_cache.py
+# Кеш готових (серіалізованих) відповідей з ETag для маршрутів читання шаблонів.
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+
+def make_etag(kind, versions, key=None):
+    """
+    ETag відповіді: тип, версії даних, від яких вона залежить, і (за потреби)
+    короткий хеш ключа — параметрів запиту чи області видимості.
+    """
+    etag = f"{kind}-{'.'.join(str(version) for version in versions)}"
+    if key is not None:
+        raw = json.dumps(key, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+        etag += '-' + hashlib.sha256(raw).hexdigest()[:16]
+    return etag
+
+
+class ResponseCache:
+    """
+    Обмежений LRU-кеш відповідей: {ключ: (etag, тіло, заголовки, дані)}.
+
+    Запис дійсний, лише поки його etag збігається з поточним (версії даних не
+    змінилися), тож окремої інвалідації не потрібно: застарілі записи просто
+    не збігаються й витісняються новими. У "дані" маршрут може покласти те, що
+    потрібно для перевірок без читання сховища (наприклад, власника шаблону).
+    """
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, etag):
+        """Повертає (тіло, заголовки, дані) для key з тим самим etag або None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != etag:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1:]
+
+    def put(self, key, etag, body, headers=None, data=None):
+        with self._lock:
+            self._entries[key] = (etag, body, dict(headers or {}), data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,159 @@
+# responses.py
+# Допоміжні функції для формування відповідей зі списками: пагінація за курсором,
+# потокова (streaming) віддача JSON-масиву та умовні запити (ETag/If-None-Match).
+import base64
+import json
+from itertools import islice
+
+from flask import Response, current_app, jsonify, make_response, request, stream_with_context
+
+from compression import etag_variants
+from response_cache import make_etag
+
+# Максимальна кількість записів на одній сторінці
+MAX_PAGE_SIZE = 500
+
+# Заголовок, у якому повертається курсор наступної сторінки
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+
+def encode_cursor(key):
+    """Кодує ключ останнього запису сторінки в непрозорий рядок для клієнта."""
+    raw = json.dumps(key, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _has_shape(key, shape):
+    if isinstance(shape, tuple):
+        return (isinstance(key, tuple) and len(key) == len(shape)
+                and all(_has_shape(item, item_shape) for item, item_shape in zip(key, shape)))
+    # Точна перевірка типу: bool не підходить замість int
+    return type(key) is shape
+
+
+def decode_cursor(cursor, shape):
+    """
+    Розкодовує курсор з encode_cursor. shape — тип ключа сторінки (str, int) або
+    кортеж типів для складеного ключа (page_key_shape репозиторію). Кидає ValueError
+    для недійсного рядка чи ключа іншої форми (наприклад, курсора з іншого списку).
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        key = json.loads(raw.decode('utf-8'))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError('Недійсний курсор') from e
+    if isinstance(key, list):
+        key = tuple(key)
+    if not _has_shape(key, shape):
+        raise ValueError('Недійсний курсор')
+    return key
+
+
+def json_array_stream(items):
+    """Генерує JSON-масив частинами, не збираючи всю відповідь у пам'яті."""
+    dumps = current_app.json.dumps
+    yield '['
+    first = True
+    for item in items:
+        if not first:
+            yield ','
+        yield dumps(item)
+        first = False
+    yield ']'
+
+
+def wants_stream():
+    """Чи просить клієнт потокову відповідь (параметр stream=1/true/yes)."""
+    return request.args.get('stream', '').lower() in ('1', 'true', 'yes')
+
+
+def list_response(fetch, key_of, key_shape, fragment=None):
+    """
+    Формує відповідь зі списком з урахуванням параметрів запиту:
+      limit  — розмір сторінки (1..MAX_PAGE_SIZE); курсор наступної сторінки
+               повертається в заголовку X-Next-Cursor, поки є наступні записи;
+      cursor — значення X-Next-Cursor з попередньої відповіді;
+      stream — 1/true, щоб віддати масив потоком, не серіалізуючи його цілком.
+
+    fetch(after, limit) повертає ітератор записів, що йдуть після ключа after
+    (None — з початку); key_of(record) повертає ключ запису для курсора, а
+    key_shape — форму цього ключа для перевірки курсора (див. decode_cursor).
+    fragment(record) може замінити запис уже серіалізованим (json_provider.RawJSON).
+    Без limit повертається весь список, як і раніше.
+    """
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+    stream = wants_stream()
+
+    try:
+        after = decode_cursor(cursor, key_shape) if cursor else None
+        if limit is not None:
+            limit = int(limit)
+            if not 1 <= limit <= MAX_PAGE_SIZE:
+                raise ValueError
+    except ValueError:
+        return jsonify({'message': f'Недійсний курсор або limit (допустимо від 1 до {MAX_PAGE_SIZE}).'}), 400
+
+    headers = {}
+    if limit is None:
+        items = fetch(after, None)
+    else:
+        # Беремо на один запис більше, щоб дізнатися, чи є наступна сторінка
+        items = list(islice(fetch(after, limit + 1), limit + 1))
+        if len(items) > limit:
+            items = items[:limit]
+            headers[NEXT_CURSOR_HEADER] = encode_cursor(key_of(items[-1]))
+    if fragment is not None:
+        items = map(fragment, items)
+
+    if stream:
+        return Response(stream_with_context(json_array_stream(items)),
+                        mimetype='application/json', headers=headers), 200
+    return jsonify(list(items)), 200, headers
+
+
+def not_modified(etag):
+    """
+    Відповідь 304 без тіла, якщо клієнт уже має версію etag (If-None-Match), інакше None.
+    Підходить і ETag стисненого представлення (див. compression.encoded_etag).
+    """
+    if not any(request.if_none_match.contains(variant) for variant in etag_variants(etag)):
+        return None
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+
+def json_body_response(body, etag, headers=None):
+    """Відповідь з уже серіалізованим JSON-тілом і заголовком ETag."""
+    response = Response(body, mimetype='application/json', headers=headers)
+    response.set_etag(etag)
+    return response
+
+
+def cached_json_response(cache, key, kind, versions, build):
+    """
+    Відповідь з кешу відповідей (response_cache.ResponseCache) з ETag.
+
+    versions() повертає поточні версії даних, від яких залежить відповідь;
+    разом із key вони задають ETag. Якщо клієнт уже має цю версію, повертається
+    304, якщо вона є в кеші — збережене тіло без серіалізації. Інакше
+    викликається build() (звичайний обробник Flask), а успішна відповідь
+    кешується, якщо дані не змінилися, поки вона будувалася.
+    """
+    etag = make_etag(kind, versions(), key)
+    response = not_modified(etag)
+    if response is not None:
+        return response
+    cached = cache.get(key, etag)
+    if cached is not None:
+        body, headers, _ = cached
+        return json_body_response(body, etag, headers)
+
+    response = make_response(build())
+    if response.status_code == 200 and not response.is_streamed and make_etag(kind, versions(), key) == etag:
+        headers = {NEXT_CURSOR_HEADER: response.headers[NEXT_CURSOR_HEADER]} \
+            if NEXT_CURSOR_HEADER in response.headers else {}
+        cache.put(key, etag, response.get_data(), headers)
+        response.set_etag(etag)
+    return response
@@ -0,0 +1,775 @@
+# sqlite_store.py
+# Сховище на основі SQLite зі схемою з database.py. Реалізує той самий інтерфейс
+# репозиторіїв, що й in-memory сховище з repositories.py, тож app.py не залежить
+# від того, де зберігаються дані.
+import json
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import groupby
+from operator import itemgetter
+
+import database
+from analytics import PERIODS, Bucket, build_summary, period_key
+from exercises import build_records, build_stats, exercise_key, history_entry, set_record
+from repositories import (GLOBAL_SCOPE, Store, TEMPLATE_FIELDS, UserChangeNotifier, owner_scope,
+                          strip_actual_results, template_scope)
+
+
+class ConnectionPool:
+    """
+    Пул з'єднань SQLite.
+
+    Потік отримує з'єднання з пулу на час операції; вкладені виклики в тому ж
+    потоці (наприклад, усередині транзакції) повторно використовують те саме
+    з'єднання. Кожне з'єднання працює в режимі WAL, тож читачі з інших потоків
+    та процесів не блокуються записом. SQL-запити — сталі рядки, тому модуль
+    sqlite3 кешує підготовлені вирази (cached_statements) для кожного з'єднання.
+    """
+
+    def __init__(self, database_name, size=8, timeout=5.0):
+        self.database_name = database_name
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.database_name,
+            timeout=self.timeout,
+            isolation_level=None,  # Транзакціями керуємо самі через BEGIN/COMMIT
+            check_same_thread=False,  # З'єднання повертаються в пул і переходять між потоками
+            cached_statements=256,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    @contextmanager
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            yield conn
+            return
+
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    @contextmanager
+    def transaction(self):
+        """Виконує вкладені операції в одній транзакції (BEGIN IMMEDIATE ... COMMIT)."""
+        with self.connection() as conn:
+            if conn.in_transaction:
+                yield conn
+                return
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class _SQLiteRepository:
+    # Скільки рядків читати за один запит при ітерації по великих списках
+    BATCH_SIZE = 500
+
+    def __init__(self, pool):
+        self._pool = pool
+
+    def _iter_keyset(self, fetch_batch, key_of, after=None, limit=None):
+        """
+        Ітерує по рядках порціями: fetch_batch(after, size) повертає наступні
+        size рядків після ключа after. З'єднання не утримується між порціями,
+        а пам'ять обмежена розміром порції незалежно від довжини історії.
+        """
+        while limit is None or limit > 0:
+            size = self.BATCH_SIZE if limit is None else min(limit, self.BATCH_SIZE)
+            rows = fetch_batch(after, size)
+            yield from rows
+            if len(rows) < size:
+                return
+            after = key_of(rows[-1])
+            if limit is not None:
+                limit -= len(rows)
+
+    def _fetchone(self, sql, params=()):
+        with self._pool.connection() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    def _fetchall(self, sql, params=()):
+        with self._pool.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def _count(self, sql, params=()):
+        return self._fetchone(sql, params)[0]
+
+
+def _date_range_condition(where, params, column, date_from, date_to):
+    """Доповнює умову WHERE межами дат (включно), якщо їх задано."""
+    params = list(params)
+    if date_from is not None:
+        where += f' AND {column} >= ?'
+        params.append(date_from)
+    if date_to is not None:
+        where += f' AND {column} <= ?'
+        params.append(date_to)
+    return where, params
+
+
+def _user_from_row(row):
+    return {'id': row['id'], 'username': row['username'], 'email': row['email'],
+            'password': row['password'], 'role': row['role']}
+
+
+class SQLiteUserRepository(_SQLiteRepository, UserChangeNotifier):
+    """Користувачі в таблиці users; унікальність забезпечують UNIQUE-обмеження."""
+
+    _SELECT = 'SELECT id, username, email, password, role FROM users'
+
+    def __len__(self):
+        return self._count('SELECT COUNT(*) FROM users')
+
+    def __iter__(self):
+        return iter([row['id'] for row in self._fetchall('SELECT id FROM users ORDER BY id')])
+
+    def get(self, user_id):
+        row = self._fetchone(self._SELECT + ' WHERE id = ?', (user_id,))
+        return _user_from_row(row) if row else None
+
+    def get_by_email(self, email):
+        row = self._fetchone(self._SELECT + ' WHERE email = ?', (email,))
+        return _user_from_row(row) if row else None
+
+    def get_by_username(self, username):
+        row = self._fetchone(self._SELECT + ' WHERE username = ?', (username,))
+        return _user_from_row(row) if row else None
+
+    def add(self, user):
+        with self._pool.transaction() as conn:
+            user_id = database.insert_user(conn, user['username'], user['email'],
+                                           user['password'], user.get('role', 'user'))
+        return dict(user, id=user_id)
+
+    def update_profile(self, user_id, username, email):
+        with self._pool.transaction() as conn:
+            try:
+                conn.execute('UPDATE users SET username = ?, email = ? WHERE id = ?',
+                             (username, email, user_id))
+            except sqlite3.IntegrityError as e:
+                error = database.unique_violation(e)
+                if error is None:
+                    raise
+                raise error from e
+        self._notify(user_id)
+        return self.get(user_id)
+
+    def set_role(self, user_id, role):
+        with self._pool.connection() as conn:
+            conn.execute('UPDATE users SET role = ? WHERE id = ?', (role, user_id))
+        self._notify(user_id)
+        return self.get(user_id)
+
+    def set_password(self, user_id, password):
+        with self._pool.connection() as conn:
+            conn.execute('UPDATE users SET password = ? WHERE id = ?', (password, user_id))
+        self._notify(user_id)
+        return self.get(user_id)
+
+    def delete(self, user_id):
+        with self._pool.connection() as conn:
+            deleted = conn.execute('DELETE FROM users WHERE id = ?', (user_id,)).rowcount > 0
+        if deleted:
+            self._notify(user_id)
+        return deleted
+
+
+def _progress_from_row(row):
+    return {'date': row['date'], 'weight': row['weight'],
+            'workouts_completed': row['workouts_completed']}
+
+
+class SQLiteProgressRepository(_SQLiteRepository):
+    """Прогрес користувачів у таблиці user_progress (один запис на дату)."""
+
+    _SELECT = 'SELECT date, weight, workouts_completed FROM user_progress'
+
+    def __len__(self):
+        return self._count('SELECT COUNT(DISTINCT user_id) FROM user_progress')
+
+    page_key_shape = str
+
+    @staticmethod
+    def page_key(entry):
+        return entry['date']
+
+    def iter_for_user(self, user_id, after=None, limit=None, date_from=None, date_to=None):
+        where, params = _date_range_condition('user_id = ?', [user_id], 'date', date_from, date_to)
+
+        def fetch_batch(after, size):
+            if after is None:
+                return self._fetchall(self._SELECT + f' WHERE {where} ORDER BY date DESC LIMIT ?',
+                                      params + [size])
+            return self._fetchall(self._SELECT + f' WHERE {where} AND date < ? ORDER BY date DESC LIMIT ?',
+                                  params + [after, size])
+
+        for row in self._iter_keyset(fetch_batch, lambda row: row['date'], after, limit):
+            yield _progress_from_row(row)
+
+    def iter_rows(self):
+        with self._pool.connection() as conn:
+            yield from conn.execute('SELECT user_id, date, weight FROM user_progress')
+
+    def has_entries(self, user_id):
+        return self._fetchone('SELECT 1 FROM user_progress WHERE user_id = ? LIMIT 1',
+                              (user_id,)) is not None
+
+    def add(self, user_id, entry):
+        with self._pool.connection() as conn:
+            conn.execute(
+                'INSERT INTO user_progress (user_id, date, weight, workouts_completed) '
+                'VALUES (?, ?, ?, ?)',
+                (user_id, entry['date'], entry.get('weight'), entry.get('workouts_completed', 0)))
+
+    def save_weight(self, user_id, date, weight):
+        with self._pool.transaction() as conn:
+            row = conn.execute('SELECT weight FROM user_progress WHERE user_id = ? AND date = ?',
+                               (user_id, date)).fetchone()
+            if row is None:
+                self.add(user_id, {'date': date, 'weight': weight, 'workouts_completed': 0})
+                return None
+            conn.execute('UPDATE user_progress SET weight = ? WHERE user_id = ? AND date = ?',
+                         (weight, user_id, date))
+            return row['weight']
+
+    def record_completed(self, user_id, date):
+        with self._pool.transaction() as conn:
+            if not self.has_entries(user_id):
+                return
+            cursor = conn.execute(
+                'UPDATE user_progress SET workouts_completed = workouts_completed + 1 '
+                'WHERE user_id = ? AND date = ?', (user_id, date))
+            if cursor.rowcount == 0:
+                self.add(user_id, {'date': date, 'weight': None, 'workouts_completed': 1})
+
+    def revert_completed(self, user_id, date):
+        with self._pool.connection() as conn:
+            conn.execute(
+                'UPDATE user_progress SET workouts_completed = workouts_completed - 1 '
+                'WHERE user_id = ? AND date = ? AND workouts_completed > 0', (user_id, date))
+
+    def delete_for_user(self, user_id):
+        with self._pool.connection() as conn:
+            return conn.execute('DELETE FROM user_progress WHERE user_id = ?', (user_id,)).rowcount > 0
+
+
+# Поля шаблону, які зберігаються як JSON-рядки
+_TEMPLATE_JSON_COLUMNS = {'exercises': 'exercises_json', 'muscle_groups': 'muscle_groups',
+                          'equipment': 'equipment'}
+
+
+def _template_column(field):
+    return _TEMPLATE_JSON_COLUMNS.get(field, field)
+
+
+def _template_value(field, value):
+    if field in _TEMPLATE_JSON_COLUMNS:
+        return json.dumps(value, ensure_ascii=False)
+    if field == 'is_global':
+        return bool(value)
+    return value
+
+
+def _template_from_row(row):
+    return {
+        'id': row['id'],
+        'name': row['name'],
+        'description': row['description'],
+        'exercises': json.loads(row['exercises_json'] or '[]'),
+        'is_global': bool(row['is_global']),
+        'user_id': row['user_id'],
+        'muscle_groups': json.loads(row['muscle_groups'] or '[]'),
+        'goal': row['goal'],
+        'difficulty': row['difficulty'],
+        'equipment': json.loads(row['equipment'] or '[]'),
+        'duration_category': row['duration_category'],
+    }
+
+
+def _template_scopes(template):
+    return {template_scope(template['id']),
+            GLOBAL_SCOPE if template['is_global'] else owner_scope(template['user_id'])}
+
+
+class SQLiteTemplateRepository(_SQLiteRepository):
+    """
+    Шаблони тренувань у таблиці workout_templates. Лічильники версій для ETag
+    зберігаються в template_versions і змінюються в тій самій транзакції, що й шаблон.
+    """
+
+    _SELECT = ('SELECT id, user_id, name, description, exercises_json, is_global, muscle_groups, '
+               'goal, difficulty, equipment, duration_category FROM workout_templates')
+
+    def __len__(self):
+        return self._count('SELECT COUNT(*) FROM workout_templates')
+
+    def __iter__(self):
+        return iter([row['id'] for row in self._fetchall('SELECT id FROM workout_templates ORDER BY id')])
+
+    @staticmethod
+    def _bump(conn, scopes):
+        for scope in scopes:
+            conn.execute('INSERT INTO template_versions (scope, version) VALUES (?, 1) '
+                         'ON CONFLICT (scope) DO UPDATE SET version = version + 1', (scope,))
+
+    def versions(self, scopes):
+        scopes = ['epoch'] + list(scopes)
+        rows = self._fetchall(
+            f"SELECT scope, version FROM template_versions WHERE scope IN ({', '.join('?' for _ in scopes)})",
+            scopes)
+        versions = {row['scope']: row['version'] for row in rows}
+        return tuple(versions.get(scope, 0) for scope in scopes)
+
+    def has_personal(self, user_id):
+        return self._fetchone('SELECT 1 FROM workout_templates WHERE user_id = ? AND NOT COALESCE(is_global, 0) '
+                              'LIMIT 1', (user_id,)) is not None
+
+    def get(self, template_id):
+        row = self._fetchone(self._SELECT + ' WHERE id = ?', (template_id,))
+        return _template_from_row(row) if row else None
+
+    def add(self, template):
+        fields = ['user_id'] + [field for field in TEMPLATE_FIELDS if field in template]
+        columns = ', '.join(_template_column(field) for field in fields)
+        placeholders = ', '.join('?' for _ in fields)
+        with self._pool.transaction() as conn:
+            cursor = conn.execute(
+                f'INSERT INTO workout_templates ({columns}) VALUES ({placeholders})',
+                [_template_value(field, template[field]) for field in fields])
+            created = self.get(cursor.lastrowid)
+            self._bump(conn, _template_scopes(created))
+        return created
+
+    def update(self, template_id, changes):
+        fields = [field for field in TEMPLATE_FIELDS if field in changes]
+        if not fields:
+            return self.get(template_id)
+        assignments = ', '.join(f'{_template_column(field)} = ?' for field in fields)
+        with self._pool.transaction() as conn:
+            scopes = _template_scopes(self.get(template_id))
+            conn.execute(f'UPDATE workout_templates SET {assignments} WHERE id = ?',
+                         [_template_value(field, changes[field]) for field in fields] + [template_id])
+            updated = self.get(template_id)
+            self._bump(conn, scopes | _template_scopes(updated))
+        return updated
+
+    def delete(self, template_id):
+        with self._pool.transaction() as conn:
+            template = self.get(template_id)
+            if template is None:
+                return False
+            conn.execute('DELETE FROM workout_templates WHERE id = ?', (template_id,))
+            self._bump(conn, _template_scopes(template))
+        return True
+
+    page_key_shape = int
+
+    @staticmethod
+    def page_key(template):
+        return template['id']
+
+    def iter_accessible(self, user_id, filters, after=None, limit=None):
+        # Шаблони доступні, якщо вони глобальні або створені поточним користувачем
+        conditions = ['(is_global = 1 OR user_id = ?)']
+        params = [user_id]
+        for field in ('goal', 'difficulty', 'duration_category'):
+            if filters.get(field):
+                conditions.append(f'{field} = ?')
+                params.append(filters[field])
+        if filters.get('muscle_group'):
+            conditions.append('EXISTS (SELECT 1 FROM json_each(muscle_groups) WHERE value = ?)')
+            params.append(filters['muscle_group'])
+        # Шаблон має містити всі вибрані елементи обладнання
+        for item in filters.get('equipment') or []:
+            conditions.append('EXISTS (SELECT 1 FROM json_each(equipment) WHERE value = ?)')
+            params.append(item)
+        sql = self._SELECT + ' WHERE ' + ' AND '.join(conditions)
+
+        def fetch_batch(after, size):
+            if after is None:
+                return self._fetchall(sql + ' ORDER BY id LIMIT ?', params + [size])
+            return self._fetchall(sql + ' AND id > ? ORDER BY id LIMIT ?', params + [after, size])
+
+        for row in self._iter_keyset(fetch_batch, lambda row: row['id'], after, limit):
+            yield _template_from_row(row)
+
+
+def _workout_from_row(row):
+    workout = {
+        'id': row['id'],
+        'user_id': row['user_id'],
+        'template_id': row['template_id'],
+        'workout_date': row['workout_date'],
+        'date': row['workout_date'],  # Для сумісності з фронтендом, який очікує 'date'
+        'status': row['status'],
+        'template_name': row['name'],
+        'description': row['description'],
+        'exercises': json.loads(row['exercises_json'] or '[]'),
+    }
+    if row['duration_seconds'] is not None:
+        workout['duration_seconds'] = row['duration_seconds']
+    return workout
+
+
+class SQLiteWorkoutRepository(_SQLiteRepository):
+    """Щоденні тренування в таблиці user_workouts."""
+
+    _SELECT = ('SELECT id, user_id, template_id, workout_date, status, name, description, '
+               'exercises_json, duration_seconds FROM user_workouts')
+
+    def __len__(self):
+        return self._count('SELECT COUNT(DISTINCT user_id) FROM user_workouts')
+
+    page_key_shape = (str, int)
+
+    @staticmethod
+    def page_key(workout):
+        return (workout['date'], workout['id'])
+
+    def iter_for_user(self, user_id, after=None, limit=None, date_from=None, date_to=None):
+        where, params = _date_range_condition('user_id = ?', [user_id], 'workout_date', date_from, date_to)
+
+        def fetch_batch(after, size):
+            if after is None:
+                return self._fetchall(
+                    self._SELECT + f' WHERE {where} ORDER BY workout_date DESC, id DESC LIMIT ?',
+                    params + [size])
+            return self._fetchall(
+                self._SELECT + f' WHERE {where} AND (workout_date, id) < (?, ?) '
+                'ORDER BY workout_date DESC, id DESC LIMIT ?', params + [after[0], after[1], size])
+
+        for row in self._iter_keyset(fetch_batch, lambda row: (row['workout_date'], row['id']), after, limit):
+            yield _workout_from_row(row)
+
+    def iter_rows(self):
+        with self._pool.connection() as conn:
+            yield from conn.execute(
+                'SELECT user_id, template_id, workout_date, status, duration_seconds FROM user_workouts')
+
+    def get(self, user_id, workout_id):
+        row = self._fetchone(self._SELECT + ' WHERE id = ? AND user_id = ?', (workout_id, user_id))
+        return _workout_from_row(row) if row else None
+
+    _INSERT = ('INSERT INTO user_workouts (user_id, template_id, workout_date, status, name, '
+               'description, exercises_json, duration_seconds) VALUES (?, ?, ?, ?, ?, ?, ?, ?)')
+
+    def _insert(self, conn, workout):
+        cursor = conn.execute(self._INSERT, (
+            workout['user_id'], workout['template_id'], workout['workout_date'],
+            workout.get('status', 'upcoming'), workout['template_name'], workout.get('description'),
+            json.dumps(workout.get('exercises', []), ensure_ascii=False), workout.get('duration_seconds')))
+        if workout.get('status') == 'completed':
+            performed = database.insert_workout_exercises(conn, workout['user_id'], cursor.lastrowid,
+                                                          workout['workout_date'], workout.get('exercises'))
+            database.add_exercise_stats(conn, workout['user_id'], workout['workout_date'], performed)
+        return dict(workout, id=cursor.lastrowid)
+
+    @staticmethod
+    def _delete_exercises(conn, condition, params, update_stats=True):
+        """
+        Видаляє виконані вправи (і їхні підходи) тренувань, що відповідають умові,
+        та віднімає їх від показників вправ.
+        """
+        removed = database.select_workout_exercises(conn, condition, params) if update_stats else ()
+        conn.execute('DELETE FROM exercise_sets WHERE exercise_id IN '
+                     f'(SELECT id FROM workout_exercises WHERE {condition})', params)
+        conn.execute(f'DELETE FROM workout_exercises WHERE {condition}', params)
+        if removed:
+            database.remove_exercise_stats(conn, removed)
+
+    def add(self, workout):
+        with self._pool.transaction() as conn:
+            created = self._insert(conn, workout)
+        return self.get(workout['user_id'], created['id'])
+
+    def add_many(self, workouts):
+        """Додає кілька тренувань в одній транзакції (один підготовлений INSERT для всіх рядків)."""
+        with self._pool.transaction() as conn:
+            return [self._insert(conn, workout) for workout in workouts]
+
+    def mark_completed(self, user_id, workout_id, exercises, duration_seconds):
+        with self._pool.transaction() as conn:
+            conn.execute(
+                "UPDATE user_workouts SET status = 'completed', exercises_json = ?, duration_seconds = ? "
+                'WHERE id = ? AND user_id = ?',
+                (json.dumps(exercises, ensure_ascii=False), duration_seconds, workout_id, user_id))
+            self._delete_exercises(conn, 'workout_id = ? AND user_id = ?', (workout_id, user_id))
+            workout = self.get(user_id, workout_id)
+            if workout is not None:
+                performed = database.insert_workout_exercises(conn, user_id, workout['id'], workout['date'], exercises)
+                database.add_exercise_stats(conn, user_id, workout['date'], performed)
+        return workout
+
+    def mark_upcoming(self, user_id, workout_id):
+        with self._pool.transaction() as conn:
+            workout = self.get(user_id, workout_id)
+            exercises = strip_actual_results(workout['exercises'])
+            conn.execute(
+                "UPDATE user_workouts SET status = 'upcoming', exercises_json = ?, duration_seconds = NULL "
+                'WHERE id = ? AND user_id = ?',
+                (json.dumps(exercises, ensure_ascii=False), workout_id, user_id))
+            self._delete_exercises(conn, 'workout_id = ? AND user_id = ?', (workout_id, user_id))
+        return self.get(user_id, workout_id)
+
+    def delete(self, user_id, workout_id):
+        with self._pool.transaction() as conn:
+            self._delete_exercises(conn, 'workout_id = ? AND user_id = ?', (workout_id, user_id))
+            return conn.execute('DELETE FROM user_workouts WHERE id = ? AND user_id = ?',
+                                (workout_id, user_id)).rowcount > 0
+
+    def delete_for_user(self, user_id):
+        with self._pool.transaction() as conn:
+            # Показники користувача видаляються цілком, без віднімання по одному виконанню
+            self._delete_exercises(conn, 'user_id = ?', (user_id,), update_stats=False)
+            conn.execute('DELETE FROM exercise_weekly_volume WHERE user_id = ?', (user_id,))
+            conn.execute('DELETE FROM exercise_stats WHERE user_id = ?', (user_id,))
+            return conn.execute('DELETE FROM user_workouts WHERE user_id = ?', (user_id,)).rowcount > 0
+
+
+class SQLiteExerciseRepository(_SQLiteRepository):
+    """
+    Виконані вправи в таблицях workout_exercises та exercise_sets, показники
+    вправ — в exercise_stats та exercise_weekly_volume. Рядки записує
+    SQLiteWorkoutRepository разом зі зміною статусу тренування; тут лише
+    запити, які йдуть індексом (user_id, exercise_key, ...).
+    """
+
+    # Спільна частина запитів до підходів вправи користувача
+    _SETS = ('FROM exercise_sets AS s JOIN workout_exercises AS e ON e.id = s.exercise_id '
+             'WHERE e.user_id = ? AND e.exercise_key = ?')
+    # Серед однакових результатів рекордом вважається перший за датою
+    _FIRST = 'e.workout_date, e.workout_id, e.position, s.set_number'
+
+    def __len__(self):
+        return self._count('SELECT COUNT(DISTINCT user_id) FROM workout_exercises')
+
+    page_key_shape = (str, int, int)
+
+    @staticmethod
+    def page_key(entry):
+        return (entry['date'], entry['workout_id'], entry['position'])
+
+    def iter_history(self, user_id, name, after=None, limit=None, date_from=None, date_to=None):
+        where, params = _date_range_condition('user_id = ? AND exercise_key = ?', [user_id, exercise_key(name)],
+                                              'workout_date', date_from, date_to)
+
+        def fetch_batch(after, size):
+            condition, batch_params = where, list(params)
+            if after is not None:
+                condition += ' AND (workout_date, workout_id, position) < (?, ?, ?)'
+                batch_params += list(after)
+            # Спершу сторінка вправ за індексом, потім їхні підходи
+            rows = self._fetchall(
+                'SELECT e.id, e.workout_id, e.workout_date, e.position, e.name, s.set_number, s.reps, s.weight FROM ('
+                f'SELECT id, workout_id, workout_date, position, name FROM workout_exercises WHERE {condition} '
+                'ORDER BY workout_date DESC, workout_id DESC, position DESC LIMIT ?) AS e '
+                'LEFT JOIN exercise_sets AS s ON s.exercise_id = e.id '
+                'ORDER BY e.workout_date DESC, e.workout_id DESC, e.position DESC, s.set_number',
+                batch_params + [size])
+            entries = []
+            for _, group in groupby(rows, key=itemgetter('id')):
+                group = list(group)
+                first = group[0]
+                sets = [(row['reps'], row['weight']) for row in group if row['set_number'] is not None]
+                entries.append(history_entry(first['workout_id'], first['workout_date'], first['position'],
+                                             first['name'], sets))
+            return entries
+
+        yield from self._iter_keyset(fetch_batch, self.page_key, after, limit)
+
+    def records(self, user_id, name):
+        key = exercise_key(name)
+        with self._pool.connection() as conn:
+            summary = conn.execute(
+                'SELECT COUNT(*) AS sessions, MIN(workout_date) AS first_date, MAX(workout_date) AS last_date '
+                'FROM workout_exercises WHERE user_id = ? AND exercise_key = ?', (user_id, key)).fetchone()
+            if not summary['sessions']:
+                return None
+            latest_name = conn.execute(
+                'SELECT name FROM workout_exercises WHERE user_id = ? AND exercise_key = ? '
+                'ORDER BY workout_date DESC, workout_id DESC, position DESC LIMIT 1', (user_id, key)).fetchone()[0]
+            heaviest = conn.execute(
+                f'SELECT s.reps, s.weight, e.workout_date, e.workout_id {self._SETS} AND s.weight IS NOT NULL '
+                f'ORDER BY s.weight DESC, s.reps DESC, {self._FIRST} LIMIT 1', (user_id, key)).fetchone()
+            most_reps = conn.execute(
+                f'SELECT s.reps, s.weight, e.workout_date, e.workout_id {self._SETS} AND s.reps IS NOT NULL '
+                f'ORDER BY s.reps DESC, s.weight DESC, {self._FIRST} LIMIT 1', (user_id, key)).fetchone()
+            best_volume = conn.execute(
+                f'SELECT SUM(s.reps * s.weight) AS volume, e.workout_date, e.workout_id {self._SETS} '
+                'GROUP BY e.id HAVING volume IS NOT NULL '
+                'ORDER BY volume DESC, e.workout_date, e.workout_id, e.position LIMIT 1', (user_id, key)).fetchone()
+        return build_records(
+            latest_name, summary['sessions'], summary['first_date'], summary['last_date'],
+            set_record(*heaviest) if heaviest else None,
+            set_record(*most_reps) if most_reps else None,
+            {'volume': best_volume['volume'], 'date': best_volume['workout_date'],
+             'workout_id': best_volume['workout_id']} if best_volume else None)
+
+    def stats(self, user_id, name, weeks):
+        key = exercise_key(name)
+        with self._pool.connection() as conn:
+            stats = conn.execute('SELECT sessions, max_weight, max_e1rm FROM exercise_stats '
+                                 'WHERE user_id = ? AND exercise_key = ?', (user_id, key)).fetchone()
+            if stats is None:
+                return None
+            latest_name = conn.execute(
+                'SELECT name FROM workout_exercises WHERE user_id = ? AND exercise_key = ? '
+                'ORDER BY workout_date DESC, workout_id DESC, position DESC LIMIT 1', (user_id, key)).fetchone()[0]
+            weekly = conn.execute('SELECT week, volume FROM exercise_weekly_volume '
+                                  'WHERE user_id = ? AND exercise_key = ? ORDER BY week DESC LIMIT ?',
+                                  (user_id, key, weeks)).fetchall()
+        return build_stats(latest_name, stats['sessions'], stats['max_weight'], stats['max_e1rm'],
+                           [tuple(row) for row in weekly])
+
+    def list_for_user(self, user_id):
+        # name береться з рядка з найпізнішою датою (так SQLite обробляє "голі" колонки поруч із MAX)
+        rows = self._fetchall(
+            'SELECT name, COUNT(*) AS sessions, MAX(workout_date) AS last_date FROM workout_exercises '
+            'WHERE user_id = ? GROUP BY exercise_key ORDER BY last_date DESC, exercise_key', (user_id,))
+        return [dict(row) for row in rows]
+
+
+# Період у user_activity для загальних підсумків користувача
+_TOTAL_PERIOD = 'total'
+
+
+class SQLiteAnalyticsRepository(_SQLiteRepository):
+    """
+    Агрегати аналітики в таблицях user_activity (підсумки за періоди) та
+    user_activity_days (дні із завершеними тренуваннями).
+
+    Кожна зміна оновлює по одному рядку тижня, місяця та загальних підсумків
+    (UPSERT за первинним ключем). Серії рахуються під час читання одним
+    запитом по user_activity_days, де на день припадає не більше одного рядка.
+    """
+
+    _UPSERT = ('INSERT INTO user_activity (user_id, period, bucket, workouts_completed, training_seconds, '
+               'weight_sum, weight_count) VALUES (?, ?, ?, ?, ?, ?, ?) '
+               'ON CONFLICT (user_id, period, bucket) DO UPDATE SET '
+               'workouts_completed = workouts_completed + excluded.workouts_completed, '
+               'training_seconds = training_seconds + excluded.training_seconds, '
+               'weight_sum = weight_sum + excluded.weight_sum, '
+               'weight_count = weight_count + excluded.weight_count')
+
+    _DELETE_EMPTY = ('DELETE FROM user_activity WHERE user_id = ? AND period = ? AND bucket = ? '
+                     'AND workouts_completed = 0 AND training_seconds = 0 AND weight_count = 0')
+
+    # Серії днів поспіль: у межах серії julianday(date) - номер рядка однакові
+    _STREAKS = ('SELECT MAX(date) AS last_day, COUNT(*) AS days FROM ('
+                'SELECT date, julianday(date) - ROW_NUMBER() OVER (ORDER BY date) AS streak '
+                'FROM user_activity_days WHERE user_id = ?) GROUP BY streak ORDER BY last_day DESC')
+
+    def __len__(self):
+        return self._count('SELECT COUNT(DISTINCT user_id) FROM user_activity')
+
+    def _update(self, conn, user_id, date, workouts=0, seconds=0, weight_sum=0.0, weight_count=0):
+        for period in PERIODS:
+            key = period_key(date, period)
+            conn.execute(self._UPSERT, (user_id, period, key, workouts, seconds, weight_sum, weight_count))
+            conn.execute(self._DELETE_EMPTY, (user_id, period, key))
+        conn.execute(self._UPSERT, (user_id, _TOTAL_PERIOD, '', workouts, seconds, 0.0, 0))
+
+    def record_weight(self, user_id, date, previous_weight, weight):
+        with self._pool.transaction() as conn:
+            if previous_weight is not None:
+                self._update(conn, user_id, date, weight_sum=-previous_weight, weight_count=-1)
+            if weight is not None:
+                self._update(conn, user_id, date, weight_sum=weight, weight_count=1)
+
+    def record_completed(self, user_id, date, duration_seconds):
+        with self._pool.transaction() as conn:
+            self._update(conn, user_id, date, workouts=1, seconds=duration_seconds or 0)
+            conn.execute(
+                'INSERT INTO user_activity_days (user_id, date, workouts_completed) VALUES (?, ?, 1) '
+                'ON CONFLICT (user_id, date) DO UPDATE SET workouts_completed = workouts_completed + 1',
+                (user_id, date))
+
+    def revert_completed(self, user_id, date, duration_seconds):
+        with self._pool.transaction() as conn:
+            self._update(conn, user_id, date, workouts=-1, seconds=-(duration_seconds or 0))
+            conn.execute('UPDATE user_activity_days SET workouts_completed = workouts_completed - 1 '
+                         'WHERE user_id = ? AND date = ?', (user_id, date))
+            conn.execute('DELETE FROM user_activity_days WHERE user_id = ? AND date = ? AND workouts_completed <= 0',
+                         (user_id, date))
+
+    def summary(self, user_id, period, limit, window, today):
+        with self._pool.connection() as conn:
+            rows = conn.execute(
+                'SELECT bucket, workouts_completed, training_seconds, weight_sum, weight_count '
+                'FROM user_activity WHERE user_id = ? AND period = ? ORDER BY bucket DESC LIMIT ?',
+                (user_id, period, limit + window - 1)).fetchall()
+            total = conn.execute(
+                'SELECT workouts_completed, training_seconds FROM user_activity '
+                "WHERE user_id = ? AND period = ? AND bucket = ''", (user_id, _TOTAL_PERIOD)).fetchone()
+            streaks = conn.execute(self._STREAKS, (user_id,)).fetchall()
+
+        # Поточна серія — остання, якщо вона закінчується сьогодні або вчора
+        current_streak = 0
+        if streaks and streaks[0]['last_day'] >= (today - timedelta(days=1)).isoformat():
+            current_streak = streaks[0]['days']
+        return build_summary(
+            period, (Bucket(*row) for row in rows), limit, window,
+            {'workouts_completed': total['workouts_completed'] if total else 0,
+             'training_seconds': total['training_seconds'] if total else 0},
+            current_streak, max((row['days'] for row in streaks), default=0))
+
+    def delete_for_user(self, user_id):
+        with self._pool.transaction() as conn:
+            conn.execute('DELETE FROM user_activity_days WHERE user_id = ?', (user_id,))
+            return conn.execute('DELETE FROM user_activity WHERE user_id = ?', (user_id,)).rowcount > 0
+
+
+class SQLiteStore(Store):
+    """Сховище в SQLite-файлі. Дані зберігаються між перезапусками та спільні для процесів."""
+
+    def __init__(self, database_name=None, pool_size=8):
+        database_name = database_name or database.DATABASE_NAME
+        database.create_database_tables(database_name)
+        self._pool = ConnectionPool(database_name, size=pool_size)
+        self.users = SQLiteUserRepository(self._pool)
+        self.progress = SQLiteProgressRepository(self._pool)
+        self.templates = SQLiteTemplateRepository(self._pool)
+        self.workouts = SQLiteWorkoutRepository(self._pool)
+        self.analytics = SQLiteAnalyticsRepository(self._pool)
+        self.exercises = SQLiteExerciseRepository(self._pool)
+
+    def transaction(self, user_id=None):
+        # Паралельні транзакції впорядковує сама база (BEGIN IMMEDIATE), окремий лок не потрібен
+        return self._pool.transaction()
+
+    def close(self):
+        self._pool.close()
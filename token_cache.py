@@ -0,0 +1,95 @@
+# token_cache.py
+# Кеш перевірених JWT-токенів для token_required.
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenCache:
+    """
+    Обмежений LRU-кеш перевірених токенів з TTL.
+
+    Ключ — SHA-256 від токена (сам токен у пам'яті не зберігається), значення —
+    розкодовані claims та знайдений користувач. Запис живе до моменту exp токена,
+    але не довше за ttl секунд, тож зміни, зроблені іншими процесами,
+    підхоплюються не пізніше ніж через ttl. У межах процесу записи користувача
+    скидаються одразу через invalidate_user (видалення, зміна ролі чи профілю).
+    """
+
+    def __init__(self, max_size=10000, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # {digest: (expires_at, claims, user)}
+        self._by_user = {}  # {user_id: {digest, ...}}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _digest(token):
+        return hashlib.sha256(token.encode('utf-8')).digest()
+
+    def get(self, token):
+        """Повертає (claims, user) для токена або None, якщо його немає в кеші чи він застарів."""
+        digest = self._digest(token)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    self._remove(digest)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, token, claims, user):
+        expires_at = time.time() + self.ttl
+        if 'exp' in claims:
+            expires_at = min(expires_at, claims['exp'])
+        digest = self._digest(token)
+        with self._lock:
+            if digest in self._entries:
+                self._remove(digest)
+            self._entries[digest] = (expires_at, claims, user)
+            self._by_user.setdefault(user['id'], set()).add(digest)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, digest):
+        _, _, user = self._entries.pop(digest)
+        digests = self._by_user.get(user['id'])
+        if digests is not None:
+            digests.discard(digest)
+            if not digests:
+                del self._by_user[user['id']]
+
+    def invalidate_user(self, user_id):
+        """Видаляє з кешу всі токени користувача."""
+        with self._lock:
+            for digest in self._by_user.pop(user_id, ()):
+                self._entries.pop(digest, None)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def stats(self):
+        """Лічильники кешу для моніторингу."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }